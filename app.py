@@ -5,91 +5,76 @@ import json
 import sys
 import subprocess
 import re
+import uuid
 from dotenv import load_dotenv
 import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from PySide6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QSplitter, 
-                             QMessageBox, QFileDialog, QListWidgetItem, QComboBox)
-from PySide6.QtCore import Qt, QThreadPool, Slot, QTimer, QSortFilterProxyModel, QRunnable, QObject, Signal
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QColor, QAction, QKeySequence
+                             QMessageBox, QFileDialog, QListWidgetItem, QComboBox, QInputDialog, QProgressBar)
+from PySide6.QtCore import Qt, QThreadPool, Slot, QTimer, QRunnable, QObject, Signal
+from PySide6.QtGui import QAction, QKeySequence, QUndoStack
 
-import vertexai
 from vertexai.preview import caching
 from vertexai.generative_models import Part
 
 from data_models import Variable, Task
+from project_io import ProjectLoader
+from semantic_cache import SemanticResponseCache, DEFAULT_CAPACITY
 from ui_components import VariablePanel, TaskPanel, RunPanel, CompleterTextEdit
+from log_view import read_tail_lines, text_log_level
+from run_log import ACTIVE_SEGMENT
 from core_logic import TaskRunner
+from process_engine import ProcessEngine, RemoteRun, run_payload
+from diagnostics import EventLoopWatchdog, Profiler, profiled, profile_to_file, format_stack_tail
+from run_scheduler import GlobalScheduler, PRIORITY_LABELS
+from model_router import SUPPORTED_MODELS
+from completion_index import CompletionIndex
+from endpoint_pool import EndpointPool, load_endpoint_specs, run_in_location, run_for_resource, parse_resource_location
+from watch_mode import FileWatcherWorker, WatchState
 from variable_handler import VariableHandler
 from task_handler import TaskHandler
-from cache_manager_dialog import CacheManagerDialog
+from cache_manager_dialog import CacheManagerDialog, KST
+from run_options_dialog import RunOptionsDialog
+from output_sinks import extract as extract_outputs
+from cache_builder import CachePlan, CacheRegistry, tagged_display_name, display_name_hash, DEFAULT_CHUNK_CHARS
+from reference_index import VariableReferenceIndex
+from refactoring import RenameVariableCommand, FindUsagesDialog
 
 load_dotenv()
 
 BUILT_IN_VARS = {'RESPONSE'}
-SUPPORTED_MODELS = [
-    "gemini-2.5-pro",
-    "gemini-2.5-flash",
-    "gemini-2.0-flash",
-    "gemini-1.5-flash"
-]
-VAR_TYPE_ROLE = Qt.UserRole + 1
-
-class VariableFilterProxyModel(QSortFilterProxyModel):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self._exclude_name = ""
-        self._exclude_built_in = False
-
-    def set_exclude_name(self, name):
-        self._exclude_name = name
-        self.invalidateFilter()
-
-    def set_exclude_built_in(self, exclude):
-        self._exclude_built_in = exclude
-        self.invalidateFilter()
-
-    def filterAcceptsRow(self, source_row, source_parent):
-        index = self.sourceModel().index(source_row, 0, source_parent)
-        
-        if self._exclude_name:
-            text = self.sourceModel().data(index, Qt.DisplayRole)
-            if text == self._exclude_name:
-                return False
-        
-        if self._exclude_built_in:
-            var_type = self.sourceModel().data(index, VAR_TYPE_ROLE)
-            if var_type == 'built-in':
-                return False
-                
-        return super().filterAcceptsRow(source_row, source_parent)
+STOP_GRACE_MS = 3000
+ADMIN_POOL_THREADS = 4
+BULK_CACHE_PARALLELISM = 8 # 일괄 캐시 작업에서 한 리전에 동시에 보내는 요청 수
 
 class CacheFetcherSignals(QObject):
     finished = Signal(dict)
     error = Signal(str)
 
 class CacheFetcher(QRunnable):
-    def __init__(self):
+    def __init__(self, run_options=None):
         super().__init__()
         self.signals = CacheFetcherSignals()
+        self.run_options = run_options
     
     @Slot()
     def run(self):
         try:
-            project_id = os.getenv("PROJECT_ID")
-            location = os.getenv("LOCATION")
+            specs = load_endpoint_specs(self.run_options)
             api_key = os.getenv("GEMINI_API_KEY")
 
-            if not all([project_id, location, api_key]):
+            if not api_key or not all(project and location for project, location in specs):
                 raise ValueError(".env 파일에 PROJECT_ID, LOCATION, GEMINI_API_KEY가 모두 설정되어야 합니다.")
 
-            vertexai.init(project=project_id, location=location)
-            
+            # 캐시는 리전별 리소스이므로 설정된 모든 엔드포인트에서 목록을 모읍니다.
             caches = {}
-            for cache in caching.CachedContent.list():
-                display_name = cache.display_name if cache.display_name else os.path.basename(cache.name)
-                model_name = os.path.basename(cache.model_name)
-                caches[cache.name] = {'display_name': display_name, 'model_name': model_name}
+            for project, location in specs:
+                for cache in run_in_location(project, location, lambda: list(caching.CachedContent.list())):
+                    display_name = cache.display_name if cache.display_name else os.path.basename(cache.name)
+                    model_name = os.path.basename(cache.model_name)
+                    caches[cache.name] = {'display_name': display_name, 'model_name': model_name, 'location': location,
+                                          'expire_time': getattr(cache, 'expire_time', None), 'update_time': getattr(cache, 'update_time', None)}
             self.signals.finished.emit(caches)
         except Exception as e:
             self.signals.error.emit(f"캐시 목록 로드 실패: {e}")
@@ -107,12 +92,7 @@ class CacheDetailsFetcher(QRunnable):
     @Slot()
     def run(self):
         try:
-            project_id = os.getenv("PROJECT_ID")
-            location = os.getenv("LOCATION")
-            if not all([project_id, location]): raise ValueError(".env 설정 필요")
-            vertexai.init(project=project_id, location=location)
-
-            cache = caching.CachedContent.get(self.cache_name)
+            cache = run_for_resource(self.cache_name, lambda: caching.CachedContent.get(self.cache_name))
             self.signals.finished.emit(cache)
         except Exception as e:
             self.signals.error.emit(f"캐시 상세 정보 로드 실패: {e}")
@@ -130,12 +110,7 @@ class CacheDeleter(QRunnable):
     @Slot()
     def run(self):
         try:
-            project_id = os.getenv("PROJECT_ID"); location = os.getenv("LOCATION")
-            if not all([project_id, location]): raise ValueError(".env 설정 필요")
-            vertexai.init(project=project_id, location=location)
-            
-            cache_to_delete = caching.CachedContent(self.cache_name)
-            cache_to_delete.delete()
+            run_for_resource(self.cache_name, lambda: caching.CachedContent(self.cache_name).delete())
             self.signals.finished.emit(self.cache_name)
         except Exception as e:
             self.signals.error.emit(f"캐시 삭제 실패: {e}")
@@ -154,74 +129,170 @@ class CacheUpdater(QRunnable):
     @Slot()
     def run(self):
         try:
-            project_id = os.getenv("PROJECT_ID"); location = os.getenv("LOCATION")
-            if not all([project_id, location]): raise ValueError(".env 설정 필요")
-            vertexai.init(project=project_id, location=location)
-            cache_to_update = caching.CachedContent.get(self.cache_name)
             if not self.new_ttl:
                 raise ValueError("업데이트할 TTL 값이 없습니다.")
 
-            cache_to_update.update(ttl=self.new_ttl)
-            updated_cache = caching.CachedContent.get(self.cache_name)
+            def update():
+                caching.CachedContent.get(self.cache_name).update(ttl=self.new_ttl)
+                return caching.CachedContent.get(self.cache_name)
+            updated_cache = run_for_resource(self.cache_name, update)
             
             self.signals.finished.emit(updated_cache)
         except Exception as e:
             self.signals.error.emit(f"캐시 업데이트 실패: {e}")
 
+class BulkCacheSignals(QObject):
+    item_finished = Signal(str, bool, str) # (캐시 이름, 성공 여부, 결과 메시지)
+    finished = Signal(int, int) # (성공 수, 실패 수)
+    error = Signal(str)
+
+class BulkCacheWorker(QRunnable):
+    """여러 캐시를 한 번에 삭제('delete')하거나 TTL을 연장('extend')합니다.
+
+    vertexai 초기화는 전역 상태이므로 리전별로 한 번만 초기화하고, 그 리전의 캐시들은 최대 parallelism개씩 동시에 처리합니다.
+    """
+    def __init__(self, action, cache_names, ttl=None, parallelism=BULK_CACHE_PARALLELISM):
+        super().__init__()
+        self.signals = BulkCacheSignals()
+        self.action = action; self.cache_names = list(cache_names); self.ttl = ttl; self.parallelism = parallelism
+
+    def _apply(self, cache_name):
+        if self.action == 'delete': caching.CachedContent(cache_name).delete(); return "삭제됨"
+        cache = caching.CachedContent.get(cache_name)
+        expire_time = max(datetime.datetime.now(datetime.timezone.utc), cache.expire_time) + self.ttl # 이미 만료된 캐시는 지금부터 연장합니다.
+        cache.update(expire_time=expire_time)
+        return f"만료 시간 {expire_time.astimezone(KST).strftime('%Y-%m-%d %H:%M:%S')} (KST)"
+
+    def _run_group(self, cache_names):
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.parallelism, len(cache_names))) as executor:
+            futures = {executor.submit(self._apply, name): name for name in cache_names}
+            for future in as_completed(futures):
+                name = futures[future]
+                try: results[name] = (True, future.result())
+                except Exception as e: results[name] = (False, str(e))
+                self.signals.item_finished.emit(name, *results[name])
+        return results
+
+    @Slot()
+    def run(self):
+        groups = {}; succeeded = failed = 0
+        for name in self.cache_names: groups.setdefault(parse_resource_location(name), []).append(name)
+        for (project, location), names in groups.items():
+            if not project: project, location = os.getenv("PROJECT_ID"), os.getenv("LOCATION")
+            try:
+                if not project or not location: raise ValueError(".env 설정 필요")
+                results = run_in_location(project, location, lambda: self._run_group(names))
+            except Exception as e:
+                for name in names: self.signals.item_finished.emit(name, False, str(e))
+                failed += len(names); continue
+            ok = sum(1 for success, _ in results.values() if success); succeeded += ok; failed += len(results) - ok
+        self.signals.finished.emit(succeeded, failed)
+
 class CacheCreatorSignals(QObject):
     finished = Signal(object)
+    reused = Signal(object) # 같은 내용 해시의 기존 캐시를 재사용한 경우
     error = Signal(str)
 
 class CacheCreator(QRunnable):
-    def __init__(self, creation_data):
+    def __init__(self, creation_data, run_options=None):
         super().__init__()
         self.signals = CacheCreatorSignals()
         self.creation_data = creation_data
+        self.run_options = run_options
 
     @Slot()
     def run(self):
         try:
-            project_id = os.getenv("PROJECT_ID"); location = os.getenv("LOCATION")
+            # 새 캐시는 첫 번째 엔드포인트의 리전에 만들어지며, 이후 그 리전에서만 사용됩니다.
+            project_id, location = load_endpoint_specs(self.run_options)[0]
             if not all([project_id, location]): raise ValueError(".env 설정 필요")
-            vertexai.init(project=project_id, location=location)
-            
-            contents = [Part.from_text(self.creation_data['contents'])] if self.creation_data['contents'] else None
-
-            created_cache = caching.CachedContent.create(
-                display_name=self.creation_data['display_name'],
-                model_name=self.creation_data['model_name'],
-                system_instruction=contents,
-                ttl=self.creation_data['ttl']
-            )
+            data = self.creation_data; model_name = data['model_name']
+
+            # 파일은 조각 단위로 읽으며 내용 해시를 계산하고, 같은 해시의 캐시가 있으면 새로 만들지 않습니다.
+            plan = CachePlan(model_name, data['contents'], data.get('sources', []), data.get('include'), data.get('exclude'),
+                             chunk_chars=data.get('chunk_chars', DEFAULT_CHUNK_CHARS)).scan()
+            registry = CacheRegistry(); registry_key = CacheRegistry.key(model_name, location, plan.content_hash)
+            if data.get('reuse_existing', True):
+                existing = run_in_location(project_id, location, lambda: self._find_existing(registry, registry_key, model_name, plan.content_hash))
+                if existing: self.signals.reused.emit(existing); return
+
+            system_instruction = [Part.from_text(data['contents'])] if data['contents'] else None
+            contents = [Part.from_text(text) if text is not None else Part.from_data(data=blob, mime_type=kind)
+                        for _, text, blob, kind in plan.iter_chunks()] or None
+
+            created_cache = run_in_location(project_id, location, lambda: caching.CachedContent.create(
+                display_name=tagged_display_name(data['display_name'], plan.content_hash),
+                model_name=model_name,
+                system_instruction=system_instruction,
+                contents=contents,
+                ttl=data['ttl']
+            ))
+            registry.set(registry_key, created_cache.name)
             self.signals.finished.emit(created_cache)
         except Exception as e:
             self.signals.error.emit(f"캐시 생성 실패: {e}")
 
+    def _find_existing(self, registry, registry_key, model_name, content_hash):
+        """로컬 기록, 그다음 표시 이름의 '#해시'로 같은 내용의 살아 있는 캐시를 찾습니다."""
+        cache_name = registry.get(registry_key)
+        if cache_name:
+            try: return caching.CachedContent.get(cache_name)
+            except Exception: registry.set(registry_key, None) # 만료되었거나 삭제된 캐시
+        for cache in caching.CachedContent.list():
+            if display_name_hash(cache.display_name) == content_hash and os.path.basename(cache.model_name) == model_name:
+                registry.set(registry_key, cache.name); return cache
+        return None
+
+class OutputExtractorSignals(QObject):
+    finished = Signal(int, int)
+    error = Signal(str)
+
+class OutputExtractor(QRunnable):
+    def __init__(self, container_path, dest_folder):
+        super().__init__()
+        self.signals = OutputExtractorSignals()
+        self.container_path = container_path
+        self.dest_folder = dest_folder
+
+    @Slot()
+    def run(self):
+        try:
+            written, unchanged = extract_outputs(self.container_path, self.dest_folder)
+            self.signals.finished.emit(written, unchanged)
+        except Exception as e:
+            self.signals.error.emit(f"결과 추출 실패: {e}")
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Gemini 워크플로우 자동화 도구")
         self.setGeometry(100, 100, 1400, 900)
         
-        self.variables = {}; self.tasks = {}
+        self.variables = {}; self.tasks = {}; self.run_options = {}
         self.is_loading_state = False
         self.current_project_path = None
         self.is_dirty = False
         
-        self.thread_pool = QThreadPool(); self.current_runner = None
+        self.thread_pool = QThreadPool(); self.project_loader = None
+        # 캐시 관리 같은 관리 작업은 전용 풀에서 실행하여 긴 실행이 스레드를 모두 차지해도 밀리지 않게 합니다.
+        self.admin_pool = QThreadPool(); self.admin_pool.setMaxThreadCount(ADMIN_POOL_THREADS)
+        self.runs = {}; self._run_counter = 0; self.scheduler = GlobalScheduler.from_env(); self._watch_run_id = None
+        self.semantic_cache = None # 유사 응답 캐시는 실행 사이에 유지됩니다.
+        self.endpoint_pool = None; self._pool_specs = None # 모델 객체를 실행 사이에 재사용합니다.
+        self.watch_worker = None; self.watch_state = None; self._watch_pending = False; self._watch_reload = False; self._saved_stamp = None
+        # 기본적으로 워크플로우는 별도 작업 프로세스에서 실행합니다. (GUI 응답성 유지, SDK 충돌 격리)
+        self.process_engine = ProcessEngine(); self.process_engine.signals.log.connect(self.log)
+        # 개발자 도구: UI 멈춤 감시(기본 켜짐)와 opt-in 프로파일링
+        self.profiler = Profiler(); self.watchdog = EventLoopWatchdog(parent=self)
         
         self.var_panel = VariablePanel(); self.task_panel = TaskPanel(); self.run_panel = RunPanel()
         
-        self.variable_handler = VariableHandler(self.var_panel, self.variables, BUILT_IN_VARS)
-        self.task_handler = TaskHandler(self.task_panel, self.tasks)
+        self.reference_index = VariableReferenceIndex(); self.undo_stack = QUndoStack(self)
+        self.variable_handler = VariableHandler(self.var_panel, self.variables, BUILT_IN_VARS, self.reference_index)
+        self.task_handler = TaskHandler(self.task_panel, self.tasks, self.reference_index)
         
-        self.all_vars_model = QStandardItemModel(self)
-        self.prompt_proxy_model = VariableFilterProxyModel(self)
-        self.prompt_proxy_model.setSourceModel(self.all_vars_model)
-        self.prompt_proxy_model.set_exclude_built_in(True)
-        self.variable_proxy_model = VariableFilterProxyModel(self)
-        self.variable_proxy_model.setSourceModel(self.all_vars_model)
-        self.variable_proxy_model.set_exclude_built_in(True)
+        self.completion_index = CompletionIndex()
         
         self.highlighter_editors = []
         self.cache_manager_dialog = None 
@@ -229,27 +300,29 @@ class MainWindow(QMainWindow):
         self.setup_ui(); self.setup_menu_bar(); self.connect_signals()
         self.load_env_settings(); self.new_project()
         self.log(f"PySide6 워크플로우 자동화 도구 시작. 현재 {self.thread_pool.maxThreadCount()}개의 스레드 사용 가능.")
+        self.log(f"전역 스케줄러: {self.scheduler.describe()} (SCHEDULER_RPM, SCHEDULER_MAX_INFLIGHT)")
+        QTimer.singleShot(0, self.process_engine.start) # 첫 실행 전에 작업 프로세스를 미리 띄웁니다.
+        self.watchdog.stalled.connect(self.on_ui_stall); QTimer.singleShot(0, self.watchdog.start)
 
     def setup_ui(self):
         splitter = QSplitter(Qt.Horizontal); splitter.addWidget(self.var_panel); splitter.addWidget(self.task_panel); splitter.addWidget(self.run_panel)
         splitter.setSizes([350, 600, 450]); central_widget = QWidget(); layout = QHBoxLayout(central_widget)
         layout.addWidget(splitter); self.setCentralWidget(central_widget)
         
-        self.var_panel.value_edit.setModel(self.variable_proxy_model)
-        self.task_panel.prompt_edit.setModel(self.prompt_proxy_model)
-        self.task_panel.output_template_edit.setModel(self.all_vars_model)
+        # 변수 내용에서는 자기 자신을 참조하지 않도록 현재 변수를 후보에서 뺍니다.
+        self.var_panel.value_edit.set_completion_index(self.completion_index, built_in=False, exclude=self._current_variable_names)
+        self.task_panel.prompt_edit.set_completion_index(self.completion_index, built_in=False)
+        self.task_panel.output_template_edit.set_completion_index(self.completion_index)
         
         self.highlighter_editors.extend([
             self.var_panel.value_edit,
             self.task_panel.prompt_edit,
             self.task_panel.output_template_edit
         ])
-
-        for editor in self.highlighter_editors:
-            editor.completer().setCaseSensitivity(Qt.CaseInsensitive)
-            editor.completer().setFilterMode(Qt.MatchContains)
         
         self.run_panel.model_selector_combo.addItems(SUPPORTED_MODELS)
+        self.load_progress = QProgressBar(); self.load_progress.setMaximumWidth(200); self.load_progress.setRange(0, 100); self.load_progress.hide()
+        self.statusBar().addPermanentWidget(self.load_progress)
         
     def setup_menu_bar(self):
         menu_bar = self.menuBar()
@@ -261,17 +334,48 @@ class MainWindow(QMainWindow):
         save_as_action = QAction("Save &As...", self); save_as_action.setShortcut(QKeySequence.StandardKey.SaveAs); save_as_action.triggered.connect(self.save_as_project); file_menu.addAction(save_as_action)
         file_menu.addSeparator()
         exit_action = QAction("E&xit", self); exit_action.triggered.connect(self.close); file_menu.addAction(exit_action)
+
+        edit_menu = menu_bar.addMenu("&Edit")
+        undo_action = self.undo_stack.createUndoAction(self, "실행 취소"); undo_action.setShortcut(QKeySequence("Ctrl+Alt+Z")); edit_menu.addAction(undo_action) # 편집기의 Ctrl+Z(글자 단위 실행 취소)와 겹치지 않도록 Ctrl+Alt를 씁니다.
+        redo_action = self.undo_stack.createRedoAction(self, "다시 실행"); redo_action.setShortcut(QKeySequence("Ctrl+Alt+Y")); edit_menu.addAction(redo_action)
+        edit_menu.addSeparator()
+        find_usages_action = QAction("변수 사용처 찾기...", self); find_usages_action.setShortcut(QKeySequence("Ctrl+Shift+U")); find_usages_action.triggered.connect(self.find_variable_usages); edit_menu.addAction(find_usages_action)
+        rename_action = QAction("변수 이름 바꾸기 (참조 포함)...", self); rename_action.setShortcut(QKeySequence("Ctrl+Shift+R")); rename_action.triggered.connect(self.rename_variable_action); edit_menu.addAction(rename_action)
         
         tools_menu = menu_bar.addMenu("&Tools")
         cache_manager_action = QAction("Context Cache 관리...", self)
         cache_manager_action.triggered.connect(self.open_cache_manager)
         tools_menu.addAction(cache_manager_action)
+        run_options_action = QAction("실행 옵션...", self)
+        run_options_action.triggered.connect(self.open_run_options)
+        tools_menu.addAction(run_options_action)
+        extract_outputs_action = QAction("결과 컨테이너 풀기...", self)
+        extract_outputs_action.triggered.connect(self.extract_output_container)
+        tools_menu.addAction(extract_outputs_action)
+        tools_menu.addSeparator()
+        self.watch_action = QAction("감시 모드 (파일이 바뀌면 영향받는 태스크 재실행)", self); self.watch_action.setCheckable(True)
+        self.watch_action.toggled.connect(self.toggle_watch_mode)
+        tools_menu.addAction(self.watch_action)
+
+        dev_menu = menu_bar.addMenu("&Developer")
+        self.watchdog_action = QAction(f"UI 멈춤 감시 ({self.watchdog.threshold_ms} ms 이상, GUI 스레드 스택 기록)", self)
+        self.watchdog_action.setCheckable(True); self.watchdog_action.setChecked(True)
+        self.watchdog_action.toggled.connect(lambda checked: self.watchdog.start() if checked else self.watchdog.stop()); dev_menu.addAction(self.watchdog_action)
+        cpu_profile_action = QAction("CPU 프로파일링 (cProfile)", self); cpu_profile_action.setCheckable(True)
+        cpu_profile_action.toggled.connect(self.profiler.set_cpu); dev_menu.addAction(cpu_profile_action)
+        memory_profile_action = QAction("메모리 추적 (tracemalloc)", self); memory_profile_action.setCheckable(True)
+        memory_profile_action.toggled.connect(self.profiler.set_memory); dev_menu.addAction(memory_profile_action)
+        dev_menu.addSeparator()
+        dump_action = QAction("프로파일 저장 후 폴더 열기", self); dump_action.triggered.connect(self.dump_profiles); dev_menu.addAction(dump_action)
+        reset_action = QAction("프로파일 초기화", self)
+        reset_action.triggered.connect(self.reset_profiles); dev_menu.addAction(reset_action)
         
     def connect_signals(self):
         self.variable_handler.connect_signals(); self.task_handler.connect_signals()
         self.variable_handler.signals.state_changed.connect(self.mark_as_dirty)
         self.variable_handler.signals.variables_updated.connect(self.update_completer_model_and_filter)
         self.variable_handler.signals.log_message.connect(self.log)
+        self.variable_handler.signals.rename_requested.connect(self.rename_variable_with_references)
         self.task_handler.signals.state_changed.connect(self.mark_as_dirty)
         self.task_handler.signals.log_message.connect(self.log)
         
@@ -284,6 +388,8 @@ class MainWindow(QMainWindow):
             else: widget.editingFinished.connect(self.mark_as_dirty)
             
         self.run_panel.run_btn.clicked.connect(self.start_execution); self.run_panel.stop_btn.clicked.connect(self.stop_execution)
+        self.run_panel.runs_list.stop_requested.connect(self.stop_run)
+        self.run_panel.runs_list.priority_changed.connect(self.set_run_priority)
         self.run_panel.clear_log_btn.clicked.connect(self.clear_log)
         self.run_panel.select_folder_btn.clicked.connect(lambda: self.select_folder_for(self.run_panel.output_folder_edit))
         self.run_panel.open_output_folder_btn.clicked.connect(self.open_output_folder)
@@ -304,7 +410,8 @@ class MainWindow(QMainWindow):
     @Slot()
     def open_cache_manager(self):
         if not self.cache_manager_dialog:
-            self.cache_manager_dialog = CacheManagerDialog(SUPPORTED_MODELS, self)
+            self.cache_manager_dialog = CacheManagerDialog(SUPPORTED_MODELS, self, in_use=self._caches_in_use)
+            self.cache_manager_dialog.bulk_requested.connect(self.run_bulk_cache_action)
             self.cache_manager_dialog.refresh_requested.connect(self.refresh_caches_for_manager)
             self.cache_manager_dialog.details_requested.connect(self.fetch_cache_details)
             self.cache_manager_dialog.delete_requested.connect(self.delete_cache)
@@ -313,19 +420,44 @@ class MainWindow(QMainWindow):
         
         self.cache_manager_dialog.exec()
 
+    def _has_endpoint_settings(self):
+        try: return all(project and location for project, location in load_endpoint_specs(self.run_options))
+        except ValueError: return False
+
+    @Slot()
+    def open_run_options(self):
+        dialog = RunOptionsDialog(self.run_options, SUPPORTED_MODELS, self)
+        if dialog.exec():
+            new_options = dialog.get_options()
+            if new_options != self.run_options:
+                self.run_options = new_options; self.log("실행 옵션이 변경되었습니다."); self.mark_as_dirty()
+
+    @Slot()
+    def extract_output_container(self):
+        start_folder = self.run_panel.output_folder_edit.text()
+        path, _ = QFileDialog.getOpenFileName(self, "결과 컨테이너 선택", start_folder,
+                                              "Output Containers (*.zip *.tar *.jsonl *.sqlite *.db);;All Files (*)")
+        if not path: return
+        dest_folder = QFileDialog.getExistingDirectory(self, "파일을 풀 폴더 선택", os.path.dirname(path))
+        if not dest_folder: return
+        self.log(f"'{os.path.basename(path)}'의 결과를 '{dest_folder}'에 푸는 중...")
+        worker = OutputExtractor(path, dest_folder)
+        worker.signals.finished.connect(lambda written, unchanged: self.log(f"결과 {written}개를 파일로 풀었습니다. (변경 없음 {unchanged}개)"))
+        worker.signals.error.connect(lambda e: (self.log(e, "ERROR"), QMessageBox.critical(self, "결과 추출 오류", e)))
+        self.admin_pool.start(worker)
+
     def _execute_cache_task(self, task_name, worker):
         self.log(f"관리자: {task_name}...")
         if self.cache_manager_dialog:
             self.cache_manager_dialog.set_controls_enabled(False)
         worker.signals.error.connect(self.on_cache_action_error)
-        self.thread_pool.start(worker)
+        self.admin_pool.start(worker)
 
     @Slot()
     def refresh_caches_for_manager(self):
-        project_id = os.getenv("PROJECT_ID"); location = os.getenv("LOCATION")
-        if not project_id or not location:
+        if not self._has_endpoint_settings():
             QMessageBox.warning(self, "환경 변수 오류", ".env 파일에 PROJECT_ID와 LOCATION을 설정해야 합니다."); return
-        fetcher = CacheFetcher()
+        fetcher = CacheFetcher(self.run_options)
         fetcher.signals.finished.connect(self.on_manager_caches_fetched)
         self._execute_cache_task("캐시 목록 로드 중", fetcher)
 
@@ -358,10 +490,30 @@ class MainWindow(QMainWindow):
         updater.signals.finished.connect(self.on_cache_updated)
         self._execute_cache_task(f"'{os.path.basename(cache_name)}' 캐시 TTL 업데이트 중", updater)
         
+    def _caches_in_use(self):
+        cache_data = self.run_panel.cache_selector_combo.currentData()
+        return {cache_data['name']} if cache_data else set()
+
+    @Slot(str, list, object)
+    def run_bulk_cache_action(self, action, cache_names, ttl):
+        worker = BulkCacheWorker(action, cache_names, ttl)
+        label = "삭제" if action == 'delete' else "TTL 연장"
+        worker.signals.item_finished.connect(self.cache_manager_dialog.on_bulk_item_finished)
+        worker.signals.finished.connect(lambda succeeded, failed: self.on_bulk_cache_action_finished(label, succeeded, failed))
+        self.cache_manager_dialog.start_bulk_report(label, cache_names)
+        self._execute_cache_task(f"캐시 {len(cache_names)}개 {label} 중", worker)
+
+    def on_bulk_cache_action_finished(self, label, succeeded, failed):
+        self.log_record(f"관리자: 캐시 {label} 완료 (성공 {succeeded}개, 실패 {failed}개)", "WARNING" if failed else "INFO", "")
+        if self.cache_manager_dialog: self.cache_manager_dialog.finish_bulk_report(succeeded, failed)
+        # 항목마다 다시 불러오지 않고 끝난 뒤 한 번만 목록을 갱신합니다.
+        self.refresh_caches_for_manager(); self.refresh_caches()
+
     @Slot(dict)
     def create_cache(self, creation_data):
-        creator = CacheCreator(creation_data)
+        creator = CacheCreator(creation_data, self.run_options)
         creator.signals.finished.connect(self.on_cache_created)
+        creator.signals.reused.connect(self.on_cache_reused)
         self._execute_cache_task(f"'{creation_data['display_name']}' 캐시 생성 중", creator)
 
     @Slot(object)
@@ -370,6 +522,12 @@ class MainWindow(QMainWindow):
         self.refresh_caches_for_manager()
         self.refresh_caches()
         
+    @Slot(object)
+    def on_cache_reused(self, existing_cache):
+        self.log(f"관리자: 같은 내용의 캐시 '{existing_cache.display_name}'가 이미 있어 새로 만들지 않고 재사용합니다.")
+        self.refresh_caches_for_manager()
+        self.refresh_caches()
+
     @Slot(object)
     def on_cache_updated(self, updated_cache_object):
         self.log(f"관리자: 캐시가 성공적으로 업데이트되었습니다.")
@@ -384,19 +542,18 @@ class MainWindow(QMainWindow):
 
     @Slot(str)
     def on_cache_action_error(self, error_msg):
-        self.log(error_msg); QMessageBox.critical(self, "캐시 작업 오류", error_msg)
+        self.log(error_msg, "ERROR"); QMessageBox.critical(self, "캐시 작업 오류", error_msg)
         if self.cache_manager_dialog:
             self.cache_manager_dialog.show_error(error_msg)
         
     @Slot()
     def refresh_caches(self):
-        project_id = os.getenv("PROJECT_ID"); location = os.getenv("LOCATION")
-        if not project_id or not location:
+        if not self._has_endpoint_settings():
             if self.isVisible(): QMessageBox.warning(self, "환경 변수 오류", ".env 파일에 PROJECT_ID와 LOCATION을 설정해야 합니다.")
             return
         self.log("캐시 목록을 불러오는 중..."); self.run_panel.refresh_cache_btn.setEnabled(False)
-        fetcher = CacheFetcher(); fetcher.signals.finished.connect(self.on_caches_fetched)
-        fetcher.signals.error.connect(self.on_main_cache_fetch_error); self.thread_pool.start(fetcher)
+        fetcher = CacheFetcher(self.run_options); fetcher.signals.finished.connect(self.on_caches_fetched)
+        fetcher.signals.error.connect(self.on_main_cache_fetch_error); self.admin_pool.start(fetcher)
         
     @Slot(dict)
     def on_caches_fetched(self, caches):
@@ -404,18 +561,19 @@ class MainWindow(QMainWindow):
         combo = self.run_panel.cache_selector_combo; combo.blockSignals(True)
         current_selection = combo.currentData(); combo.clear()
         combo.addItem("(캐시 사용 안 함)", None)
+        multi_location = len({data.get('location') for data in caches.values()}) > 1
         for name, data in sorted(caches.items(), key=lambda item: item[1]['display_name']):
-            display_text = f"{data['display_name']} ({data['model_name']})"
+            display_text = f"{data['display_name']} ({data['model_name']}, {data['location']})" if multi_location else f"{data['display_name']} ({data['model_name']})"
             combo.addItem(display_text, {'name': name, 'model': data['model_name']})
         if current_selection:
             index = combo.findData(current_selection)
             if index != -1: combo.setCurrentIndex(index)
-            else: self.log(f"경고: 이전에 선택했던 캐시 '{current_selection.get('name')}'를 찾을 수 없습니다.")
+            else: self.log(f"경고: 이전에 선택했던 캐시 '{current_selection.get('name')}'를 찾을 수 없습니다.", "WARNING")
         combo.blockSignals(False); self.on_cache_selected(combo.currentIndex())
         
     @Slot(str)
     def on_main_cache_fetch_error(self, error_msg):
-        self.log(error_msg); 
+        self.log(error_msg, "ERROR")
         if self.isVisible(): QMessageBox.critical(self, "캐시 로드 오류", error_msg)
         self.run_panel.refresh_cache_btn.setEnabled(True)
         
@@ -458,8 +616,11 @@ class MainWindow(QMainWindow):
         if self.check_before_proceed("새 프로젝트 생성"): self.new_project()
         
     def new_project(self):
+        self._cancel_project_load()
+        if not self._watch_reload: self.watch_action.setChecked(False) # 감시 모드의 다시 불러오기는 감시를 유지합니다.
         self.is_loading_state = True; self.variable_handler.is_loading = True; self.task_handler.is_loading = True
         self.var_panel.list_widget.clear(); self.variables.clear(); self.task_panel.list_widget.clear(); self.tasks.clear()
+        self.run_options = {}; self.reference_index.clear(); self.undo_stack.clear(); self.semantic_cache = None
         self.run_panel.cache_selector_combo.clear()
         self.task_handler.on_task_selected(None, None); self.variable_handler.on_var_selected(None, None)
         self.current_project_path = None; self.is_dirty = False; self.update_window_title(); self.update_completer_model_and_filter()
@@ -484,7 +645,9 @@ class MainWindow(QMainWindow):
         if path: self.current_project_path = path; return self.save_state(path)
         return False
         
+    @profiled('save_state')
     def save_state(self, path):
+        if self._is_project_loading("저장"): return False
         try:
             var_order_ids = [self.var_panel.list_widget.item(i).data(Qt.UserRole) for i in range(self.var_panel.list_widget.count())]
             task_order_ids = [self.task_panel.list_widget.item(i).data(Qt.UserRole) for i in range(self.task_panel.list_widget.count())]
@@ -494,35 +657,76 @@ class MainWindow(QMainWindow):
                 'tasks': [self.tasks[task_id].to_dict() for task_id in task_order_ids if task_id in self.tasks],
                 'settings': { 'model_name': self.run_panel.model_selector_combo.currentText(), 'context_cache': cache_data, 
                               'output_folder': self.run_panel.output_folder_edit.text(), 'output_extension': self.run_panel.output_ext_edit.text(), 
-                              'log_folder': self.run_panel.log_folder_edit.text() 
+                              'log_folder': self.run_panel.log_folder_edit.text(), 'run_options': self.run_options
                 }}
             with open(path, 'w', encoding='utf-8') as f: json.dump(state_data, f, indent=4, ensure_ascii=False)
+            self._saved_stamp = self._file_stamp(path)
             self.is_dirty = False; self.update_window_title(); self.log(f"프로젝트 '{os.path.basename(path)}'가 저장되었습니다."); return True
         except Exception as e:
-            self.log(f"프로젝트 저장 실패: {e}"); QMessageBox.critical(self, "저장 오류", f"프로젝트를 저장하는 중 오류가 발생했습니다:\n{e}"); return False
+            self.log(f"프로젝트 저장 실패: {e}", "ERROR"); QMessageBox.critical(self, "저장 오류", f"프로젝트를 저장하는 중 오류가 발생했습니다:\n{e}"); return False
             
+    @profiled('load_state')
     def load_state(self, path):
+        """프로젝트 파일을 작업 스레드에서 스트리밍으로 읽고, 도착한 묶음부터 목록에 추가합니다.
+
+        먼저 도착한 변수/태스크는 나머지를 읽는 동안에도 바로 편집할 수 있습니다. 저장과 실행은 다 읽은 뒤에 가능합니다.
+        """
+        self.new_project(); self.current_project_path = path; self.update_window_title()
+        loader = ProjectLoader(path, BUILT_IN_VARS); self.project_loader = loader
+        loader.signals.variables_batch.connect(lambda items: self.on_variables_loaded(loader, items))
+        loader.signals.tasks_batch.connect(lambda items: self.on_tasks_loaded(loader, items))
+        loader.signals.settings_loaded.connect(lambda settings: self.on_settings_loaded(loader, settings))
+        loader.signals.progress.connect(lambda percent: self.on_load_progress(loader, percent))
+        loader.signals.finished.connect(lambda loaded_path: self.on_project_loaded(loader, loaded_path))
+        loader.signals.error.connect(lambda error_msg: self.on_project_load_error(loader, error_msg))
+        self.load_progress.setValue(0); self.load_progress.show(); self.statusBar().showMessage(f"'{os.path.basename(path)}' 불러오는 중...")
+        self.log(f"프로젝트 '{os.path.basename(path)}'를 불러오는 중..."); self.admin_pool.start(loader)
+
+    def _cancel_project_load(self):
+        if self.project_loader: self.project_loader.cancel(); self.project_loader = None
+        self.load_progress.hide(); self.statusBar().clearMessage()
+
+    def _append_loaded_items(self, list_widget, handler, make_item, items):
+        # 묶음 단위로 화면 갱신과 항목 변경 시그널을 멈춘 채 추가하여 항목마다 다시 그리지 않습니다.
+        handler.is_loading = True; list_widget.setUpdatesEnabled(False); list_widget.blockSignals(True)
+        try:
+            for obj in items: list_widget.addItem(make_item(obj))
+        finally:
+            list_widget.blockSignals(False); list_widget.setUpdatesEnabled(True); handler.is_loading = False
+
+    def _make_variable_item(self, var):
+        self.variables[var.id] = var; self.reference_index.index_variable(var)
+        item = QListWidgetItem(var.name); item.setData(Qt.UserRole, var.id); item.setFlags(item.flags() | Qt.ItemIsEditable)
+        return item
+
+    def _make_task_item(self, task):
+        self.tasks[task.id] = task; self.reference_index.index_task(task)
+        item = QListWidgetItem(task.name); item.setData(Qt.UserRole, task.id)
+        item.setFlags(item.flags() | Qt.ItemIsEditable | Qt.ItemIsUserCheckable)
+        item.setCheckState(Qt.Checked if task.enabled else Qt.Unchecked)
+        return item
+
+    @profiled('load_state.variables_batch')
+    def on_variables_loaded(self, loader, variables):
+        if loader is not self.project_loader: return
+        first_batch = not self.variables
+        self._append_loaded_items(self.var_panel.list_widget, self.variable_handler, self._make_variable_item, variables)
+        # 자동 완성 목록은 첫 묶음과 마지막에만 다시 만듭니다.
+        if first_batch: self.update_completer_model_and_filter()
+
+    @profiled('load_state.tasks_batch')
+    def on_tasks_loaded(self, loader, tasks):
+        if loader is not self.project_loader: return
+        self._append_loaded_items(self.task_panel.list_widget, self.task_handler, self._make_task_item, tasks)
+
+    def on_settings_loaded(self, loader, settings):
+        if loader is not self.project_loader: return
+        self.is_loading_state = True
         try:
-            with open(path, 'r', encoding='utf-8') as f: state_data = json.load(f)
-            self.new_project()
-            self.is_loading_state = True; self.variable_handler.is_loading = True; self.task_handler.is_loading = True
-            for var_data in state_data.get('variables', []):
-                if var_data.get('name', '').upper() in BUILT_IN_VARS: continue
-                var = Variable(id=var_data.get('id'), name=var_data.get('name'), value=var_data.get('value'))
-                if not var.id or not var.name: continue
-                self.variables[var.id] = var; item = QListWidgetItem(var.name); item.setData(Qt.UserRole, var.id)
-                item.setFlags(item.flags() | Qt.ItemIsEditable); self.var_panel.list_widget.addItem(item)
-            for task_data in state_data.get('tasks', []):
-                task = Task(id=task_data.get('id'), name=task_data.get('name'), prompt=task_data.get('prompt'), 
-                            enabled=task_data.get('enabled', True), output_template=task_data.get('output_template', ''))
-                if not task.id or not task.name: continue
-                self.tasks[task.id] = task; item = QListWidgetItem(task.name); item.setData(Qt.UserRole, task.id)
-                item.setFlags(item.flags() | Qt.ItemIsEditable | Qt.ItemIsUserCheckable)
-                item.setCheckState(Qt.Checked if task.enabled else Qt.Unchecked); self.task_panel.list_widget.addItem(item)
-            settings = state_data.get('settings', {}); 
             self.run_panel.output_folder_edit.setText(settings.get('output_folder', os.path.join(os.getcwd(), "output_pyside")))
             self.run_panel.output_ext_edit.setText(settings.get('output_extension', '.md'))
             self.run_panel.log_folder_edit.setText(settings.get('log_folder', ''))
+            self.run_options = settings.get('run_options', {})
             cache_data = settings.get('context_cache')
             if cache_data and cache_data.get('name'):
                 combo = self.run_panel.cache_selector_combo; combo.blockSignals(True)
@@ -534,73 +738,257 @@ class MainWindow(QMainWindow):
             else:
                 default_model = SUPPORTED_MODELS[0] if SUPPORTED_MODELS else ""
                 self.run_panel.model_selector_combo.setCurrentText(settings.get('model_name', default_model))
-            self.current_project_path = path; self.is_dirty = False
-            self.update_window_title(); self.update_completer_model_and_filter()
-            self.log(f"프로젝트 '{os.path.basename(path)}'를 불러왔습니다."); self.refresh_caches()
-        except Exception as e:
-            self.new_project(); QMessageBox.critical(self, "프로젝트 열기 오류", f"'{os.path.basename(path)}' 파일을 불러오는 중 오류가 발생했습니다:\n{e}")
-        finally: 
-            self.is_loading_state = False; self.variable_handler.is_loading = False; self.task_handler.is_loading = False
-            
+        finally: self.is_loading_state = False
+
+    def on_load_progress(self, loader, percent):
+        if loader is self.project_loader: self.load_progress.setValue(percent)
+
+    def on_project_loaded(self, loader, path):
+        if loader is not self.project_loader: return
+        self.project_loader = None; self.load_progress.hide(); self.statusBar().clearMessage()
+        # 불러오는 동안 사용자가 편집했다면 변경 표시(is_dirty)를 그대로 둡니다.
+        self.update_window_title(); self.update_completer_model_and_filter()
+        self.log(f"프로젝트 '{os.path.basename(path)}'를 불러왔습니다. (변수 {len(self.variables)}개, 태스크 {len(self.tasks)}개)"); self.refresh_caches()
+        self._saved_stamp = self._file_stamp(path)
+        if self._watch_reload: self._watch_reload = False; self._run_watch_cycle()
+
+    def on_project_load_error(self, loader, error_msg):
+        if loader is not self.project_loader: return
+        path = self.current_project_path or ""; self._watch_reload = False
+        self.new_project(); QMessageBox.critical(self, "프로젝트 열기 오류", f"'{os.path.basename(path)}' 파일을 불러오는 중 오류가 발생했습니다:\n{error_msg}")
+
+    def _is_project_loading(self, action_name):
+        if not self.project_loader: return False
+        QMessageBox.information(self, action_name, "프로젝트를 불러오는 중입니다. 불러오기가 끝난 뒤 다시 시도하세요."); return True
+
     def closeEvent(self, event):
-        if self.check_before_proceed("프로그램 종료"): event.accept()
+        if self.check_before_proceed("프로그램 종료"): self._cancel_project_load(); self._stop_watch_worker(); self.stop_execution(); self.process_engine.shutdown(); event.accept()
         else: event.ignore()
 
+    def _current_variable(self):
+        item = self.var_panel.list_widget.currentItem()
+        return self.variables.get(item.data(Qt.UserRole)) if item else None
+
+    @Slot()
+    def find_variable_usages(self):
+        var = self._current_variable()
+        if not var: QMessageBox.information(self, "변수 사용처", "먼저 변수를 선택하세요."); return
+        dialog = FindUsagesDialog(var, self.reference_index.usages(var.name), self.variables, self.tasks, self)
+        dialog.navigate_requested.connect(self.navigate_to)
+        dialog.rename_requested.connect(lambda var_id: self.rename_variable_action())
+        dialog.exec()
+
+    @Slot()
+    def rename_variable_action(self):
+        var = self._current_variable()
+        if not var: QMessageBox.information(self, "변수 이름 바꾸기", "먼저 변수를 선택하세요."); return
+        new_name, ok = QInputDialog.getText(self, "변수 이름 바꾸기", f"'{var.name}'의 새 이름 (모든 참조가 함께 바뀝니다):", text=var.name)
+        new_name = new_name.strip()
+        if not ok or not new_name or new_name == var.name: return
+        if self.variable_handler.is_valid_name(new_name, var.id): self.rename_variable_with_references(var.id, new_name)
+
+    @Slot(str, str)
+    def rename_variable_with_references(self, var_id, new_name):
+        var = self.variables.get(var_id)
+        if not var: return
+        self.undo_stack.push(RenameVariableCommand(var, new_name, self.variables, self.tasks, self.reference_index, self.on_rename_applied))
+
+    def on_rename_applied(self, command):
+        """이름 변경 명령이 적용/취소된 뒤, 영향받은 항목만 화면에 반영하고 상태 변경을 한 번만 알립니다."""
+        renamed_tasks = {owner.id for owner, field in command.affected('task') if field == 'name'}
+        self.variable_handler.is_loading = True; self.task_handler.is_loading = True
+        var_list = self.var_panel.list_widget; var_list.blockSignals(True)
+        for i in range(var_list.count()):
+            if var_list.item(i).data(Qt.UserRole) == command.var.id: var_list.item(i).setText(command.var.name)
+        var_list.blockSignals(False)
+        if renamed_tasks:
+            task_list = self.task_panel.list_widget; task_list.blockSignals(True)
+            for i in range(task_list.count()):
+                task_id = task_list.item(i).data(Qt.UserRole)
+                if task_id in renamed_tasks: task_list.item(i).setText(self.tasks[task_id].name)
+            task_list.blockSignals(False)
+        self.variable_handler.is_loading = False; self.task_handler.is_loading = False
+        # 현재 편집 중인 항목의 편집기 내용을 새 텍스트로 다시 불러옵니다.
+        self.variable_handler.on_var_selected(var_list.currentItem(), None)
+        self.task_handler.on_task_selected(self.task_panel.list_widget.currentItem(), None)
+        self.update_completer_model_and_filter()
+        self.log(f"{command.text()} (참조 {len(command.edits)}곳 수정)"); self.mark_as_dirty()
+
+    @Slot(str, str)
+    def navigate_to(self, kind, owner_id):
+        list_widget = self.task_panel.list_widget if kind == 'task' else self.var_panel.list_widget
+        for i in range(list_widget.count()):
+            if list_widget.item(i).data(Qt.UserRole) == owner_id: list_widget.setCurrentRow(i); list_widget.scrollToItem(list_widget.item(i)); return
+
+    @profiled('update_completer_model_and_filter')
     def update_completer_model_and_filter(self):
-        self.all_vars_model.clear(); valid_var_names = BUILT_IN_VARS.copy()
-        for var in self.variables.values(): valid_var_names.add(var.name)
-        for var_name in sorted(list(BUILT_IN_VARS)):
-            item = QStandardItem(var_name); item.setData(QColor("#4a90e2"), Qt.ForegroundRole)
-            item.setToolTip(f"내장 변수: {var_name}"); item.setData('built-in', VAR_TYPE_ROLE); self.all_vars_model.appendRow(item)
-        for var in sorted(self.variables.values(), key=lambda v: v.name):
-            item = QStandardItem(var.name); item.setData('user', VAR_TYPE_ROLE); self.all_vars_model.appendRow(item)
-        self.update_variable_completer_filter()
+        kinds = {var.name: 'user' for var in self.variables.values()}; kinds.update((var_name, 'built-in') for var_name in BUILT_IN_VARS)
+        self.completion_index.sync(kinds) # 바뀐 이름만 색인에 더하고 뺍니다.
+        valid_var_names = set(kinds)
         for editor in self.highlighter_editors: editor.highlighter.set_valid_variables(valid_var_names)
-        
-    def update_variable_completer_filter(self):
+
+    def _current_variable_names(self):
         current_item = self.var_panel.list_widget.currentItem()
-        if current_item: self.variable_proxy_model.set_exclude_name(current_item.text())
-        else: self.variable_proxy_model.set_exclude_name("")
+        return (current_item.text(),) if current_item else ()
         
     @Slot(str)
-    def log(self, message): self.run_panel.log_viewer.append(message)
+    @Slot(str, str)
+    def log(self, message, level="INFO"): self.run_panel.log_viewer.append(message, level)
+
+    @Slot(str, str, str)
+    def log_record(self, message, level, task): self.run_panel.log_viewer.append(message, level, task)
     
     @Slot()
     def clear_log(self): self.run_panel.log_viewer.clear(); self.log("로그가 삭제되었습니다.")
     
-    def set_ui_enabled(self, enabled):
-        self.var_panel.setEnabled(enabled); self.task_panel.setEnabled(enabled)
-        for widget in [self.run_panel.api_key_edit, self.run_panel.output_folder_edit, self.run_panel.select_folder_btn, 
-                       self.run_panel.open_output_folder_btn, self.run_panel.output_ext_edit, self.run_panel.log_folder_edit, 
-                       self.run_panel.select_log_folder_btn, self.run_panel.open_log_folder_btn, self.run_panel.clear_log_btn, 
-                       self.run_panel.cache_selector_combo, self.run_panel.refresh_cache_btn, self.run_panel.model_selector_combo]:
-            widget.setEnabled(enabled)
-        if enabled: self.run_panel.run_btn.show(); self.run_panel.stop_btn.hide()
-        else: self.run_panel.run_btn.hide(); self.run_panel.stop_btn.show()
-        if self.run_panel.cache_selector_combo.currentData(): self.run_panel.model_selector_combo.setEnabled(False)
-        
+    def _update_run_controls(self):
+        # 실행 중에도 편집과 다른 실행 시작이 가능합니다. (실행기는 시작 시점의 변수/태스크 스냅샷을 사용)
+        if self.runs: self.run_panel.stop_btn.show()
+        else: self.run_panel.stop_btn.hide()
+
+    def _ordered_tasks(self, checked_only=False):
+        items = (self.task_panel.list_widget.item(i) for i in range(self.task_panel.list_widget.count()))
+        return [self.tasks[item.data(Qt.UserRole)] for item in items
+                if item.data(Qt.UserRole) in self.tasks and (not checked_only or item.checkState() == Qt.Checked)]
+
+    def _warm_endpoint_pool(self):
+        try: specs = load_endpoint_specs(self.run_options)
+        except ValueError: return None # 설정 오류는 실행기에서 보고합니다.
+        if self.endpoint_pool is None or specs != self._pool_specs: self.endpoint_pool = EndpointPool(specs); self._pool_specs = specs
+        return self.endpoint_pool
+
     def start_execution(self):
+        if self._is_project_loading("실행"): return
+        tasks_to_run = self._ordered_tasks(checked_only=True)
+        if not tasks_to_run: QMessageBox.warning(self, "오류", "실행할 활성화된 태스크가 없습니다."); return
+        self._start_runner(tasks_to_run)
+
+    @profiled('start_run')
+    def _start_runner(self, tasks_to_run):
         api_key = self.run_panel.api_key_edit.text()
         if not api_key: QMessageBox.warning(self, "오류", "Gemini API 키를 입력해주세요."); return
         cache_data = self.run_panel.cache_selector_combo.currentData()
         cache_name = cache_data['name'] if cache_data else None
         model_name = self.run_panel.model_selector_combo.currentText()
-        tasks_to_run = [self.tasks[self.task_panel.list_widget.item(i).data(Qt.UserRole)] 
-                        for i in range(self.task_panel.list_widget.count()) if self.task_panel.list_widget.item(i).checkState() == Qt.Checked]
-        if not tasks_to_run: QMessageBox.warning(self, "오류", "실행할 활성화된 태스크가 없습니다."); return
-        self.set_ui_enabled(False)
-        self.current_runner = TaskRunner(api_key=api_key, model_name=model_name, variables=self.variables, 
-                                       tasks_in_order=tasks_to_run, output_folder=self.run_panel.output_folder_edit.text(),
-                                       output_extension=self.run_panel.output_ext_edit.text(), log_folder=self.run_panel.log_folder_edit.text(),
-                                       cached_content_name=cache_name)
-        self.current_runner.signals.log_message.connect(self.log)
-        self.current_runner.signals.error.connect(lambda e: QMessageBox.critical(self, "실행 오류", str(e)))
-        self.current_runner.signals.finished.connect(self.on_execution_finished); self.thread_pool.start(self.current_runner)
-        
+        semantic_options = self.run_options.get('semantic_cache') or {}
+        if semantic_options.get('enabled'):
+            capacity = int(semantic_options.get('capacity', DEFAULT_CAPACITY))
+            if self.semantic_cache is None or self.semantic_cache.capacity != capacity: self.semantic_cache = SemanticResponseCache(capacity)
+        self._run_counter += 1; title = f"실행 {self._run_counter}"; priority = self.run_panel.priority_combo.currentData()
+        # 프로파일링이 켜져 있으면 실행 전체를 작업 프로세스/스레드에서 측정하여 프로파일 폴더에 남깁니다.
+        profile = {'dir': self.profiler.worker_dir(), 'memory': self.profiler.memory_enabled} if self.profiler.enabled else None
+        if self.run_options.get('execution_backend', 'process') == 'process':
+            # 작업 프로세스에는 현재 변수/태스크의 사본을 보내므로 실행 중 편집과 자연히 분리됩니다.
+            settings = {'model_name': model_name, 'context_cache': {'name': cache_name} if cache_name else None,
+                        'output_folder': self.run_panel.output_folder_edit.text(), 'output_extension': self.run_panel.output_ext_edit.text(),
+                        'log_folder': self.run_panel.log_folder_edit.text(), 'run_options': self.run_options}
+            try: runner = self.process_engine.submit(run_payload(api_key, self.variables, tasks_to_run, settings, priority, profile), uuid.uuid4().hex[:12])
+            except RuntimeError as e: QMessageBox.critical(self, "실행 오류", str(e)); return
+        else:
+            runner = TaskRunner(api_key=api_key, model_name=model_name, variables=self.variables, 
+                                tasks_in_order=tasks_to_run, output_folder=self.run_panel.output_folder_edit.text(),
+                                output_extension=self.run_panel.output_ext_edit.text(), log_folder=self.run_panel.log_folder_edit.text(),
+                                cached_content_name=cache_name, run_options=self.run_options, semantic_cache=self.semantic_cache,
+                                endpoint_pool=self._warm_endpoint_pool(), scheduler=self.scheduler, priority=priority)
+        run_id = runner.run_id; self.runs[run_id] = runner
+        # 여러 실행이 함께 돌 때는 로그 앞에 실행 이름을 붙여 구분합니다.
+        runner.signals.log_record.connect(lambda message, level, task: self.log_record(f"[{title}] {message}" if len(self.runs) > 1 else message, level, task))
+        runner.signals.error.connect(lambda e: QMessageBox.critical(self, "실행 오류", f"[{title}] {e}"))
+        runner.signals.progress.connect(lambda done, total: self.run_panel.runs_list.set_progress(run_id, done, total))
+        runner.signals.finished.connect(lambda: self.on_execution_finished(run_id))
+        self.run_panel.runs_list.add_run(run_id, f"{title} ({len(tasks_to_run)}개 태스크)", priority); self._update_run_controls()
+        if len(self.runs) > 1: self.log(f"[{title}] 다른 실행 {len(self.runs) - 1}개와 함께 실행합니다. (우선순위: {PRIORITY_LABELS[priority]})")
+        if isinstance(runner, RemoteRun): pass
+        elif profile: self.thread_pool.start(lambda: profile_to_file(runner, os.path.join(profile['dir'], f"run_{run_id}.prof"), profile['memory']))
+        else: self.thread_pool.start(runner)
+        return run_id
+
+    @Slot(float, str)
+    def on_ui_stall(self, ms, stack):
+        tail = format_stack_tail(stack)
+        self.log_record(f"🐢 UI가 {ms:.0f} ms 동안 응답하지 않았습니다." + (f" 멈춘 위치:\n{tail}" if tail else ""), 'WARNING', "")
+
+    @Slot()
+    def reset_profiles(self): self.profiler.reset(); self.watchdog.stalls.clear(); self.log("프로파일을 초기화했습니다.")
+
+    @Slot()
+    def dump_profiles(self):
+        try: folder = self.profiler.dump(self.watchdog)
+        except OSError as e: QMessageBox.critical(self, "오류", f"프로파일을 저장하지 못했습니다:\n{e}"); return
+        if not self.profiler.enabled: self.log("ℹ 프로파일링이 꺼져 있어 UI 멈춤 기록만 저장했습니다. (Developer 메뉴에서 켤 수 있습니다)")
+        self.log(f"🧪 프로파일을 저장했습니다: {folder}"); self._open_folder_at_path(folder)
+
+    @Slot(str, str)
+    def set_run_priority(self, run_id, priority):
+        if isinstance(self.runs.get(run_id), RemoteRun): self.process_engine.set_priority(run_id, priority)
+        else: self.scheduler.set_priority(run_id, priority)
+
     def stop_execution(self):
-        if self.current_runner: self.log("사용자 중지 요청..."); self.current_runner.stop()
-        
-    def on_execution_finished(self): self.set_ui_enabled(True); self.current_runner = None
+        for run_id in list(self.runs): self.stop_run(run_id)
+
+    @Slot(str)
+    def stop_run(self, run_id):
+        runner = self.runs.get(run_id)
+        if runner is None: return
+        self.log("사용자 중지 요청..."); runner.stop(); self.run_panel.runs_list.set_stopping(run_id)
+        # 초기화 중인 SDK 호출 등으로 실행기가 바로 끝나지 않더라도 일정 시간 후에는 목록에서 정리합니다.
+        QTimer.singleShot(STOP_GRACE_MS, lambda: self.on_execution_finished(run_id, forced=True))
+
+    def on_execution_finished(self, run_id, forced=False):
+        if run_id not in self.runs: return
+        if forced and isinstance(self.runs[run_id], RemoteRun) and self.process_engine.force_stop(run_id): return # 작업 프로세스 종료 후 finished가 옵니다.
+        if forced: self.log("⚠ 실행기가 응답하지 않아 목록에서 먼저 정리합니다. (남은 작업은 백그라운드에서 정리됩니다)", "WARNING")
+        del self.runs[run_id]; self.run_panel.runs_list.remove_run(run_id); self._update_run_controls()
+        if run_id == self._watch_run_id:
+            self._watch_run_id = None
+            if self._watch_pending: self._watch_pending = False; QTimer.singleShot(0, self._run_watch_cycle)
+
+    @staticmethod
+    def _file_stamp(path):
+        try: stat = os.stat(path); return stat.st_size, stat.st_mtime_ns
+        except OSError: return None
+
+    @Slot(bool)
+    def toggle_watch_mode(self, enabled):
+        if not enabled:
+            if self.watch_worker: self._stop_watch_worker(); self.log("👀 감시 모드를 종료했습니다.")
+            return
+        self.watch_state = WatchState(self.current_project_path); self.watch_state.reset(self.variables, self._ordered_tasks())
+        paths = self.watch_state.watched_paths(self.variables)
+        worker = FileWatcherWorker(paths); self.watch_worker = worker
+        worker.signals.changed.connect(lambda changed: self.on_watched_files_changed(worker, changed))
+        worker.signals.error.connect(lambda e: self.log(f"❌ 감시 오류: {e}", "ERROR"))
+        # 감시 작업은 계속 스레드 하나를 차지하므로 실행/캐시 작업이 밀리지 않게 한 자리를 더 만듭니다.
+        self.thread_pool.setMaxThreadCount(self.thread_pool.maxThreadCount() + 1); self.thread_pool.start(worker)
+        note = "" if self.current_project_path else " (프로젝트를 저장하면 프로젝트 파일도 감시합니다)"
+        self.log(f"👀 감시 모드를 시작합니다 ({worker.kind}): 파일 {len(paths)}개{note}")
+
+    def _stop_watch_worker(self):
+        if self.watch_worker: self.watch_worker.stop(); self.thread_pool.setMaxThreadCount(self.thread_pool.maxThreadCount() - 1)
+        self.watch_worker = None; self.watch_state = None; self._watch_pending = False; self._watch_reload = False
+
+    def on_watched_files_changed(self, worker, paths):
+        if worker is not self.watch_worker: return
+        self.watch_state.note_changes(paths)
+        project_path = self.watch_state.project_path
+        names = ", ".join(sorted(os.path.basename(path) for path in paths))
+        self.log(f"👀 변경 감지: {names}")
+        if project_path in paths and self._file_stamp(project_path) != self._saved_stamp:
+            # 다른 곳에서 프로젝트 파일을 고쳤습니다. 편집 중인 내용이 없을 때만 다시 불러온 뒤 실행합니다.
+            if self.is_dirty: self.log_record("⚠ 저장하지 않은 편집 내용이 있어 바뀐 프로젝트 파일을 다시 불러오지 않습니다.", "WARNING", "")
+            elif os.path.exists(project_path): self._watch_reload = True; self.load_state(project_path); return
+        self._run_watch_cycle()
+
+    def _run_watch_cycle(self):
+        if not self.watch_state or self.project_loader: return
+        if self._watch_run_id in self.runs: self._watch_pending = True; return # 감시 실행이 끝나면 다시 확인합니다.
+        affected = self.watch_state.plan(self.variables, self._ordered_tasks())
+        if self.watch_worker: self.watch_worker.set_paths(self.watch_state.watched_paths(self.variables))
+        checked = {task.id for task in self._ordered_tasks(checked_only=True)}
+        affected = [task for task in affected if task.id in checked]
+        if not affected: self.log("👀 영향을 받는 활성화된 태스크가 없습니다."); return
+        self.log(f"👀 태스크 {len(affected)}개를 다시 실행합니다: {', '.join(task.name for task in affected)}")
+        self._watch_run_id = self._start_runner(affected)
     
     def select_folder_for(self, line_edit):
         folder = QFileDialog.getExistingDirectory(self, "폴더 선택");
@@ -613,13 +1001,21 @@ class MainWindow(QMainWindow):
     def load_last_log_file(self, log_folder):
         if not log_folder or not os.path.isdir(log_folder): return
         try:
-            log_files = [f for f in os.listdir(log_folder) if f.startswith('log_') and f.endswith('.txt')]
+            log_files = [f for f in os.listdir(log_folder) if (f.startswith('log_') and f.endswith('.txt')) or f == ACTIVE_SEGMENT]
             if not log_files: return
-            last_log_file = sorted(log_files)[-1]; filepath = os.path.join(log_folder, last_log_file)
-            with open(filepath, 'r', encoding='utf-8') as f: log_content = f.read()
-            self.run_panel.log_viewer.append("--- 이전 로그 불러오기 ---\n" + log_content + "\n------------------------\n")
-            self.log(f"이전 로그 파일 '{last_log_file}'을 불러왔습니다.")
-        except Exception as e: self.log(f"이전 로그 파일 불러오기 실패: {e}")
+            last_log_file = max(log_files, key=lambda f: os.path.getmtime(os.path.join(log_folder, f))); filepath = os.path.join(log_folder, last_log_file)
+            # 큰 로그 파일도 뷰어에 보관 가능한 만큼의 끝부분만 읽습니다.
+            log_viewer = self.run_panel.log_viewer
+            lines = read_tail_lines(filepath, log_viewer.model.max_lines)
+            log_viewer.append("--- 이전 로그 불러오기 ---")
+            for line in lines:
+                if last_log_file != ACTIVE_SEGMENT: log_viewer.append(line, text_log_level(line)); continue
+                try: record = json.loads(line)
+                except ValueError: continue
+                if record.get('event') == 'log': log_viewer.append(record.get('message', ''), record.get('level') or "INFO", record.get('task') or "")
+            log_viewer.append("------------------------")
+            self.log(f"이전 로그 파일 '{last_log_file}'의 마지막 {len(lines)}줄을 불러왔습니다.")
+        except Exception as e: self.log(f"이전 로그 파일 불러오기 실패: {e}", "ERROR")
         
     def _open_folder_at_path(self, path):
         if not path or not os.path.isdir(path): QMessageBox.warning(self, "경고", f"유효하지 않은 폴더 경로입니다:\n{path}"); return
@@ -0,0 +1,175 @@
+# attachment_store.py
+
+import os
+import json
+import time
+import threading
+import mimetypes
+from collections import namedtuple
+from urllib.parse import urlparse, unquote
+from urllib.request import url2pathname, pathname2url
+
+from output_writer import file_hash, atomic_write_bytes
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.expanduser("~"), ".aiprompthelper", "attachments.json")
+
+AttachmentRef = namedtuple('AttachmentRef', 'name path')
+
+def guess_mime_type(path):
+    mime_type, _ = mimetypes.guess_type(path)
+    return mime_type or "application/octet-stream"
+
+def local_path_from_uri(uri):
+    return url2pathname(unquote(urlparse(uri).path)) if uri and uri.startswith("file:") else None
+
+class LocalAttachmentStore:
+    """로컬 폴더를 원격 저장소처럼 쓰는 대체 저장소입니다. 업로드 계층을 네트워크 없이 시험할 때 사용합니다.
+
+    file:// 참조는 요청 시 내용을 직접(inline) 실어 보냅니다.
+    """
+    def __init__(self, folder):
+        self.folder = os.path.abspath(folder); self.key = f"local:{self.folder}"; self.uploads = 0
+
+    def upload(self, path, digest, mime_type):
+        target = os.path.join(self.folder, digest + os.path.splitext(path)[1].lower())
+        if not os.path.exists(target):
+            os.makedirs(self.folder, exist_ok=True)
+            with open(path, 'rb') as f: atomic_write_bytes(target, f.read())
+            self.uploads += 1
+        return "file:" + pathname2url(target)
+
+    def exists(self, uri):
+        local_path = local_path_from_uri(uri)
+        return bool(local_path) and os.path.exists(local_path)
+
+class GcsAttachmentStore:
+    """Cloud Storage 버킷에 내용 해시를 이름으로 업로드합니다. 같은 내용은 버킷에 한 번만 올라갑니다."""
+    def __init__(self, bucket_uri, project=None):
+        parsed = urlparse(bucket_uri)
+        if parsed.scheme != 'gs' or not parsed.netloc: raise ValueError(f"'gs://버킷/경로' 형식이어야 합니다: '{bucket_uri}'")
+        self.bucket_name = parsed.netloc; self.prefix = parsed.path.strip('/'); self.project = project
+        self.key = f"gs://{self.bucket_name}/{self.prefix}"; self.uploads = 0; self._client = None
+
+    def _bucket(self):
+        if self._client is None:
+            from google.cloud import storage # 첨부 파일 저장소를 쓸 때만 필요합니다.
+            self._client = storage.Client(project=self.project)
+        return self._client.bucket(self.bucket_name)
+
+    def _blob_name(self, digest, ext):
+        return "/".join(part for part in (self.prefix, digest + ext) if part)
+
+    def upload(self, path, digest, mime_type):
+        blob = self._bucket().blob(self._blob_name(digest, os.path.splitext(path)[1].lower()))
+        if not blob.exists():
+            blob.upload_from_filename(path, content_type=mime_type); self.uploads += 1
+        return f"gs://{self.bucket_name}/{blob.name}"
+
+    def exists(self, uri):
+        parsed = urlparse(uri)
+        return self._bucket().blob(parsed.path.lstrip('/')).exists() if parsed.netloc == self.bucket_name else False
+
+def store_from_env():
+    """ATTACHMENT_STORE 환경 변수('gs://버킷/경로' 또는 'local:폴더')로 저장소를 만듭니다. 없으면 None입니다."""
+    spec = os.getenv("ATTACHMENT_STORE", "").strip()
+    if not spec: return None
+    if spec.startswith("local:"): return LocalAttachmentStore(spec[len("local:"):])
+    return GcsAttachmentStore(spec, project=os.getenv("PROJECT_ID"))
+
+class AttachmentRegistry:
+    """내용 해시 → 원격 참조를 기록해 두는 로컬 캐시입니다. 같은 파일은 태스크와 실행을 넘어 한 번만 업로드합니다.
+
+    만료(ttl)가 지난 참조는 저장소에 아직 있는지 확인하고, 없을 때만 다시 업로드합니다.
+    파일 경로별 (크기, 수정 시각, 해시, 마지막 사용 시각)도 기억하여 바뀌지 않은 큰 파일을 매번 다시 해시하지 않습니다.
+    store가 None이면 해시만 계산하고 원격 참조 없이 반환합니다. (요청에 직접 실어 보내는 경우)
+    여러 실행(프로세스)이 같은 기록 파일을 쓰므로 저장할 때마다 파일의 내용과 합칩니다.
+    """
+    def __init__(self, path=None, store=None, ttl=DEFAULT_TTL):
+        self.path = path or os.getenv("ATTACHMENT_REGISTRY") or DEFAULT_REGISTRY_PATH
+        self.store = store; self.ttl = ttl
+        self._lock = threading.Lock(); self._upload_locks = {}; self._purged = (0, 0) # 마지막으로 정리한 (참조 만료, 파일 사용) 기준 시각
+        self._data = self._read()
+
+    @classmethod
+    def from_env(cls):
+        return cls(store=store_from_env(), ttl=float(os.getenv("ATTACHMENT_TTL_HOURS", DEFAULT_TTL / 3600)) * 3600)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: data = json.load(f)
+        except (OSError, ValueError): data = {}
+        data.setdefault('refs', {}); data.setdefault('files', {})
+        return data
+
+    @staticmethod
+    def _last_used(entry): return entry[3] if len(entry) > 3 else 0
+
+    def _save(self):
+        # 호출하는 쪽에서 self._lock을 잡고 있어야 합니다.
+        # 다른 실행이 그 사이에 기록한 항목을 잃지 않도록 파일의 내용과 합칩니다. 같은 항목은 더 최근 것을 남기고,
+        # 이 레지스트리가 정리한 시점 이전에 만료된 항목은 다시 들여오지 않습니다.
+        saved = self._read(); refs = self._data['refs']; files = self._data['files']; ref_cutoff, file_cutoff = self._purged
+        for key, entry in saved['refs'].items():
+            if entry['expires_at'] <= ref_cutoff: continue
+            if key not in refs or entry['expires_at'] > refs[key]['expires_at']: refs[key] = entry
+        for path, entry in saved['files'].items():
+            if self._last_used(entry) <= file_cutoff: continue
+            if path not in files or self._last_used(entry) > self._last_used(files[path]): files[path] = entry
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        atomic_write_bytes(self.path, json.dumps(self._data, ensure_ascii=False, indent=1).encode('utf-8'))
+
+    def digest(self, path):
+        path = os.path.abspath(path); stat = os.stat(path)
+        with self._lock:
+            known = self._data['files'].get(path)
+            if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                known[3:] = [time.time()]; return known[2]
+        digest = file_hash(path)
+        with self._lock: self._data['files'][path] = [stat.st_size, stat.st_mtime_ns, digest, time.time()]
+        return digest
+
+    def resolve(self, path):
+        """(참조 정보 dict, 재사용 여부)를 반환합니다. dict에는 uri, mime_type, digest, size가 들어 있습니다."""
+        digest = self.digest(path); mime_type = guess_mime_type(path)
+        info = {'uri': None, 'mime_type': mime_type, 'digest': digest, 'size': os.path.getsize(path)}
+        if self.store is None: return info, False
+        ref_key = f"{self.store.key}|{digest}"
+        with self._lock: upload_lock = self._upload_locks.setdefault(ref_key, threading.Lock())
+        # 여러 태스크가 같은 파일을 동시에 요청해도 업로드는 한 번만 일어나도록 해시별로 잠급니다.
+        with upload_lock:
+            with self._lock: entry = self._data['refs'].get(ref_key)
+            now = time.time()
+            if entry and entry['expires_at'] > now: return dict(info, uri=entry['uri']), True
+            if entry and self.store.exists(entry['uri']): uri = entry['uri']; reused = True
+            else: uri = self.store.upload(path, digest, mime_type); reused = False
+            with self._lock:
+                self._data['refs'][ref_key] = {'uri': uri, 'mime_type': mime_type, 'size': info['size'], 'expires_at': now + self.ttl}
+                self._save()
+        return dict(info, uri=uri), reused
+
+    def _purge(self, ref_cutoff, file_cutoff):
+        # 호출하는 쪽에서 self._lock을 잡고 있어야 합니다. ref_cutoff 이전에 만료된 참조와 file_cutoff 이후로 쓰지 않은(또는 지워진) 파일의 해시 기억을 지웁니다.
+        refs = self._data['refs']; files = self._data['files']
+        expired = [key for key, entry in refs.items() if entry['expires_at'] <= ref_cutoff]
+        for key in expired: del refs[key]
+        stale = [path for path, entry in files.items() if self._last_used(entry) <= file_cutoff or not os.path.exists(path)]
+        for path in stale: del files[path]
+        self._purged = (max(self._purged[0], ref_cutoff), max(self._purged[1], file_cutoff))
+        return len(expired) + len(stale)
+
+    def purge_expired(self):
+        """만료된 참조와 ttl 동안 쓰지 않은 해시 기억을 지우고 지운 개수를 반환합니다."""
+        now = time.time()
+        with self._lock:
+            removed = self._purge(now, now - self.ttl)
+            if removed: self._save()
+        return removed
+
+    def flush(self):
+        """해시 기억(files)과 참조를 파일에 기록합니다.
+
+        만료된 참조는 저장소에 남아 있으면 업로드 없이 다시 쓸 수 있으므로 ttl만큼 더 두고, 그보다 오래된 것만 정리합니다.
+        """
+        now = time.time()
+        with self._lock: self._purge(now - self.ttl, now - self.ttl); self._save()
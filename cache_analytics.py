@@ -0,0 +1,129 @@
+# cache_analytics.py
+
+import os
+import math
+import time
+import sqlite3
+import datetime
+import threading
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".aiprompthelper", "cache_usage.sqlite")
+RETENTION_DAYS = 90
+RECENT_HOURS = 24
+# 대략적인 Vertex AI 가격 비율입니다. 캐시에서 읽은 입력 토큰은 정가의 25%로 과금되고,
+# 캐시 저장은 1시간에 토큰당 입력 토큰 정가의 약 3.3배입니다. (gemini-2.5-flash 기준, 실제 청구액이 아닌 권장 판단용)
+CACHED_TOKEN_DISCOUNT = 0.75
+STORAGE_INPUT_RATIO = 3.3
+LOW_HIT_RATIO = 0.5
+EXPIRING_SOON = datetime.timedelta(hours=1)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (ts REAL, run_id TEXT, cache_name TEXT, model TEXT, size_bucket INTEGER,
+                                     prompt_tokens INTEGER, cached_tokens INTEGER, output_tokens INTEGER, latency REAL);
+CREATE INDEX IF NOT EXISTS requests_cache ON requests (cache_name, ts);
+"""
+
+def size_bucket(prompt_tokens):
+    """캐시 없는 요청과 비교할 때 쓰는 프롬프트 크기 구간입니다. (2의 거듭제곱 단위)"""
+    return int(math.log2(max(prompt_tokens, 1)))
+
+class CacheUsageStore:
+    """요청별 usage_metadata(프롬프트/캐시/출력 토큰)와 지연을 캐시 이름별로 SQLite에 쌓습니다.
+
+    캐시 없이 보낸 요청(cache_name '')도 함께 기록하여, 같은 모델/비슷한 크기의 캐시 없는 요청과 지연을 비교하는 기준으로 씁니다.
+    """
+    def __init__(self, path=None):
+        self.path = path or os.getenv("CACHE_USAGE_DB") or DEFAULT_DB_PATH; self._lock = threading.Lock()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=10); db.executescript(_SCHEMA)
+        return db
+
+    def record(self, rows):
+        """rows: [(run_id, 캐시 이름 | '', 모델, 토큰 딕셔너리(usage_to_dict), 지연(초))]. 실행이 끝날 때 한 번에 기록합니다."""
+        now = time.time()
+        values = [(now, run_id, cache_name or '', os.path.basename(model or ''), size_bucket(tokens['prompt'] or 0),
+                   tokens['prompt'] or 0, tokens['cached'] or 0, tokens['candidates'] or 0, latency)
+                  for run_id, cache_name, model, tokens, latency in rows]
+        with self._lock:
+            db = self._connect()
+            try:
+                with db:
+                    db.executemany("INSERT INTO requests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+                    db.execute("DELETE FROM requests WHERE ts < ?", (now - RETENTION_DAYS * 86400,))
+            finally: db.close()
+
+    def _baseline(self, db):
+        rows = db.execute("SELECT model, size_bucket, AVG(latency) FROM requests WHERE cache_name = '' GROUP BY model, size_bucket")
+        return {(model, bucket): latency for model, bucket, latency in rows}
+
+    def cache_stats(self, cache_names=None):
+        """캐시 이름 → 통계 딕셔너리를 반환합니다. 기록이 없는 캐시는 빠집니다.
+
+        time_saved는 같은 모델/크기 구간의 캐시 없는 요청 평균 지연과 비교한 값이며, 비교할 기록이 있는 요청(compared)만 셉니다.
+        """
+        if not os.path.exists(self.path): return {}
+        since = time.time() - RECENT_HOURS * 3600
+        with self._lock:
+            db = self._connect()
+            try:
+                baseline = self._baseline(db)
+                rows = db.execute("SELECT cache_name, model, size_bucket, COUNT(*), SUM(prompt_tokens), SUM(cached_tokens), SUM(output_tokens), "
+                                  "SUM(latency), MAX(ts), SUM(ts > ?) FROM requests WHERE cache_name != '' GROUP BY cache_name, model, size_bucket",
+                                  (since,)).fetchall()
+            finally: db.close()
+        stats = {}
+        for name, model, bucket, count, prompt, cached, output, latency, last_used, recent in rows:
+            if cache_names is not None and name not in cache_names: continue
+            entry = stats.setdefault(name, {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'output_tokens': 0, 'latency': 0.0,
+                                            'last_used': 0.0, 'recent_requests': 0, 'time_saved': 0.0, 'compared': 0})
+            entry['requests'] += count; entry['prompt_tokens'] += prompt; entry['cached_tokens'] += cached; entry['output_tokens'] += output
+            entry['latency'] += latency; entry['last_used'] = max(entry['last_used'], last_used); entry['recent_requests'] += recent
+            base = baseline.get((model, bucket))
+            if base is not None: entry['time_saved'] += base * count - latency; entry['compared'] += count
+        for entry in stats.values():
+            entry['hit_ratio'] = entry['cached_tokens'] / entry['prompt_tokens'] if entry['prompt_tokens'] else 0.0
+            entry['tokens_saved'] = int(entry['cached_tokens'] * CACHED_TOKEN_DISCOUNT)
+        return stats
+
+def recommendations(stats, create_time=None, expire_time=None, now=None):
+    """캐시 하나의 통계로 연장/축소/삭제 권장 사항 목록을 만듭니다."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    age_hours = (now - create_time).total_seconds() / 3600 if create_time else None
+    if not stats or not stats['requests']:
+        if age_hours is not None and age_hours >= 1: return [f"🗑 생성 후 {age_hours:.0f}시간 동안 기록된 사용이 없습니다. 삭제를 권장합니다."]
+        return ["아직 기록된 사용이 없습니다."]
+    advice = []
+    # 저장 비용(입력 토큰 환산)과 캐시 읽기 할인이 같아지는 시간당 요청 수입니다.
+    breakeven = STORAGE_INPUT_RATIO / CACHED_TOKEN_DISCOUNT
+    hours = min(RECENT_HOURS, age_hours) if age_hours else RECENT_HOURS
+    rate = stats['recent_requests'] / max(hours, 1 / 60)
+    expires_in = expire_time - now if expire_time else None
+    if stats['recent_requests'] == 0:
+        advice.append(f"🗑 최근 {RECENT_HOURS}시간 동안 사용되지 않았습니다. 삭제하거나 TTL을 줄이는 것을 권장합니다.")
+    elif rate < breakeven:
+        advice.append(f"✂ 시간당 약 {rate:.1f}회 사용으로, 저장 비용을 메우려면 시간당 {breakeven:.1f}회 이상 필요합니다. "
+                      "캐시 내용을 줄이거나 필요한 시간대에만 TTL을 두는 것을 권장합니다.")
+    elif expires_in is not None and expires_in < EXPIRING_SOON:
+        advice.append(f"⏳ 시간당 약 {rate:.1f}회 쓰이고 있지만 곧 만료됩니다. TTL 연장을 권장합니다.")
+    if stats['hit_ratio'] < LOW_HIT_RATIO:
+        advice.append(f"🎯 프롬프트 토큰 중 캐시에서 읽은 비율이 {stats['hit_ratio']:.0%}입니다. 자주 바뀌지 않는 내용을 캐시에 더 넣으면 효과가 커집니다.")
+    return advice or ["✅ 사용량이 저장 비용에 비해 충분합니다. 현재 설정을 유지하세요."]
+
+def format_report(stats, create_time=None, expire_time=None):
+    """캐시 관리자 상세 보기에 붙일 효과 분석 문단입니다."""
+    lines = ["[캐시 효과 분석]"]
+    if stats:
+        lines.append(f"요청 {stats['requests']:,}회 (최근 {RECENT_HOURS}시간 {stats['recent_requests']:,}회), "
+                     f"마지막 사용 {datetime.datetime.fromtimestamp(stats['last_used']).strftime('%Y-%m-%d %H:%M:%S')}")
+        lines.append(f"적중률: 프롬프트 {stats['prompt_tokens']:,} 토큰 중 캐시 {stats['cached_tokens']:,} 토큰 ({stats['hit_ratio']:.0%})")
+        lines.append(f"절감: 입력 토큰 약 {stats['tokens_saved']:,} 토큰 분량 (캐시 토큰 {CACHED_TOKEN_DISCOUNT:.0%} 할인 기준)")
+        if stats['compared']:
+            saved = stats['time_saved']; verb = "절약" if saved >= 0 else "더 걸림"
+            lines.append(f"시간: 캐시 없는 비슷한 요청 대비 {abs(saved):.1f}초 {verb} (비교 가능한 요청 {stats['compared']:,}회, "
+                         f"요청당 평균 {abs(saved) / stats['compared']:.2f}초)")
+        else: lines.append("시간: 비교할 캐시 없는 요청 기록(같은 모델/비슷한 크기)이 아직 없습니다.")
+    lines.append("권장:")
+    lines.extend(f"  {line}" for line in recommendations(stats, create_time, expire_time))
+    return "\n".join(lines)
@@ -0,0 +1,162 @@
+# cache_builder.py
+
+import os
+import re
+import glob
+import json
+import codecs
+import fnmatch
+import hashlib
+import threading
+
+from output_writer import atomic_write_bytes
+from attachment_store import guess_mime_type
+
+DEFAULT_EXCLUDES = [".git/**", ".svn/**", "__pycache__/**", "node_modules/**", ".venv/**", "*.pyc", "*.so", "*.dll", "*.exe", ".DS_Store"]
+DEFAULT_CHUNK_CHARS = 32 * 1024
+DEFAULT_MAX_FILE_BYTES = 20 * 1024 * 1024
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.expanduser("~"), ".aiprompthelper", "cache_registry.json")
+BINARY_MIME_PREFIXES = ("image/", "application/pdf", "audio/", "video/")
+HASH_MARKER = re.compile(r"#([0-9a-f]{12})$")
+IMAGE_TOKENS = 258 # 이미지 한 장 / PDF 한 페이지의 대략적인 토큰 수
+
+def split_patterns(text):
+    """쉼표/세미콜론/줄바꿈으로 구분된 패턴 목록을 나눕니다."""
+    return [p.strip() for p in re.split(r"[,;\n]", text or "") if p.strip()]
+
+def _matches(rel_path, patterns):
+    name = rel_path.rsplit('/', 1)[-1]; padded = "/" + rel_path.strip('/') + "/"
+    for pattern in patterns:
+        if pattern.endswith("/**"):
+            # 'dir/**'는 경로 어디에 있든 그 폴더 아래의 모든 경로와 맞습니다.
+            if "/" + pattern[:-3].strip('/') + "/" in padded: return True
+        elif fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern): return True
+    return False
+
+def collect_files(sources, include=None, exclude=None):
+    """파일, 폴더, glob 패턴 목록에서 포함/제외 규칙에 맞는 파일을 (절대 경로, 표시용 상대 경로) 목록으로 반환합니다."""
+    include = include or []; exclude = DEFAULT_EXCLUDES + list(exclude or []); found = {}
+    def consider(path, rel_path):
+        rel_path = rel_path.replace(os.sep, '/')
+        if _matches(rel_path, exclude) or (include and not _matches(rel_path, include)): return
+        found.setdefault(os.path.abspath(path), rel_path)
+    for source in sources:
+        if glob.has_magic(source):
+            base = source[:min((source.find(c) for c in "*?[" if c in source), default=len(source))]
+            base = os.path.dirname(base) or "."
+            for path in glob.iglob(source, recursive=True):
+                if os.path.isfile(path): consider(path, os.path.relpath(path, base))
+        elif os.path.isdir(source):
+            root_name = os.path.basename(os.path.normpath(source))
+            for dirpath, dirnames, filenames in os.walk(source):
+                rel_dir = os.path.relpath(dirpath, source)
+                # 제외된 폴더는 아래로 내려가지 않습니다.
+                dirnames[:] = sorted(d for d in dirnames if not _matches(os.path.normpath(os.path.join(rel_dir, d)).replace(os.sep, '/'), exclude))
+                for filename in sorted(filenames):
+                    rel_path = os.path.normpath(os.path.join(rel_dir, filename))
+                    consider(os.path.join(dirpath, filename), os.path.join(root_name, rel_path))
+        elif os.path.isfile(source): consider(source, os.path.basename(source))
+        else: raise ValueError(f"파일이나 폴더를 찾을 수 없습니다: '{source}'")
+    return sorted(found.items(), key=lambda item: item[1])
+
+def estimate_text_tokens(text):
+    """대략적인 토큰 수: ASCII는 약 4자당 1토큰, 그 밖의 문자(한글 등)는 약 1.5자당 1토큰으로 셉니다."""
+    ascii_count = len(text.encode('ascii', 'ignore'))
+    return ascii_count / 4 + (len(text) - ascii_count) / 1.5
+
+class CachePlan:
+    """캐시에 넣을 파일 목록과 크기/토큰 추정, 내용 해시를 담습니다. 파일은 조각 단위로 읽어 메모리에 모두 올리지 않습니다."""
+    def __init__(self, model_name, system_text, sources, include=None, exclude=None,
+                 chunk_chars=DEFAULT_CHUNK_CHARS, max_file_bytes=DEFAULT_MAX_FILE_BYTES):
+        self.model_name = model_name; self.system_text = system_text or ""; self.chunk_chars = chunk_chars
+        self.sources = list(sources); self.include = list(include or []); self.exclude = list(exclude or [])
+        self.max_file_bytes = max_file_bytes
+        self.files = [] # (절대 경로, 상대 경로, 'text' | mime 종류)
+        self.skipped = [] # (상대 경로, 이유)
+        self.total_bytes = 0; self.estimated_tokens = estimate_text_tokens(self.system_text); self.content_hash = None
+
+    def scan(self, is_cancelled=None):
+        """파일을 한 번 읽으며 종류 판별, 토큰 추정, 내용 해시 계산을 합니다."""
+        h = hashlib.sha256(); h.update(self.model_name.encode('utf-8') + b"\0" + self.system_text.encode('utf-8') + b"\0")
+        for path, rel_path in collect_files(self.sources, self.include, self.exclude):
+            if is_cancelled and is_cancelled(): return self
+            size = os.path.getsize(path)
+            if size > self.max_file_bytes: self.skipped.append((rel_path, f"파일이 너무 큼 ({size / (1024 * 1024):.1f} MB)")); continue
+            mime_type = guess_mime_type(path)
+            kind = mime_type if mime_type.startswith(BINARY_MIME_PREFIXES) else 'text'
+            file_hash = hashlib.sha256(); decoder = codecs.getincrementaldecoder('utf-8')(); tokens = 0; pdf_pages = 0
+            try:
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        file_hash.update(block)
+                        if kind == 'text': tokens += estimate_text_tokens(decoder.decode(block))
+                        elif kind == 'application/pdf': pdf_pages += len(re.findall(rb"/Type\s*/Page(?!s)", block))
+                    if kind == 'text': decoder.decode(b"", final=True)
+            except UnicodeDecodeError: self.skipped.append((rel_path, "텍스트가 아닌 파일 (UTF-8 아님)")); continue
+            except OSError as e: self.skipped.append((rel_path, f"읽기 실패: {e}")); continue
+            if kind != 'text': tokens = IMAGE_TOKENS * max(1, pdf_pages) if kind.startswith(("image/", "application/pdf")) else size / 100
+            h.update(rel_path.encode('utf-8') + b"\0" + file_hash.digest())
+            self.files.append((path, rel_path, kind)); self.total_bytes += size; self.estimated_tokens += tokens
+        self.content_hash = h.hexdigest()[:12]
+        return self
+
+    def iter_chunks(self):
+        """(상대 경로, 텍스트 조각 | None, 바이너리 내용 | None, mime 종류)를 순서대로 돌려줍니다.
+
+        텍스트 파일은 chunk_chars 이하의 조각으로 나누며, 조각마다 파일 경로 머리말을 붙입니다.
+        """
+        for path, rel_path, kind in self.files:
+            if kind != 'text':
+                with open(path, 'rb') as f: yield rel_path, None, f.read(), kind
+                continue
+            decoder = codecs.getincrementaldecoder('utf-8')(); buffer = ""; part = 1
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(max(4096, self.chunk_chars)), b''):
+                    buffer += decoder.decode(block)
+                    while len(buffer) >= self.chunk_chars:
+                        # 가능하면 줄 경계에서 자릅니다.
+                        cut = buffer.rfind("\n", 0, self.chunk_chars) + 1 or self.chunk_chars
+                        yield rel_path, f"=== {rel_path} (part {part}) ===\n{buffer[:cut]}", None, kind
+                        buffer = buffer[cut:]; part += 1
+            buffer += decoder.decode(b"", final=True)
+            if buffer or part == 1: yield rel_path, f"=== {rel_path}" + (f" (part {part})" if part > 1 else "") + f" ===\n{buffer}", None, kind
+
+    def summary(self):
+        lines = [f"파일 {len(self.files)}개, {self.total_bytes / (1024 * 1024):.2f} MB, 예상 토큰 약 {int(self.estimated_tokens):,}개"]
+        if self.content_hash: lines.append(f"내용 해시: #{self.content_hash}")
+        if self.skipped: lines.append(f"제외된 파일 {len(self.skipped)}개: " + ", ".join(f"{path} ({reason})" for path, reason in self.skipped[:10])
+                                      + (" ..." if len(self.skipped) > 10 else ""))
+        return "\n".join(lines)
+
+def tagged_display_name(display_name, content_hash, max_length=128):
+    """표시 이름 끝에 '#내용해시'를 붙입니다. 같은 내용의 캐시를 다른 PC에서도 알아볼 수 있게 합니다."""
+    suffix = f" #{content_hash}"
+    return display_name[:max_length - len(suffix)] + suffix
+
+def display_name_hash(display_name):
+    match = HASH_MARKER.search(display_name or "")
+    return match.group(1) if match else None
+
+class CacheRegistry:
+    """(모델, 위치, 내용 해시) → 캐시 리소스 이름을 기록하는 로컬 파일입니다."""
+    def __init__(self, path=None):
+        self.path = path or os.getenv("CACHE_REGISTRY") or DEFAULT_REGISTRY_PATH; self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_name, location, content_hash): return f"{model_name}|{location}|{content_hash}"
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError): return {}
+
+    def get(self, key):
+        with self._lock: return self._read().get(key)
+
+    def set(self, key, cache_name):
+        with self._lock:
+            data = self._read()
+            if cache_name: data[key] = cache_name
+            else: data.pop(key, None)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            atomic_write_bytes(self.path, json.dumps(data, ensure_ascii=False, indent=1).encode('utf-8'))
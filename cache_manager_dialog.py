@@ -2,15 +2,37 @@
 
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QSplitter,
                              QListWidget, QTextEdit, QPushButton, QListWidgetItem,
-                             QMessageBox, QWidget, QLabel, QInputDialog)
+                             QMessageBox, QWidget, QLabel, QInputDialog, QAbstractItemView)
 from PySide6.QtCore import Qt, Signal, Slot, QTimer
 from PySide6.QtGui import QFont
 import os
 import datetime
 
 from new_cache_dialog import NewCacheDialog
+from cache_analytics import CacheUsageStore, format_report
 
 KST = datetime.timezone(datetime.timedelta(hours=9))
+UNUSED_DAYS = 7 # 현재 프로젝트가 쓰지 않으면서 이 기간 동안 사용 기록이 없는 캐시는 정리 후보입니다.
+
+def stale_caches(caches, in_use=(), now=None, usage=None, include_unrecorded=False):
+    """정리 후보를 [(캐시 이름, 이유)]로 반환합니다. 만료된 캐시와 기록된 마지막 사용이 오래된 캐시입니다.
+
+    usage는 캐시 이름 → CacheUsageStore.cache_stats 항목입니다. 사용 기록이 없는 캐시는 다른 곳에서 쓰는지 알 수 없으므로
+    include_unrecorded일 때만 갱신 시각(update_time)이 오래된 것을 후보로 넣습니다.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc); usage = usage or {}; stale = []
+    for name, data in caches.items():
+        expire_time = data.get('expire_time'); update_time = data.get('update_time'); stats = usage.get(name)
+        if expire_time and expire_time <= now: stale.append((name, "만료됨")); continue
+        if name in in_use: continue
+        if stats:
+            last_used = datetime.datetime.fromtimestamp(stats['last_used'], datetime.timezone.utc)
+            # 최근에 TTL을 연장하거나 내용을 갱신한 캐시는 곧 쓸 것으로 보고 남겨 둡니다.
+            if now - last_used > datetime.timedelta(days=UNUSED_DAYS) and not (update_time and now - update_time <= datetime.timedelta(days=UNUSED_DAYS)):
+                stale.append((name, f"{(now - last_used).days}일 넘게 사용 기록 없음"))
+        elif include_unrecorded and update_time and now - update_time > datetime.timedelta(days=UNUSED_DAYS):
+            stale.append((name, f"{(now - update_time).days}일 넘게 갱신 없음 (사용 기록 없음)"))
+    return stale
 
 class CacheManagerDialog(QDialog):
     refresh_requested = Signal()
@@ -18,9 +40,10 @@ class CacheManagerDialog(QDialog):
     delete_requested = Signal(str)
     update_ttl_requested = Signal(str, datetime.timedelta)
     create_requested = Signal(dict)
+    bulk_requested = Signal(str, list, object) # (작업 'delete' | 'extend', 캐시 이름 목록, 연장할 시간)
 
     # *** 수정됨: 생성자에 supported_models 인자 추가 ***
-    def __init__(self, supported_models, parent=None):
+    def __init__(self, supported_models, parent=None, in_use=None):
         super().__init__(parent)
         self.setWindowTitle("Context Cache 관리자")
         self.setMinimumSize(800, 600)
@@ -28,37 +51,51 @@ class CacheManagerDialog(QDialog):
         # *** 수정됨: 모델 목록을 내부 속성으로 저장 ***
         self.supported_models = supported_models
 
+        self.in_use = in_use or set # 현재 프로젝트가 쓰는 캐시 이름 집합을 돌려주는 함수 (정리 대상에서 제외)
+        self.caches = {}; self.bulk_names = {}; self.bulk_lines = []
+        self.usage_store = CacheUsageStore(); self.usage_stats = {} # 실행에서 모은 캐시별 사용 기록 (cache_analytics)
         self.current_cache_name = None; self.current_expire_time = None; self.current_details_text = ""
         self.ttl_timer = QTimer(self); self.ttl_timer.setInterval(1000)
         self.ttl_timer.timeout.connect(self.update_remaining_time)
-        self.list_widget = QListWidget()
+        self.list_widget = QListWidget(); self.list_widget.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.details_viewer = QTextEdit(); self.details_viewer.setReadOnly(True)
         self.details_viewer.setFont(QFont("Courier New", 10))
         details_widget = QWidget(); details_layout = QVBoxLayout(details_widget)
         details_layout.addWidget(self.details_viewer)
+        self.analytics_viewer = QTextEdit(); self.analytics_viewer.setReadOnly(True); self.analytics_viewer.setFont(QFont("Courier New", 10))
+        details_layout.addWidget(QLabel("캐시 효과 분석 (이 PC에서 실행한 요청 기준):")); details_layout.addWidget(self.analytics_viewer)
         splitter = QSplitter(Qt.Horizontal)
         splitter.addWidget(self.list_widget); splitter.addWidget(details_widget); splitter.setSizes([300, 500])
         self.refresh_btn = QPushButton("새로고침"); self.new_cache_btn = QPushButton("새 캐시 생성...")
-        self.ttl_btn = QPushButton("TTL 재설정"); self.delete_btn = QPushButton("선택 캐시 삭제")
+        self.ttl_btn = QPushButton("TTL 재설정"); self.extend_btn = QPushButton("선택 캐시 TTL 연장...")
+        self.delete_btn = QPushButton("선택 캐시 삭제"); self.cleanup_btn = QPushButton("만료/미사용 캐시 정리...")
         self.close_btn = QPushButton("닫기")
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.refresh_btn); button_layout.addWidget(self.new_cache_btn); button_layout.addStretch()
-        button_layout.addWidget(self.ttl_btn); button_layout.addWidget(self.delete_btn)
+        button_layout.addWidget(self.ttl_btn); button_layout.addWidget(self.extend_btn); button_layout.addWidget(self.delete_btn); button_layout.addWidget(self.cleanup_btn)
         button_layout.addStretch(); button_layout.addWidget(self.close_btn)
         main_layout = QVBoxLayout(self)
         main_layout.addWidget(splitter); main_layout.addLayout(button_layout)
         self.set_controls_enabled(False)
         self.refresh_btn.clicked.connect(self.refresh_requested); self.close_btn.clicked.connect(self.accept)
         self.list_widget.currentItemChanged.connect(self.on_item_selected)
+        self.list_widget.itemSelectionChanged.connect(lambda: self.set_controls_enabled(self.close_btn.isEnabled()))
         self.delete_btn.clicked.connect(self.on_delete_button_clicked)
+        self.extend_btn.clicked.connect(self.on_extend_button_clicked); self.cleanup_btn.clicked.connect(self.on_cleanup_button_clicked)
         self.ttl_btn.clicked.connect(self.on_ttl_button_clicked)
         self.new_cache_btn.clicked.connect(self.on_new_cache_button_clicked)
 
+    def selected_cache_names(self):
+        return [item.data(Qt.UserRole) for item in self.list_widget.selectedItems() if item.data(Qt.UserRole)]
     def set_controls_enabled(self, enabled):
         self.list_widget.setEnabled(enabled)
         item_selected = self.list_widget.currentItem() is not None and self.list_widget.currentItem().data(Qt.UserRole) is not None
-        self.ttl_btn.setEnabled(enabled and item_selected)
-        self.delete_btn.setEnabled(enabled and item_selected)
+        selected_count = len(self.selected_cache_names())
+        self.ttl_btn.setEnabled(enabled and item_selected and selected_count <= 1)
+        self.extend_btn.setEnabled(enabled and selected_count > 0)
+        self.delete_btn.setEnabled(enabled and (item_selected or selected_count > 0))
+        self.delete_btn.setText(f"선택 캐시 {selected_count}개 삭제" if selected_count > 1 else "선택 캐시 삭제")
+        self.cleanup_btn.setEnabled(enabled and bool(self.caches))
         self.refresh_btn.setEnabled(enabled); self.new_cache_btn.setEnabled(enabled); self.close_btn.setEnabled(enabled)
     def showEvent(self, event):
         super().showEvent(event)
@@ -84,18 +121,30 @@ class CacheManagerDialog(QDialog):
         self.details_viewer.setText(self.current_details_text + "\n\n" + remaining_text)
     @Slot(dict)
     def update_cache_list(self, caches):
-        self.list_widget.blockSignals(True); self.list_widget.clear()
+        self.caches = caches; self.list_widget.blockSignals(True); self.list_widget.clear()
+        self.load_usage_overview()
         if not caches:
             self.list_widget.addItem("사용 가능한 캐시가 없습니다.")
         else:
             for name, data in sorted(caches.items(), key=lambda item: item[1]['display_name']):
                 item = QListWidgetItem(data['display_name']); item.setData(Qt.UserRole, name); self.list_widget.addItem(item)
         self.list_widget.blockSignals(False)
-        self.details_viewer.clear()
+        # 일괄 작업 직후의 새로고침에서는 항목별 결과를 남겨 둡니다.
+        if self.bulk_lines: self.details_viewer.setText("\n".join(self.bulk_lines))
+        else: self.details_viewer.clear()
         self.set_controls_enabled(True)
+    def load_usage_overview(self):
+        try: self.usage_stats = self.usage_store.cache_stats(set(self.caches))
+        except Exception as e: self.usage_stats = {}; self.analytics_viewer.setText(f"사용 기록을 읽지 못했습니다: {e}"); return
+        lines = []
+        for name, data in sorted(self.caches.items(), key=lambda item: -self.usage_stats.get(item[0], {}).get('requests', 0)):
+            stats = self.usage_stats.get(name)
+            if stats: lines.append(f"{data['display_name']}: 요청 {stats['requests']:,}회, 적중률 {stats['hit_ratio']:.0%}, 입력 토큰 약 {stats['tokens_saved']:,} 절감")
+            else: lines.append(f"{data['display_name']}: 기록 없음")
+        self.analytics_viewer.setText("\n".join(lines) if lines else "")
     @Slot(QListWidgetItem, QListWidgetItem)
     def on_item_selected(self, current, previous):
-        self.ttl_timer.stop(); self.current_expire_time = None; self.details_viewer.clear()
+        self.ttl_timer.stop(); self.current_expire_time = None; self.details_viewer.clear(); self.bulk_lines = []
         self.set_controls_enabled(True)
         if current and current.data(Qt.UserRole):
             self.current_cache_name = current.data(Qt.UserRole)
@@ -130,7 +179,47 @@ class CacheManagerDialog(QDialog):
             new_ttl = datetime.timedelta(minutes=minutes)
             self.update_ttl_requested.emit(self.current_cache_name, new_ttl)
     @Slot()
+    def on_extend_button_clicked(self):
+        names = self.selected_cache_names()
+        if not names: return
+        minutes, ok = QInputDialog.getInt(self, "TTL 연장", f"선택한 캐시 {len(names)}개의 만료 시간을 몇 분 늦출까요?",
+                                          value=60, minValue=1, maxValue=60*24*30)
+        if ok: self.bulk_requested.emit('extend', names, datetime.timedelta(minutes=minutes))
+    @Slot()
+    def on_cleanup_button_clicked(self):
+        stale = stale_caches(self.caches, self.in_use(), usage=self.usage_stats)
+        unrecorded = [item for item in stale_caches(self.caches, self.in_use(), usage=self.usage_stats, include_unrecorded=True) if item not in stale]
+        if unrecorded:
+            # 사용 기록은 이 앱의 실행만 모으므로, 기록이 없다고 쓰이지 않는 캐시라고 단정하지 않고 따로 묻습니다.
+            reply = QMessageBox.question(self, "캐시 정리", f"사용 기록이 없고 {UNUSED_DAYS}일 넘게 갱신되지 않은 캐시가 {len(unrecorded)}개 있습니다.\n"
+                                         "다른 프로그램이나 다른 컴퓨터에서 쓰는 캐시일 수 있습니다. 정리 대상에 포함할까요?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+            if reply == QMessageBox.StandardButton.Yes: stale += unrecorded
+        if not stale:
+            QMessageBox.information(self, "캐시 정리", f"만료되었거나 {UNUSED_DAYS}일 넘게 사용 기록이 없는 캐시가 없습니다."); return
+        lines = [f"- {self.caches[name]['display_name']}: {reason}" for name, reason in stale[:20]]
+        if len(stale) > 20: lines.append(f"... 외 {len(stale) - 20}개")
+        reply = QMessageBox.critical(self, "캐시 정리 확인", f"다음 캐시 {len(stale)}개를 삭제하시겠습니까?\n\n" + "\n".join(lines),
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes: self.bulk_requested.emit('delete', [name for name, _ in stale], None)
+    def start_bulk_report(self, label, names):
+        self.ttl_timer.stop(); self.current_expire_time = None
+        self.bulk_names = {name: self.caches.get(name, {}).get('display_name', os.path.basename(name)) for name in names}
+        self.bulk_lines = [f"캐시 {len(names)}개 {label} 중...", "-" * 40]; self.details_viewer.setText("\n".join(self.bulk_lines))
+    @Slot(str, bool, str)
+    def on_bulk_item_finished(self, cache_name, success, message):
+        self.bulk_lines.append(f"{'✅' if success else '❌'} {self.bulk_names.get(cache_name, os.path.basename(cache_name))}: {message}")
+        self.details_viewer.setText("\n".join(self.bulk_lines))
+    def finish_bulk_report(self, succeeded, failed):
+        self.bulk_lines.extend(["-" * 40, f"완료: 성공 {succeeded}개, 실패 {failed}개"]); self.details_viewer.setText("\n".join(self.bulk_lines))
+    @Slot()
     def on_delete_button_clicked(self):
+        names = self.selected_cache_names()
+        if len(names) > 1:
+            reply = QMessageBox.critical(self, "캐시 삭제 확인", f"선택한 캐시 {len(names)}개를 정말 삭제하시겠습니까?\n이 작업은 되돌릴 수 없습니다.",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+            if reply == QMessageBox.StandardButton.Yes: self.bulk_requested.emit('delete', names, None)
+            return
         current_item = self.list_widget.currentItem()
         if not current_item or not current_item.data(Qt.UserRole): return
         cache_name_full = current_item.data(Qt.UserRole); cache_display_name = current_item.text()
@@ -164,6 +253,10 @@ class CacheManagerDialog(QDialog):
             total_tokens = getattr(token_count_obj, 'total_tokens', 'N/A')
             details.append(f"크기 (토큰 수): {total_tokens}")
         self.current_details_text = "\n".join(details)
+        # 목록을 불러온 뒤에 끝난 실행의 기록도 보이도록 선택한 캐시는 다시 읽습니다.
+        try: self.usage_stats.update(self.usage_store.cache_stats({self.current_cache_name}))
+        except Exception: pass
+        self.analytics_viewer.setText(format_report(self.usage_stats.get(self.current_cache_name), create_time_utc, expire_time_utc))
         self.details_viewer.setText(self.current_details_text); self.update_remaining_time()
     @Slot(str)
     def show_error(self, error_message): 
@@ -0,0 +1,155 @@
+# completion_index.py
+
+import heapq
+import itertools
+
+NGRAM = 3
+DEFAULT_LIMIT = 50
+SCAN_LIMIT = 1000 # 검색 한 번에 최대 이만큼의 후보만 점수를 매깁니다.
+RECENCY_DECAY = 0.8 # 최근 사용 가산점은 다른 이름을 하나 쓸 때마다 이 비율로 줄어듭니다.
+RECENCY_BONUS = 150; FREQUENCY_BONUS = 10; MAX_FREQUENCY = 10
+BOUNDARY_CHARS = "_-. "
+
+def _is_boundary(name, i):
+    return i == 0 or name[i - 1] in BOUNDARY_CHARS or (name[i].isupper() and name[i - 1].islower())
+
+def fuzzy_score(query, name):
+    """소문자 query가 name에 맞는 정도를 반환합니다. 맞지 않으면 None입니다.
+
+    일치(1000) > 접두어(800~) > 부분 문자열(400~, 단어 경계면 가산) > 부분 수열(399 이하, 연속/단어 경계면 가산) 순서입니다.
+    """
+    lower = name.lower()
+    if not query: return 0
+    if lower == query: return 1000
+    if lower.startswith(query): return 800 - min(len(lower) - len(query), 199)
+    position = lower.find(query)
+    if position != -1: return max(400, 600 + (150 if _is_boundary(name, position) else 0) - position)
+    score = 200; last = -1
+    for c in query:
+        found = lower.find(c, last + 1)
+        if found == -1: return None
+        if found == last + 1: score += 5
+        elif _is_boundary(name, found): score += 3
+        else: score -= min(found - last - 1, 10)
+        last = found
+    return min(score, 399)
+
+class CompletionIndex:
+    """변수 이름 자동완성 색인입니다. (대소문자 무시)
+
+    접두어 트라이와 1글자/NGRAM글자 포스팅 목록을 미리 만들어 두고, 변수가 바뀌면 바뀐 이름만 더하고 뺍니다.
+    search()는 키 입력마다 전체 이름을 훑지 않고 후보만 모아 (일치 정도 + 최근 사용) 순서로 돌려줍니다.
+    """
+    def __init__(self):
+        self._kinds = {} # 이름 → 'user' | 'built-in'
+        self._trie = [{}, set(), None] # 노드: [글자 → 자식 노드, 이 노드를 지나는 이름 집합, 짧은 순서로 정렬한 이름 목록(변경 시 무효화)]
+        self._postings = {} # 1글자/NGRAM글자 조각 → 이름 집합
+        self._usage = {}; self._tick = 0 # 이름 → [사용 횟수, 마지막 사용 시점]
+        self._sorted = None # 빈 검색어에 쓰는 정렬된 이름 목록 (변경 시 무효화)
+
+    def __len__(self): return len(self._kinds)
+    def __contains__(self, name): return name in self._kinds
+    def kind(self, name): return self._kinds.get(name)
+
+    @staticmethod
+    def _grams(lower):
+        grams = set(lower)
+        grams.update(lower[i:i + NGRAM] for i in range(len(lower) - NGRAM + 1))
+        return grams
+
+    def add(self, name, kind='user'):
+        if name in self._kinds: self._kinds[name] = kind; return
+        self._kinds[name] = kind; self._sorted = None; lower = name.lower()
+        node = self._trie; node[1].add(name); node[2] = None
+        for c in lower: node = node[0].setdefault(c, [{}, set(), None]); node[1].add(name); node[2] = None
+        for gram in self._grams(lower): self._postings.setdefault(gram, set()).add(name)
+
+    def remove(self, name):
+        if self._kinds.pop(name, None) is None: return
+        self._sorted = None; self._usage.pop(name, None); lower = name.lower()
+        path = [self._trie]
+        for c in lower: path.append(path[-1][0][c])
+        for node in path: node[1].discard(name); node[2] = None
+        for parent, c, node in zip(reversed(path[:-1]), reversed(lower), reversed(path[1:])):
+            if node[1]: break
+            del parent[0][c] # 더 이상 지나는 이름이 없는 가지는 잘라냅니다.
+        for gram in self._grams(lower):
+            names = self._postings.get(gram)
+            if names is not None:
+                names.discard(name)
+                if not names: del self._postings[gram]
+
+    def sync(self, kinds):
+        """색인을 kinds(이름 → 종류)와 같게 맞춥니다. 바뀐 이름만 더하고 뺍니다."""
+        for name in [name for name in self._kinds if name not in kinds]: self.remove(name)
+        for name, kind in kinds.items():
+            if self._kinds.get(name) != kind: self.add(name, kind)
+
+    def record_use(self, name):
+        if name not in self._kinds: return
+        self._tick += 1; usage = self._usage.setdefault(name, [0, 0]); usage[0] += 1; usage[1] = self._tick
+
+    def usage_bonus(self, name):
+        usage = self._usage.get(name)
+        if not usage: return 0
+        return RECENCY_BONUS * RECENCY_DECAY ** (self._tick - usage[1]) + FREQUENCY_BONUS * min(usage[0], MAX_FREQUENCY)
+
+    def _prefix_node(self, lower):
+        node = self._trie
+        for c in lower:
+            node = node[0].get(c)
+            if node is None: return None
+        return node
+
+    def _prefix(self, lower):
+        node = self._prefix_node(lower)
+        return node[1] if node else set()
+
+    def _shortest_prefix(self, lower, count):
+        """접두어가 lower인 이름 중 짧은 것부터 count개입니다. 접두어 점수는 짧을수록(일치하면 최고점) 높습니다."""
+        node = self._prefix_node(lower)
+        if node is None: return []
+        if len(node[1]) <= count: return node[1]
+        if node[2] is None: node[2] = sorted(node[1], key=lambda name: (len(name), name.lower(), name))
+        return node[2][:count]
+
+    def _intersect(self, grams):
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        if not postings or not postings[0]: return set()
+        return postings[0].intersection(*postings[1:])
+
+    def _substring(self, lower):
+        if len(lower) == 1 or len(lower) == NGRAM: return self._postings.get(lower, set())
+        grams = set(lower) if len(lower) < NGRAM else {lower[i:i + NGRAM] for i in range(len(lower) - NGRAM + 1)}
+        return {name for name in self._intersect(grams) if lower in name.lower()}
+
+    def search(self, query, limit=DEFAULT_LIMIT, exclude=(), built_in=True):
+        """query에 맞는 (이름, 종류) 목록을 점수 순서로 최대 limit개 반환합니다."""
+        accept = lambda name: name not in exclude and (built_in or self._kinds[name] != 'built-in')
+        lower = query.lower()
+        if not lower:
+            if self._sorted is None: self._sorted = sorted(self._kinds, key=lambda name: (name.lower(), name))
+            recent = sorted(self._usage, key=lambda name: -self._usage[name][1])
+            names = []; seen = set()
+            for name in itertools.chain(recent, self._sorted):
+                if name in seen or not accept(name): continue
+                seen.add(name); names.append(name)
+                if len(names) >= limit: break
+            return [(name, self._kinds[name]) for name in names]
+        # 접두어(짧은 이름부터) → 부분 문자열 → 부분 수열 순서로 후보를 모으되 SCAN_LIMIT개까지만 점수를 매깁니다. (한 글자 입력에도 전체를 훑지 않도록)
+        # 최근에 쓴 이름은 가산점으로 순위가 오를 수 있으므로 항상 후보에 넣습니다.
+        prefix = self._prefix(lower); candidates = set(self._usage); candidates.update(self._shortest_prefix(lower, SCAN_LIMIT))
+        if len(prefix) < limit:
+            substring = self._substring(lower)
+            candidates.update(itertools.islice((name for name in substring if name not in prefix), max(0, SCAN_LIMIT - len(candidates))))
+            if len(candidates) < limit:
+                # 연속되지 않은 입력(예: usrnm → user_name)은 글자 포스팅을 교집합해 후보를 좁힌 뒤 점수로 거릅니다.
+                postings = sorted((self._postings.get(c, set()) for c in set(lower)), key=len)
+                matches = (name for name in postings[0] if name not in candidates and all(name in names for names in postings[1:]))
+                candidates.update(itertools.islice(matches, SCAN_LIMIT - len(candidates)))
+        scored = []
+        for name in candidates:
+            if not accept(name): continue
+            score = fuzzy_score(lower, name)
+            if score is not None: scored.append((-(score + self.usage_bonus(name)), len(name), name))
+        return [(name, self._kinds[name]) for _, _, name in heapq.nsmallest(limit, scored)]
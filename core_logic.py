@@ -1,17 +1,58 @@
 # core_logic.py
 
-import vertexai
-from vertexai.generative_models import GenerativeModel
 from vertexai.preview import caching
+from vertexai.generative_models import Part, GenerationConfig
 
+import hashlib
 import os
 import re
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from PySide6.QtCore import QObject, Signal, QRunnable, Slot
 
+from data_models import TaskColumns, GenerationSettings
+from output_writer import OutputWriter, find_collisions
+from output_sinks import create_sink
+from request_engine import (HedgePolicy, HedgedCaller, RequestCoalescer, CancelToken,
+                            RequestCancelled, RequestTimeout, stream_generate, usage_to_dict)
+from endpoint_pool import EndpointPool, run_for_resource, is_throttling_error
+from run_log import RunLogWriter, DEFAULT_MAX_BYTES
+from attachment_store import AttachmentRegistry, AttachmentRef, local_path_from_uri
+from semantic_cache import DEFAULT_THRESHOLD
+from model_router import ModelRouter, default_max_output_tokens
+from cache_analytics import CacheUsageStore
+
+ATTACHMENT_MARKER = re.compile("\uE000(\\d+)\uE001")
+
 class VariableResolver:
     def __init__(self, variables):
-        self.variables = {var.name: var.value for var in variables.values()}; self.var_pattern = re.compile(r"\{([^}]+)\}")
+        # 첨부 파일 변수는 일반 텍스트에서는 파일 이름으로, 프롬프트에서는 첨부 파일(Part)로 풀립니다.
+        self.variables = {var.name: os.path.basename(var.value) if var.kind == 'file' else var.value for var in variables.values()}
+        self.attachments = {var.name: var.value for var in variables.values() if var.kind == 'file'}
+        self.var_pattern = re.compile(r"\{([^}]+)\}")
+    def resolve_contents(self, text):
+        """text를 풀되 첨부 파일 변수는 AttachmentRef로 남겨 [문자열 | AttachmentRef] 목록을 반환합니다."""
+        if not self.attachments: return [self.resolve(text)]
+        names = list(self.attachments)
+        resolved = self.resolve(text, {name: f"\uE000{i}\uE001" for i, name in enumerate(names)})
+        contents = []
+        for i, piece in enumerate(ATTACHMENT_MARKER.split(resolved)):
+            if i % 2: name = names[int(piece)]; contents.append(AttachmentRef(name, self.attachments[name]))
+            elif piece: contents.append(piece)
+        return contents
+    def values_key(self, text):
+        """text가 참조하는 변수의 (풀린) 값을 요약한 키입니다. 유사 응답 캐시는 이 값이 같은 프롬프트끼리만 응답을 재사용합니다.
+
+        그래서 날짜처럼 사소한 값만 다른 프롬프트도 변수로 넣었다면 재사용하지 않습니다. (다른 값에 이전 답을 돌려주지 않는 쪽을 택했습니다)
+        """
+        digest = hashlib.sha1()
+        for name in sorted({match.group(1) for match in self.var_pattern.finditer(text)} & self.variables.keys()):
+            digest.update(f"{name}\0{self.resolve(self.variables[name], visited={name})}\0".encode('utf-8'))
+        return digest.hexdigest()
     def resolve(self, text, context_vars=None, visited=None):
         if visited is None: visited = set()
         if context_vars is None: context_vars = {}
@@ -30,82 +71,382 @@ class VariableResolver:
         return resolved_text
 
 class TaskRunnerSignals(QObject):
-    log_message = Signal(str); finished = Signal(); error = Signal(str)
+    log_record = Signal(str, str, str); finished = Signal(); error = Signal(str) # log_record: (message, level, task)
+    progress = Signal(int, int); output_written = Signal(str, str) # progress: (끝난 태스크 수, 전체), output_written: (결과 위치, 상태)
 
 class TaskRunner(QRunnable):
     def __init__(self, api_key, model_name, variables, tasks_in_order, 
-                 output_folder, output_extension, log_folder, cached_content_name=None):
+                 output_folder, output_extension, log_folder, cached_content_name=None, run_options=None, semantic_cache=None,
+                 endpoint_pool=None, scheduler=None, priority='normal'):
         super().__init__()
         self.signals = TaskRunnerSignals()
         self.api_key = api_key; self.model_name = model_name; self.variables = variables
-        self.tasks_in_order = tasks_in_order; self.output_folder = output_folder
+        # 실행 시작 시점의 스냅샷을 사용하여 실행 중 GUI에서의 편집과 분리합니다. (문자열은 복사하지 않고 공유)
+        self.resolver = VariableResolver(variables); self.tasks_in_order = TaskColumns(tasks_in_order)
+        self.output_folder = output_folder
         self.output_extension = output_extension; self.log_folder = log_folder
         self.cached_content_name = cached_content_name
-        self.is_running = True; self.log_filepath = None
+        self.run_options = run_options or {}
+        self.hedge_policy = HedgePolicy.from_dict(self.run_options.get('hedging'))
+        self.max_concurrency = max(1, int(self.run_options.get('max_concurrency', 1)))
+        self.coalesce_requests = self.run_options.get('coalesce_requests', True)
+        self.request_timeout = self.run_options.get('request_timeout', 0)
+        self.keep_partial_outputs = self.run_options.get('keep_partial_outputs', False)
+        self.output_sink = self.run_options.get('output_sink', 'directory'); self.output_container = self.run_options.get('output_container')
+        self._sink = None
+        # 유사 응답 캐시는 실행 사이에 유지되도록 호출하는 쪽(MainWindow)이 가지고 있다가 넘겨줍니다.
+        semantic_options = self.run_options.get('semantic_cache') or {}
+        self.semantic_cache = semantic_cache if semantic_options.get('enabled') else None
+        self.semantic_threshold = float(semantic_options.get('threshold', DEFAULT_THRESHOLD))
+        # 이전 실행의 풀을 넘겨받으면 만들어 둔 모델 객체와 엔드포인트 지연 통계를 그대로 씁니다. (감시 모드의 반복 실행)
+        self.endpoint_pool = endpoint_pool
+        # 여러 실행이 동시에 돌 때 전역 스케줄러가 요청 순서(우선순위, 공정성)와 속도 예산을 정합니다.
+        self.scheduler = scheduler; self.priority = priority
+        # 태스크별 모델 정책('auto'는 난이도/크기/지연 기준 자동 선택)을 시도할 모델 목록으로 바꿉니다.
+        self.router = ModelRouter(model_name)
+        # 프로젝트의 생성 설정. 태스크에 없는 항목은 이 값을, 여기에도 없으면 모델 기본값을 사용합니다.
+        self.generation = GenerationSettings.from_dict(self.run_options.get('generation'))
+        self._aborted = threading.Event(); self._cancel_token = CancelToken()
+        self.is_running = True; self.log_filepath = None; self._log_lock = threading.Lock()
+        self._task_context = threading.local(); self._task_by_path = {}
+        self.run_id = uuid.uuid4().hex[:12]; self.log_format = self.run_options.get('log_format', 'text')
+        self.log_max_bytes = int(self.run_options.get('log_max_mb', DEFAULT_MAX_BYTES // (1024 * 1024))) * 1024 * 1024
+        self._run_log = None
+        self.thread_profiles = None # 실행을 측정할 때 diagnostics.ThreadProfiles (작업 스레드의 태스크/요청 본문을 측정합니다)
     
-    def _file_log(self, message):
+    def _file_log(self, message, level="INFO"):
         if not self.log_folder: return
+        if self.log_format == 'jsonl': self._event('log', level=level, message=message); return
         if not self.log_filepath:
             timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S"); self.log_filepath = os.path.join(self.log_folder, f"log_{timestamp}.txt")
             try: os.makedirs(self.log_folder, exist_ok=True)
-            except OSError as e: self.signals.log_message.emit(f"로그 폴더 생성 실패: {e}"); self.log_folder = None; return
-        with open(self.log_filepath, 'a', encoding='utf-8') as f: f.write(f"{datetime.now().strftime('%H:%M:%S')} - {message}\n")
+            except OSError as e: self.signals.log_record.emit(f"로그 폴더 생성 실패: {e}", "ERROR", ""); self.log_folder = None; return
+        with self._log_lock, open(self.log_filepath, 'a', encoding='utf-8') as f: f.write(f"{datetime.now().strftime('%H:%M:%S')} - [{level}] {message}\n")
+
+    def _log(self, message, level="INFO"):
+        # 태스크 실행 스레드에서 남긴 로그에는 해당 태스크 이름을 붙여 뷰어에서 필터링할 수 있게 합니다.
+        task = getattr(self._task_context, 'name', "")
+        self.signals.log_record.emit(message, level, task); self._file_log(message, level)
+
+    def _event(self, event, **fields):
+        """구조화 로그(JSONL) 형식일 때 실행 이벤트를 기록합니다. task_id는 현재 태스크 스레드에서 가져옵니다."""
+        if self.log_format != 'jsonl' or not self.log_folder: return
+        try:
+            if self._run_log is None:
+                with self._log_lock:
+                    if self._run_log is None: self._run_log = RunLogWriter(self.log_folder, self.run_id, max_bytes=self.log_max_bytes)
+            fields.setdefault('task', getattr(self._task_context, 'name', None) or None)
+            self._run_log.write(event, task_id=getattr(self._task_context, 'id', None), **fields)
+        except OSError as e:
+            self.signals.log_record.emit(f"로그 기록 실패: {e}", "ERROR", ""); self.log_folder = None
+
+    def _output_path(self, resolved_task_name):
+        safe_task_name = "".join(c if c.isalnum() or c in ' -_' else '_' for c in resolved_task_name)
+        ext = self.output_extension if self.output_extension.startswith('.') else '.' + self.output_extension
+        return os.path.join(self.output_folder, f"{safe_task_name}{ext}")
+
+    def _hedge_target(self, pool):
+        """hedge 요청을 보낼 (엔드포인트 풀, 모델 이름)을 반환합니다. hedge를 쓰지 않으면 None입니다."""
+        policy = self.hedge_policy
+        if not policy.enabled: return None
+        if self.cached_content_name:
+            # 캐시는 특정 모델/리전에 고정되어 있으므로 같은 캐시, 같은 리전으로만 hedge 합니다.
+            if policy.secondary_model or policy.secondary_location:
+                self._log("  - Context Cache 사용 중에는 보조 모델/Location 없이 같은 캐시로 hedge 요청을 보냅니다.")
+            self._log(f"⏱ hedge 사용: p{policy.percentile} 지연 초과 시 (예산 {policy.budget_ratio:.0%})")
+            return pool, None
+        hedge_pool = pool
+        if policy.secondary_location:
+            hedge_pool = EndpointPool([(pool.endpoints[0].project, policy.secondary_location)])
+        hedge_model_name = policy.secondary_model or self.model_name
+        target = hedge_model_name + (f" @ {policy.secondary_location}" if policy.secondary_location else "")
+        self._log(f"⏱ hedge 사용: p{policy.percentile} 지연 초과 시 '{target}'로 중복 요청 (예산 {policy.budget_ratio:.0%})")
+        return hedge_pool, hedge_model_name
+
+    def _generate(self, pool, prompt, model_name, token, config=None):
+        response, _ = pool.call(lambda model: stream_generate(model, prompt, token, generation_config=config),
+                                model_name=model_name, cached_content_name=self.cached_content_name)
+        return response
+
+    def _in_worker(self, fn):
+        """작업 스레드에서 실행할 함수입니다. 실행을 측정 중이면 그 스레드에서도 측정합니다."""
+        return self.thread_profiles.wrap(fn) if self.thread_profiles else fn
+
+    def _scheduled(self, fn):
+        if self.scheduler is None: return fn
+        def call(token):
+            with self.scheduler.slot(self.run_id, token): return fn(token)
+        return call
+
+    def _model_chain(self, model, complexity, contents):
+        """(시도할 모델 목록, 자동 선택 이유)를 반환합니다. Context Cache는 모델이 고정되어 있으므로 항상 실행 설정의 모델입니다."""
+        if self.cached_content_name or not model: return [self.model_name], None
+        return self.router.chain(model, complexity, contents)
+
+    def _generate_routed(self, pool, prompt, chain, token, used, config=None):
+        """chain의 모델을 앞에서부터 시도합니다. 스로틀링되면 다음 모델로 넘어가고, 지연/실패를 모델 통계에 기록합니다."""
+        for i, model_name in enumerate(chain):
+            def attempt(t, model_name=model_name):
+                start = time.monotonic(); response = self._generate(pool, prompt, model_name, t, config)
+                return response, time.monotonic() - start # 스케줄러 대기 시간은 빼고 잽니다.
+            try: response, latency = self._scheduled(attempt)(token)
+            except RequestCancelled: raise
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                if not self.cached_content_name: self.router.stats.record(model_name, failed=True, throttled=throttled)
+                if not throttled or i == len(chain) - 1: raise
+                self._log(f"  - 🧭 '{model_name}' 요청이 제한되어 '{chain[i + 1]}' 모델로 다시 시도합니다.", "WARNING"); continue
+            if not self.cached_content_name: self.router.stats.record(model_name, latency)
+            used['model'] = model_name
+            return response
+
+    def _generation_config(self, settings):
+        return GenerationConfig(**settings.request_kwargs()) if not settings.is_empty() else None
 
-    def _log(self, message): self.signals.log_message.emit(message); self._file_log(message)
+    def _semantic_threshold(self, threshold): return threshold or self.semantic_threshold
+
+    def _build_request(self, contents, attachments):
+        """[문자열 | AttachmentRef] 목록을 (요청 내용, 요청 병합용 키 문자열)로 바꿉니다.
+
+        첨부 파일은 저장소에 한 번만 올리고 참조(Part.from_uri)로 보내며, 저장소가 없으면 내용을 직접 실어 보냅니다.
+        """
+        if all(isinstance(item, str) for item in contents): text = "".join(contents); return text, text
+        parts = []; key_parts = []
+        for item in contents:
+            if isinstance(item, str): parts.append(Part.from_text(item)); key_parts.append(item); continue
+            if not os.path.isfile(item.path): raise ValueError(f"첨부 파일 변수 '{item.name}'의 파일을 찾을 수 없습니다: {item.path}")
+            info, reused = attachments.resolve(item.path)
+            if info['uri'] and info['uri'].startswith("gs://"): parts.append(Part.from_uri(info['uri'], mime_type=info['mime_type']))
+            else:
+                with open(local_path_from_uri(info['uri']) or item.path, 'rb') as f: parts.append(Part.from_data(f.read(), mime_type=info['mime_type']))
+            key_parts.append(f"\uE000{info['digest']}\uE001")
+            status = "기존 업로드 재사용" if reused else "업로드 완료" if info['uri'] else "요청에 직접 포함"
+            self._log(f"  - 📎 첨부 '{item.name}' ({os.path.basename(item.path)}, {info['size'] / (1024 * 1024):.1f} MB): {status}")
+        return parts, "".join(key_parts)
+
+    def _on_output_written(self, filepath, status, error):
+        # writer 스레드에서 호출됩니다.
+        index = self._task_by_path.get(filepath[:-len(".partial")] if filepath.endswith(".partial") else filepath)
+        self._task_context.name = self.tasks_in_order.names[index] if index is not None else ""
+        self._task_context.id = self.tasks_in_order.ids[index] if index is not None else None
+        self._event('output_written', path=filepath, status=status, error=str(error) if error else None)
+        if status != 'failed' and self._sink.kind == 'directory' and not filepath.endswith(".partial") and os.path.exists(filepath + ".partial"):
+            # 완성된 결과가 저장되면 이전 실행에서 남은 부분 응답 파일은 정리합니다.
+            try: os.remove(filepath + ".partial")
+            except OSError: pass
+        if index is not None: filepath = self._sink.describe(filepath)
+        self.signals.output_written.emit(filepath, status)
+        if status == 'written': self._log(f"✅ 파일 저장 완료: {filepath}")
+        elif status == 'unchanged': self._log(f"⏭ 내용 변경 없음, 저장 생략: {filepath}")
+        else: self._log(f"❌ 파일 저장 실패: {filepath} ({type(error).__name__}: {error})", "ERROR")
 
     @Slot()
     def run(self):
         self._log("="*40); self._log("🚀 워크플로우 실행을 시작합니다.")
+        self._event('run_started', model=self.model_name, cache=self.cached_content_name, tasks=len(self.tasks_in_order))
+        writer = None; hedger = None; pool = None; attachments = None; coalescer = RequestCoalescer(); timed_out = []
+        semantic_scope = (self.model_name, self.cached_content_name); semantic_reused = []; routed = []; budgets = []; cache_usage = []
+        if self.scheduler: self.scheduler.register(self.run_id, self.priority)
         try:
-            project_id = os.getenv("PROJECT_ID"); location = os.getenv("LOCATION")
-            vertexai.init(project=project_id, location=location)
-            
-            model = None
+            pool = self.endpoint_pool or EndpointPool.from_run_options(self.run_options)
             if self.cached_content_name:
-                if not project_id or not location:
-                    raise ValueError(".env 파일에 Vertex AI 사용을 위한 PROJECT_ID와 LOCATION이 설정되어야 합니다.")
-                self._log(f"Vertex AI 초기화 완료 (Project: {project_id}, Location: {location})")
-                
-                cached_content = caching.CachedContent.get(self.cached_content_name)
-                model = GenerativeModel.from_cached_content(cached_content=cached_content)
-                # *** 수정됨: model.model_name -> cached_content.model_name ***
+                # 캐시가 만들어진 리전의 엔드포인트만 사용합니다.
+                pool = pool.pinned_to(self.cached_content_name)
+                endpoint = pool.endpoints[0]
+                self._log(f"Vertex AI 초기화 완료 (Project: {endpoint.project}, Location: {endpoint.location})")
+                cached_content = run_for_resource(self.cached_content_name, lambda: caching.CachedContent.get(self.cached_content_name))
                 self._log(f"🧠 캐시 '{os.path.basename(self.cached_content_name)}' (모델: {os.path.basename(cached_content.model_name)}) 사용")
             else:
-                model = GenerativeModel(self.model_name)
                 self._log(f"🧠 모델 '{self.model_name}' 직접 사용")
+            if len(pool.endpoints) > 1:
+                self._log(f"🌐 엔드포인트 {len(pool.endpoints)}개에 요청을 분산합니다: {', '.join(ep.key for ep in pool.endpoints)}")
             
-            resolver = VariableResolver(self.variables)
+            resolver = self.resolver
             os.makedirs(self.output_folder, exist_ok=True); self._log(f"📂 결과 저장 폴더: {self.output_folder}")
 
-            for task in self.tasks_in_order:
-                if not self.is_running: self._log("🔴 작업이 사용자에 의해 중단되었습니다."); break
-                
-                resolved_task_name = resolver.resolve(task.name)
+            # 파일명 충돌은 API 요청 전에 미리 검사하여 서로 덮어쓰는 일이 없도록 합니다.
+            # 태스크는 열 스냅샷의 순번으로 다루고, Task 객체는 실행할 때 하나씩 만듭니다.
+            columns = self.tasks_in_order; output_plan = []
+            for index, resolved_task_name in enumerate(map(resolver.resolve, columns.names)):
+                output_plan.append((index, resolved_task_name, self._output_path(resolved_task_name)))
+            collisions = find_collisions([(resolved_name, filepath) for _, resolved_name, filepath in output_plan])
+            if collisions:
+                details = "; ".join(f"{os.path.basename(path)} <- {', '.join(names)}" for path, names in collisions.items())
+                raise ValueError(f"결과 파일명이 겹치는 태스크가 있습니다: {details}")
+
+            if self.resolver.attachments:
+                attachments = AttachmentRegistry.from_env()
+                if attachments.store: self._log(f"📎 첨부 파일 저장소: {attachments.store.key} (같은 내용은 한 번만 업로드)")
+                else: self._log("📎 ATTACHMENT_STORE가 설정되지 않아 첨부 파일을 요청마다 직접 포함합니다.", "WARNING")
+            hedge_target = self._hedge_target(pool)
+            hedger = HedgedCaller(self.hedge_policy)
+            self._sink = create_sink(self.output_sink, self.output_folder, self.output_container).open()
+            if self._sink.kind != 'directory': self._log(f"📦 결과를 '{self._sink.path}' 하나에 모아서 저장합니다.")
+            writer = OutputWriter(on_result=self._on_output_written, sink=self._sink).start()
+            if self.max_concurrency > 1: self._log(f"⚡ 최대 {self.max_concurrency}개의 태스크를 동시에 실행합니다.")
+
+            self._task_by_path = {filepath: index for index, _, filepath in output_plan}
+
+            def run_task(index, resolved_task_name, filepath):
+                if not self.is_running or self._aborted.is_set(): return
+                task = columns.record(index)
+                self._task_context.name = task.name; self._task_context.id = task.id
+                self._event('task_started', output=filepath)
+                output_meta = {'task_id': task.id, 'task': task.name, 'run_id': self.run_id, 'model': self.model_name}
                 self._log(f"\n▶ 태스크 '{task.name}' (-> '{resolved_task_name}') 실행 시작...")
                 
-                final_prompt = resolver.resolve(task.prompt)
-                self._log("  - 프롬프트 생성 완료. API 요청 중...")
+                generation = task.generation.merged_over(self.generation)
+                task_scope = semantic_scopes.get(task.id)
+                semantic_vector = semantic_vectors.get(task.id); hit = semantic_hits.get(task.id)
+                if semantic_vector is not None and hit is None:
+                    # 이번 실행에서 먼저 끝난 태스크의 응답도 재사용할 수 있도록 요청 직전에 한 번 더 찾아봅니다.
+                    hit = self.semantic_cache.lookup(semantic_vector, self._semantic_threshold(task.semantic_threshold), task_scope, count=False)
+                if hit:
+                    response_text, similarity = hit; semantic_reused.append(task.name)
+                    self._event('semantic_cache_hit', similarity=round(similarity, 4))
+                    self._log(f"  - ♻ 비슷한 이전 프롬프트의 응답을 재사용합니다. (유사도 {similarity:.3f}, API 호출 생략)")
+                else:
+                    contents = resolved_contents.get(task.id) or resolver.resolve_contents(task.prompt)
+                    final_prompt, prompt_key = self._build_request(contents, attachments)
+                    chain, reason = model_chains.get(task.id) or self._model_chain(task.model, task.complexity, contents); used = {}
+                    if reason: self._log(f"  - 🧭 자동 모델 선택: '{chain[0]}' ({reason})")
+                    elif chain[0] != self.model_name: self._log(f"  - 🧭 태스크 지정 모델 '{chain[0]}' 사용")
+                    self._log("  - 프롬프트 생성 완료. API 요청 중...")
                 
-                response = model.generate_content(final_prompt)
-                response_text = response.text
-                self._log("  - API 응답 수신 완료.")
+                    # 태스크별 제한 시간이 없으면 전역 제한 시간을 사용합니다. (0은 제한 없음)
+                    timeout = task.timeout or self.request_timeout
+                    task_token = CancelToken(self._cancel_token, timeout=timeout or None)
+                    config = self._generation_config(generation)
+                    hedge_fn = self._in_worker(self._scheduled(lambda t: self._generate(hedge_target[0], final_prompt, hedge_target[1], t, config))) if hedge_target else None
+                    request_fn = lambda: hedger.call(self._in_worker(lambda t: self._generate_routed(pool, final_prompt, chain, t, used, config)), hedge_fn, task_token)
+                    request_start = time.monotonic()
+                    try:
+                        if self.coalesce_requests:
+                            request_key = RequestCoalescer.make_key("|".join(chain), self.cached_content_name, generation.key() + prompt_key)
+                            (response, hedged, winner), shared = coalescer.call(request_key, request_fn, task_token)
+                        else: (response, hedged, winner), shared = request_fn(), False
+                    except RequestCancelled as e:
+                        self._event('task_timeout' if isinstance(e, RequestTimeout) else 'task_cancelled',
+                                    latency=round(time.monotonic() - request_start, 3), partial_chars=len(e.partial_text))
+                        if isinstance(e, RequestTimeout):
+                            timed_out.append(task.name); self._log(f"  - ⌛ 태스크 '{task.name}' 요청이 제한 시간({timeout}초)을 초과하여 취소되었습니다.", "WARNING")
+                        else: self._log(f"  - 🔴 태스크 '{task.name}' 요청이 취소되었습니다.", "WARNING")
+                        if e.partial_text and self.keep_partial_outputs:
+                            writer.submit(filepath + ".partial", e.partial_text, dict(output_meta, partial=True)); self._log(f"  - 부분 응답을 '{os.path.basename(filepath)}.partial'로 보관합니다.")
+                        return
+                    finally: task_token.release() # 실행 전체의 토큰에 태스크 토큰이 쌓이지 않게 합니다.
+                    response_text = response.text
+                    model_used = (hedge_target[1] or self.model_name) if winner == 'hedge' else used.get('model', chain[0])
+                    output_meta['model'] = model_used; routed.append((model_used, bool(reason)))
+                    usage = None if shared else usage_to_dict(getattr(response, 'usage_metadata', None))
+                    finish_reason = getattr(response, 'finish_reason', None); latency = round(time.monotonic() - request_start, 3)
+                    # 캐시 효과 분석용 기록입니다. 캐시 없는 요청도 비교 기준으로 함께 남깁니다.
+                    if usage: cache_usage.append((self.run_id, self.cached_content_name, model_used, usage, latency))
+                    self._event('request_completed', latency=latency, shared=shared, hedged=hedged,
+                                tokens=usage, finish_reason=finish_reason, max_output_tokens=generation.max_output_tokens or None)
+                    if shared: self._log("  - 🔁 같은 프롬프트의 요청 결과를 공유합니다. (API 호출 생략)")
+                    elif hedged: self._log(f"  - ⏱ 응답 지연으로 hedge 요청을 보냈습니다. (사용된 응답: {winner})")
+                    self._log("  - API 응답 수신 완료.")
+                    if generation.max_output_tokens and usage:
+                        # 상한이 없었을 때의 출력량은 알 수 없으므로 절감량으로 표시하지 않고 실제 출력과 상한만 비교합니다.
+                        cap = min(generation.max_output_tokens, default_max_output_tokens(model_used))
+                        truncated = finish_reason == 'MAX_TOKENS'; budgets.append((task.name, cap, usage['candidates'], truncated))
+                        self._log(f"  - ✂ 출력 {usage['candidates']:,} 토큰 / 상한 {cap:,} 토큰 ({usage['candidates'] / cap:.0%})"
+                                  + (", 상한에 도달하여 응답이 잘렸습니다" if truncated else ""), "WARNING" if truncated else "INFO")
+                    if semantic_vector is not None and not shared:
+                        self.semantic_cache.add(semantic_vector, response_text, task_scope, task.name)
 
                 output_template = task.output_template if task.output_template.strip() else "{RESPONSE}"
                 context_vars = {"RESPONSE": response_text}
                 final_output_content = resolver.resolve(output_template, context_vars)
 
-                safe_task_name = "".join(c if c.isalnum() or c in ' -_' else '_' for c in resolved_task_name)
-                ext = self.output_extension if self.output_extension.startswith('.') else '.' + self.output_extension
-                filepath = os.path.join(self.output_folder, f"{safe_task_name}{ext}")
-                
-                with open(filepath, "w", encoding="utf-8") as f: f.write(final_output_content)
-                self._log(f"✅ 파일 저장 완료: {filepath}")
+                writer.submit(filepath, final_output_content, output_meta)
+
+            # 유사 응답 캐시: 캐시 가능한 태스크의 프롬프트를 한꺼번에 임베딩하여 행렬 곱 한 번으로 조회합니다.
+            semantic_vectors = {}; semantic_hits = {}; semantic_scopes = {}; resolved_contents = {}; model_chains = {}
+            if self.semantic_cache is not None:
+                candidates = []
+                for index, _, _ in output_plan:
+                    if not columns.cacheable[index]: continue
+                    task_id = columns.ids[index]; prompt = columns.prompts[index]
+                    contents = resolver.resolve_contents(prompt); resolved_contents[task_id] = contents
+                    # 첨부 파일이 들어간 프롬프트는 텍스트만으로 같은 요청인지 판단할 수 없으므로 제외합니다.
+                    if not all(isinstance(item, str) for item in contents): continue
+                    candidates.append((index, "".join(contents)))
+                    chain = model_chains.setdefault(task_id, self._model_chain(columns.models[index], columns.complexities[index], contents))[0]
+                    # 다른 모델로 보낼 요청이나 생성 설정, 프롬프트에 넣은 변수 값이 다른 요청의 응답은 재사용하지 않습니다. (예: 'red' 대신 'blue'를 넣은 같은 템플릿)
+                    semantic_scopes[task_id] = semantic_scope + ("|".join(chain), columns.generations[index].merged_over(self.generation).key(), resolver.values_key(prompt))
+                if candidates:
+                    vectors = self.semantic_cache.embedder.embed_batch([text for _, text in candidates])
+                    # 범위별로 캐시 항목이 다르므로 같은 범위의 태스크끼리 묶어서 조회합니다.
+                    groups = {}
+                    for row, (index, _) in enumerate(candidates): groups.setdefault(semantic_scopes[columns.ids[index]], []).append(row)
+                    for task_scope, rows in groups.items():
+                        thresholds = [self._semantic_threshold(columns.semantic_thresholds[candidates[row][0]]) for row in rows]
+                        for row, hit in zip(rows, self.semantic_cache.lookup_batch(vectors[rows], thresholds, task_scope)):
+                            task_id = columns.ids[candidates[row][0]]; semantic_vectors[task_id] = vectors[row]
+                            if hit: semantic_hits[task_id] = hit
+                    self._log(f"♻ 유사 응답 캐시: 캐시 가능한 태스크 {len(candidates)}개 중 {len(semantic_hits)}개가 이전 응답과 일치합니다.")
+
+            executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="TaskRunner")
+            try:
+                task_body = self._in_worker(run_task); futures = [executor.submit(task_body, *entry) for entry in output_plan]
+                for done, future in enumerate(as_completed(futures), 1):
+                    try: future.result(); self.signals.progress.emit(done, len(futures))
+                    except Exception:
+                        # 한 태스크가 실패하면 아직 시작하지 않은 태스크는 실행하지 않습니다.
+                        self._aborted.set(); executor.shutdown(wait=False, cancel_futures=True); raise
+            finally: executor.shutdown(wait=True)
+            if not self.is_running: self._log("🔴 작업이 사용자에 의해 중단되었습니다.", "WARNING")
 
         except Exception as e:
             error_msg = f"❌ 치명적인 오류 발생: {type(e).__name__}: {e}"
-            self._log(error_msg); self.signals.error.emit(error_msg)
+            self._log(error_msg, "ERROR"); self.signals.error.emit(error_msg)
         finally:
+            if hedger and hedger.hedges_issued:
+                self._log(f"⏱ hedge 요청 {hedger.hedges_issued}회 / 전체 {hedger.requests_started}회 (hedge 응답 사용 {hedger.hedge_wins}회)")
+            if timed_out:
+                self._log(f"⌛ 제한 시간 초과로 완료하지 못한 태스크 {len(timed_out)}개: {', '.join(timed_out)}", "WARNING")
+            if self.semantic_cache is not None and self.semantic_cache.lookups:
+                stats = self.semantic_cache.stats()
+                self._log(f"♻ 유사 응답 캐시: 이번 실행 재사용 {len(semantic_reused)}회, 누적 적중률 {stats['hit_rate']:.0%} ({stats['hits']}/{stats['lookups']}), "
+                          f"항목 {stats['entries']}/{stats['capacity']} (내보냄 {stats['evictions']}개)")
+            if routed and any(model != self.model_name for model, _ in routed):
+                counts = {}
+                for model, _ in routed: counts[model] = counts.get(model, 0) + 1
+                # 자동 선택된 태스크를 실행 설정의 모델로 보냈을 때와 비교한 예상 지연(모델 통계 기준)입니다.
+                saved = sum(self.router.expected_latency(self.model_name) - self.router.expected_latency(model) for model, auto in routed if auto)
+                self._log(f"🧭 모델 라우팅: {', '.join(f'{model} {count}개' for model, count in sorted(counts.items()))}"
+                          + (f" (기본 모델 대비 예상 지연 약 {saved:.1f}초 절약)" if saved > 0 else ""))
+            if budgets:
+                truncated = [name for name, _, _, cut in budgets if cut]; output = sum(tokens for _, _, tokens, _ in budgets); capped = sum(cap for _, cap, _, _ in budgets)
+                self._log(f"✂ 출력 상한을 둔 태스크 {len(budgets)}개: 실제 출력 {output:,} 토큰 / 상한 합계 {capped:,} 토큰 ({output / capped:.0%})"
+                          + (f", 상한 도달 {len(truncated)}개 ({', '.join(truncated)})" if truncated else ""))
+            if routed and not self.cached_content_name:
+                try: self.router.stats.save()
+                except OSError as e: self._log(f"⚠ 모델 통계를 저장하지 못했습니다: {e}", "WARNING")
+            if cache_usage:
+                try: CacheUsageStore().record(cache_usage)
+                except (sqlite3.Error, OSError) as e: self._log(f"⚠ 캐시 사용 기록을 저장하지 못했습니다: {e}", "WARNING")
+            if coalescer.calls_saved:
+                self._log(f"🔁 동일 요청 병합으로 API 호출 {coalescer.calls_saved}회를 절약했습니다.")
+            if attachments:
+                try: attachments.flush()
+                except OSError: pass
+            if pool and len(pool.endpoints) > 1:
+                for line in pool.summary(): self._log(f"🌐 {line}", "INFO")
+            if writer:
+                if writer.pending(): self._log(f"💾 남은 결과 파일 {writer.pending()}개를 저장하는 중...")
+                writer.close()
+                stats = writer.stats
+                self._log(f"💾 저장 {stats['written']}개, 변경 없음 {stats['unchanged']}개, 실패 {stats['failed']}개", "ERROR" if stats['failed'] else "INFO")
             if self.is_running: self._log("\n🎉 모든 작업이 완료되었습니다.")
+            self._event('run_finished', stopped=not self.is_running, aborted=self._aborted.is_set(), timed_out=len(timed_out),
+                        calls_saved=coalescer.calls_saved, semantic_reused=len(semantic_reused),
+                        models={model: sum(1 for m, _ in routed if m == model) for model, _ in routed}, outputs=writer.stats if writer else None)
+            if self.scheduler: self.scheduler.unregister(self.run_id)
             self._log("="*40); self.signals.finished.emit()
             
-    def stop(self): self.is_running = False
\ No newline at end of file
+    def stop(self):
+        # 진행 중인 요청도 즉시 취소합니다. (스트리밍 중단, 대기 중인 태스크는 바로 반환)
+        self.is_running = False; self._cancel_token.cancel('stopped')
\ No newline at end of file
@@ -1,27 +1,113 @@
 # data_models.py
 
+import json
 import uuid
 
+class TextPool:
+    """같은 내용의 긴 문자열을 하나의 객체로 공유하는 풀입니다.
+
+    str은 불변이므로 공유된 문자열은 사실상 copy-on-write로 동작합니다. 편집하면 새 문자열이 만들어질 뿐
+    다른 복사본에는 영향이 없습니다. 파일을 읽는 동안에만 쓰고 버리므로, 편집으로 바뀐 문자열이 풀에 남지 않습니다.
+    """
+    __slots__ = ('_strings', 'min_length')
+
+    def __init__(self, min_length=64):
+        self._strings = {}; self.min_length = min_length
+
+    def intern(self, text):
+        if text is None or len(text) < self.min_length: return text
+        return self._strings.setdefault(text, text)
+
+VARIABLE_KINDS = ('text', 'file')
+TASK_COMPLEXITIES = ('simple', 'normal', 'complex')
+RESPONSE_MIME_TYPES = ('', 'text/plain', 'application/json', 'text/x.enum')
+
+class GenerationSettings:
+    """요청의 생성 설정(최대 출력 토큰, 중지 시퀀스, temperature, 응답 형식)입니다.
+
+    비어 있는 항목(0, None, 빈 값)은 상위 설정을 따릅니다. (태스크 → 프로젝트 → 모델 기본값)
+    실행 스냅샷과 복사된 태스크가 같은 객체를 공유하므로 고치지 않고 replace()로 새 객체를 만듭니다.
+    """
+    __slots__ = ('max_output_tokens', 'stop_sequences', 'temperature', 'response_mime_type', 'response_schema')
+
+    def __init__(self, max_output_tokens=0, stop_sequences=(), temperature=None, response_mime_type="", response_schema=None):
+        self.max_output_tokens = max(0, int(max_output_tokens or 0))
+        self.stop_sequences = tuple(s for s in (stop_sequences or ()) if s)
+        self.temperature = None if temperature is None else float(temperature)
+        self.response_mime_type = response_mime_type if response_mime_type in RESPONSE_MIME_TYPES else ""
+        self.response_schema = response_schema or None # JSON 스키마(dict), 응답 형식이 JSON/열거형일 때만 사용
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls): return data
+        data = data or {}
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+    def to_dict(self):
+        """설정된 항목만 담습니다. (태스크가 많은 프로젝트 파일이 불필요하게 커지지 않도록)"""
+        data = {}
+        if self.max_output_tokens: data['max_output_tokens'] = self.max_output_tokens
+        if self.stop_sequences: data['stop_sequences'] = list(self.stop_sequences)
+        if self.temperature is not None: data['temperature'] = self.temperature # 0.0도 유효한 값입니다.
+        if self.response_mime_type: data['response_mime_type'] = self.response_mime_type
+        if self.response_schema: data['response_schema'] = self.response_schema
+        return data
+
+    def is_empty(self): return not self.to_dict()
+
+    def replace(self, **changes): return GenerationSettings(**dict(self.to_dict(), **changes))
+
+    def merged_over(self, base):
+        """이 설정에 없는 항목을 base에서 가져온 새 설정을 반환합니다."""
+        return GenerationSettings(**dict(base.to_dict(), **self.to_dict())) if not base.is_empty() else self
+
+    def key(self):
+        """요청 병합/유사 응답 캐시에서 생성 설정이 같은 요청끼리만 묶기 위한 문자열입니다."""
+        return json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False)
+
+    def request_kwargs(self):
+        """GenerationConfig(**kwargs)에 넘길 인자입니다. 응답 스키마는 응답 형식이 지정된 경우에만 보냅니다."""
+        kwargs = self.to_dict()
+        if not self.response_mime_type or self.response_mime_type == 'text/plain': kwargs.pop('response_schema', None)
+        return kwargs
+
+    def __eq__(self, other): return isinstance(other, GenerationSettings) and self.to_dict() == other.to_dict()
+
+    def __repr__(self): return f"GenerationSettings({self.to_dict()})"
+
 class Variable:
-    def __init__(self, name="새 변수", value="", id=None):
+    __slots__ = ('id', 'name', 'value', 'kind')
+
+    def __init__(self, name="새 변수", value="", id=None, kind='text'):
         self.id = id if id else str(uuid.uuid4())
         self.name = name
         self.value = value
+        self.kind = kind if kind in VARIABLE_KINDS else 'text' # 'file'이면 value는 첨부할 파일 경로
 
     def to_dict(self):
-        return {'id': self.id, 'name': self.name, 'value': self.value}
+        return {'id': self.id, 'name': self.name, 'value': self.value, 'kind': self.kind}
 
     def __repr__(self):
         return f"Variable(id={self.id}, name='{self.name}')"
 
 class Task:
+    __slots__ = ('id', 'name', 'prompt', 'output_template', 'enabled', 'timeout', 'cacheable', 'semantic_threshold', 'model', 'complexity',
+                 'generation')
+
     # *** 수정됨: output_template 필드 추가 ***
-    def __init__(self, name="새 태스크", prompt="", output_template="", id=None, enabled=True):
+    def __init__(self, name="새 태스크", prompt="", output_template="", id=None, enabled=True, timeout=0,
+                 cacheable=True, semantic_threshold=0.0, model="", complexity='normal', generation=None):
         self.id = id if id else str(uuid.uuid4())
         self.name = name
         self.prompt = prompt
         self.output_template = output_template
         self.enabled = enabled
+        self.timeout = timeout # 요청 제한 시간(초), 0이면 전역 설정 사용
+        self.cacheable = cacheable # False면 유사 응답 캐시를 사용하지 않음
+        self.semantic_threshold = semantic_threshold # 유사 응답 재사용 기준 유사도, 0이면 전역 설정 사용
+        self.model = model or "" # 비어 있으면 실행 설정의 모델, 'auto'면 라우터가 선택, 그 밖에는 모델 이름
+        self.complexity = complexity if complexity in TASK_COMPLEXITIES else 'normal' # 'auto' 라우팅에 쓰는 난이도
+        self.generation = GenerationSettings.from_dict(generation) # 비어 있으면 프로젝트의 생성 설정 사용
 
     def to_dict(self):
         return {
@@ -29,8 +115,40 @@ class Task:
             'name': self.name,
             'prompt': self.prompt,
             'output_template': self.output_template,
-            'enabled': self.enabled
+            'enabled': self.enabled,
+            'timeout': self.timeout,
+            'cacheable': self.cacheable,
+            'semantic_threshold': self.semantic_threshold,
+            'model': self.model,
+            'complexity': self.complexity,
+            'generation': self.generation.to_dict()
         }
-        
+
     def __repr__(self):
-        return f"Task(id={self.id}, name='{self.name}', enabled={self.enabled})"
\ No newline at end of file
+        return f"Task(id={self.id}, name='{self.name}', enabled={self.enabled})"
+
+class TaskColumns:
+    """실행기용 태스크 목록의 열 지향 스냅샷입니다.
+
+    필드별 튜플에 문자열 참조만 담으므로 복사 비용이 작고, 실행 중 GUI에서 태스크를 편집해도 영향을 받지 않습니다.
+    """
+    __slots__ = ('ids', 'names', 'prompts', 'output_templates', 'enabled', 'timeouts', 'cacheable', 'semantic_thresholds', 'models', 'complexities',
+                 'generations')
+
+    def __init__(self, tasks):
+        tasks = list(tasks)
+        self.ids = tuple(t.id for t in tasks); self.names = tuple(t.name for t in tasks)
+        self.prompts = tuple(t.prompt for t in tasks); self.output_templates = tuple(t.output_template for t in tasks)
+        self.enabled = tuple(t.enabled for t in tasks); self.timeouts = tuple(t.timeout for t in tasks)
+        self.cacheable = tuple(t.cacheable for t in tasks); self.semantic_thresholds = tuple(t.semantic_threshold for t in tasks)
+        self.models = tuple(t.model for t in tasks); self.complexities = tuple(t.complexity for t in tasks)
+        self.generations = tuple(t.generation for t in tasks)
+
+    def __len__(self): return len(self.ids)
+
+    def record(self, i):
+        """i번째 태스크를 (문자열을 공유하는) 독립된 Task 객체로 반환합니다."""
+        return Task(name=self.names[i], prompt=self.prompts[i], output_template=self.output_templates[i],
+                    id=self.ids[i], enabled=self.enabled[i], timeout=self.timeouts[i],
+                    cacheable=self.cacheable[i], semantic_threshold=self.semantic_thresholds[i],
+                    model=self.models[i], complexity=self.complexities[i], generation=self.generations[i])
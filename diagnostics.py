@@ -0,0 +1,235 @@
+# diagnostics.py
+
+from PySide6.QtCore import QObject, Signal, QTimer
+
+import io
+import os
+import sys
+import glob
+import time
+import pstats
+import cProfile
+import datetime
+import functools
+import threading
+import traceback
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_STALL_MS = 300 # 이보다 오래 이벤트 루프가 멈추면 기록합니다. (UI_STALL_MS로 변경)
+TICK_MS = 50
+TRACEMALLOC_FRAMES = 25
+TOP_STATS = 40
+DEFAULT_DUMP_ROOT = os.path.join(os.path.expanduser("~"), ".aiprompthelper", "diagnostics")
+
+class EventLoopWatchdog(QObject):
+    """GUI 이벤트 루프의 지연을 감시합니다.
+
+    GUI 스레드의 타이머가 TICK_MS마다 심장 박동을 남기고, 감시 스레드는 박동이 threshold 이상 끊기면 그 순간의
+    GUI 스레드 스택을 떠 둡니다. 이벤트 루프가 돌아오면 실제로 멈춘 시간과 스택을 stalled 시그널로 알립니다.
+    """
+    stalled = Signal(float, str) # (멈춘 시간 ms, 멈춘 동안의 GUI 스레드 스택)
+
+    def __init__(self, threshold_ms=None, parent=None):
+        super().__init__(parent)
+        self.threshold_ms = threshold_ms or int(os.getenv("UI_STALL_MS", DEFAULT_STALL_MS) or DEFAULT_STALL_MS)
+        self.stalls = deque(maxlen=200) # (시각, ms, 스택)
+        self._timer = QTimer(self); self._timer.setInterval(TICK_MS); self._timer.timeout.connect(self._tick)
+        self._lock = threading.Lock(); self._stop = threading.Event(); self._thread = None
+        self._gui_ident = threading.get_ident(); self._last = time.monotonic(); self._sampled = None
+
+    def is_running(self): return self._timer.isActive()
+
+    def start(self):
+        if self.is_running(): return
+        self._gui_ident = threading.get_ident(); self._last = time.monotonic(); self._stop.clear(); self._timer.start()
+        self._thread = threading.Thread(target=self._watch, name="EventLoopWatchdog", daemon=True); self._thread.start()
+
+    def stop(self):
+        self._timer.stop(); self._stop.set()
+
+    def _tick(self):
+        now = time.monotonic()
+        with self._lock: late = now - self._last - TICK_MS / 1000.0; stack = self._sampled; self._sampled = None; self._last = now
+        if late * 1000 < self.threshold_ms: return
+        stack = stack or ""; self.stalls.append((datetime.datetime.now(), late * 1000, stack))
+        self.stalled.emit(late * 1000, stack)
+
+    def _watch(self):
+        limit = (TICK_MS + self.threshold_ms) / 1000.0
+        while not self._stop.wait(self.threshold_ms / 4000.0):
+            with self._lock:
+                if self._sampled is not None or time.monotonic() - self._last < limit: continue
+                # 멈춘 지점을 알 수 있도록 멈춤이 시작된 직후의 스택을 한 번만 뜹니다.
+                frame = sys._current_frames().get(self._gui_ident)
+                self._sampled = "".join(traceback.format_stack(frame)) if frame is not None else ""
+
+class Profiler:
+    """opt-in cProfile/tracemalloc 측정기입니다. section()으로 감싼 구간을 이름별로 모아 dump()로 저장합니다.
+
+    cProfile은 한 번에 하나만 켤 수 있으므로 다른 구간이 측정 중이면(중첩, 다른 스레드) 시간과 메모리만 기록합니다.
+    """
+    def __init__(self):
+        self.cpu_enabled = False; self.memory_enabled = False
+        self._lock = threading.Lock(); self._cpu_busy = False
+        self._stats = {}; self._timings = {} # 이름 → pstats.Stats, 이름 → [횟수, 합계(초), 최대(초), 메모리 증가(바이트)]
+        self._worker_dir = None
+
+    @property
+    def enabled(self): return self.cpu_enabled or self.memory_enabled
+
+    def set_cpu(self, enabled): self.cpu_enabled = enabled
+
+    def set_memory(self, enabled):
+        self.memory_enabled = enabled
+        if enabled and not tracemalloc.is_tracing(): tracemalloc.start(TRACEMALLOC_FRAMES)
+        elif not enabled and tracemalloc.is_tracing(): tracemalloc.stop()
+
+    def worker_dir(self):
+        """작업 스레드/프로세스에서 측정한 실행 프로파일을 모아 둘 폴더입니다."""
+        if self._worker_dir is None:
+            self._worker_dir = os.path.join(DEFAULT_DUMP_ROOT, "pending", str(os.getpid())); os.makedirs(self._worker_dir, exist_ok=True)
+        return self._worker_dir
+
+    def _start_cpu(self):
+        with self._lock:
+            if not self.cpu_enabled or self._cpu_busy: return None
+            self._cpu_busy = True
+        profile = cProfile.Profile()
+        try: profile.enable(); return profile
+        except ValueError: # 다른 프로파일러가 이미 켜져 있습니다.
+            with self._lock: self._cpu_busy = False
+            return None
+
+    @contextmanager
+    def section(self, name):
+        if not self.enabled: yield; return
+        profile = self._start_cpu(); memory_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        start = time.perf_counter()
+        try: yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile: profile.disable()
+            memory_delta = tracemalloc.get_traced_memory()[0] - memory_before if tracemalloc.is_tracing() else 0
+            with self._lock:
+                timing = self._timings.setdefault(name, [0, 0.0, 0.0, 0])
+                timing[0] += 1; timing[1] += elapsed; timing[2] = max(timing[2], elapsed); timing[3] += memory_delta
+                if profile:
+                    self._cpu_busy = False
+                    if name in self._stats: self._stats[name].add(profile)
+                    else: self._stats[name] = pstats.Stats(profile)
+
+    def reset(self):
+        with self._lock: self._stats.clear(); self._timings.clear()
+        if not self._worker_dir: return
+        for path in glob.glob(os.path.join(self._worker_dir, "*")):
+            try: os.remove(path)
+            except OSError: pass
+
+    def dump(self, watchdog=None, folder=None):
+        """측정 결과를 folder(기본: ~/.aiprompthelper/diagnostics/<시각>)에 저장하고 그 경로를 반환합니다."""
+        folder = folder or os.path.join(DEFAULT_DUMP_ROOT, datetime.datetime.now().strftime("%Y%m%d_%H%M%S")); os.makedirs(folder, exist_ok=True)
+        with self._lock: stats = dict(self._stats); timings = {name: list(values) for name, values in self._timings.items()}
+        run_profiles = sorted(glob.glob(os.path.join(self._worker_dir, "*.prof"))) if self._worker_dir else []
+        if run_profiles:
+            merged = pstats.Stats(run_profiles[0])
+            for path in run_profiles[1:]: merged.add(path)
+            stats['run'] = merged
+        for name, stat in stats.items():
+            safe = "".join(c if c.isalnum() or c in '-_' else '_' for c in name)
+            stat.dump_stats(os.path.join(folder, f"{safe}.prof")) # snakeviz, pstats 등으로 열 수 있습니다.
+            with open(os.path.join(folder, f"{safe}.txt"), 'w', encoding='utf-8') as f:
+                stat.stream = f; stat.sort_stats('cumulative').print_stats(TOP_STATS); stat.stream = sys.stdout
+        if self._worker_dir:
+            for path in glob.glob(os.path.join(self._worker_dir, "*.memory.txt")):
+                os.replace(path, os.path.join(folder, os.path.basename(path)))
+        if tracemalloc.is_tracing():
+            with open(os.path.join(folder, "memory.txt"), 'w', encoding='utf-8') as f:
+                current, peak = tracemalloc.get_traced_memory()
+                f.write(f"current {current / 1024 / 1024:.1f} MB, peak {peak / 1024 / 1024:.1f} MB\n\n")
+                f.write(format_memory_top(tracemalloc.take_snapshot()))
+        with open(os.path.join(folder, "summary.txt"), 'w', encoding='utf-8') as f:
+            f.write(f"{'구간':<40} {'횟수':>6} {'합계(s)':>10} {'최대(s)':>10} {'메모리 증가(MB)':>16}\n")
+            for name, (count, total, longest, memory) in sorted(timings.items(), key=lambda item: -item[1][1]):
+                f.write(f"{name:<40} {count:>6} {total:>10.3f} {longest:>10.3f} {memory / 1024 / 1024:>16.2f}\n")
+            if run_profiles: f.write(f"\n실행 프로파일 {len(run_profiles)}개를 run.prof로 합쳤습니다.\n")
+            if watchdog is not None:
+                f.write(f"\nUI 멈춤 {len(watchdog.stalls)}회 (기준 {watchdog.threshold_ms} ms), 자세한 스택은 stalls.txt\n")
+        if watchdog is not None:
+            with open(os.path.join(folder, "stalls.txt"), 'w', encoding='utf-8') as f:
+                for when, ms, stack in list(watchdog.stalls):
+                    f.write(f"=== {when:%H:%M:%S} {ms:.0f} ms ===\n{stack or '(스택을 뜨기 전에 돌아왔습니다)'}\n")
+        return folder
+
+def format_memory_top(snapshot, limit=TOP_STATS):
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")))
+    out = io.StringIO()
+    for stat in snapshot.statistics('lineno')[:limit]: out.write(f"{stat}\n")
+    return out.getvalue()
+
+class ThreadProfiles:
+    """여러 스레드의 cProfile 결과를 모읍니다. cProfile은 켠 스레드만 측정하므로, 작업 스레드에서 도는 함수는 wrap()으로 감싸
+    스레드마다 따로 측정하고 dump()에서 하나로 합칩니다. 이미 측정 중인 스레드에서는 중첩해서 켜지 않습니다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock(); self._profiles = []; self._active = threading.local()
+
+    def add(self, profile):
+        with self._lock: self._profiles.append(profile)
+
+    def wrap(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if getattr(self._active, 'on', False): return fn(*args, **kwargs)
+            profile = cProfile.Profile()
+            try: profile.enable()
+            except ValueError: return fn(*args, **kwargs) # 다른 프로파일러가 이미 켜져 있습니다.
+            self._active.on = True
+            try: return fn(*args, **kwargs)
+            finally: profile.disable(); self._active.on = False; self.add(profile)
+        return wrapper
+
+    def dump(self, path):
+        """모은 결과를 합쳐 path(.prof)에 저장합니다. 측정한 것이 없으면 False를 반환합니다."""
+        with self._lock: profiles = list(self._profiles); self._profiles.clear()
+        merged = None
+        for profile in profiles:
+            try:
+                if merged is None: merged = pstats.Stats(profile)
+                else: merged.add(profile)
+            except TypeError: continue # 호출이 하나도 기록되지 않은 측정입니다.
+        if merged is None: return False
+        merged.dump_stats(path); return True
+
+def profile_to_file(runner, path, trace_memory=False):
+    """runner.run()을 cProfile로 측정하여 path(.prof)에 저장합니다. trace_memory면 메모리 상위 할당 위치를 path.memory.txt에 남깁니다.
+
+    작업 프로세스/스레드에서 실행 전체를 측정할 때 씁니다. 태스크와 API 요청은 실행 스레드가 아닌 작업 스레드에서 돌므로
+    runner.thread_profiles로 그 본문을 스레드마다 측정하여 실행 스레드의 결과와 합칩니다.
+    """
+    threads = ThreadProfiles(); runner.thread_profiles = threads
+    started = trace_memory and not tracemalloc.is_tracing() # 여기서 켠 추적만 끕니다. (Profiler가 켠 추적은 그대로 둡니다)
+    if started: tracemalloc.start(TRACEMALLOC_FRAMES)
+    try: return threads.wrap(runner.run)()
+    finally:
+        runner.thread_profiles = None; threads.dump(path)
+        if trace_memory and tracemalloc.is_tracing():
+            try:
+                with open(path[:-len(".prof")] + ".memory.txt", 'w', encoding='utf-8') as f: f.write(format_memory_top(tracemalloc.take_snapshot()))
+            finally:
+                if started: tracemalloc.stop()
+
+def profiled(name):
+    """self.profiler.section(name)으로 메서드를 감쌉니다. 측정이 꺼져 있으면 비용이 거의 없습니다."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.section(name): return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+def format_stack_tail(stack, frames=6):
+    """로그에 남길 수 있도록 스택의 마지막 몇 프레임만 남깁니다."""
+    lines = [line for line in stack.splitlines() if line.strip()]
+    return "\n".join(lines[-frames * 2:])
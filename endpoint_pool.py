@@ -0,0 +1,167 @@
+# endpoint_pool.py
+
+import vertexai
+from vertexai.generative_models import GenerativeModel
+from vertexai.preview import caching
+
+import os
+import random
+import re
+import threading
+import time
+
+from request_engine import RequestCancelled
+
+# vertexai.init은 전역 설정을 바꾸므로, init과 그 설정을 읽는 객체 생성은 항상 이 잠금 안에서 함께 수행합니다.
+vertexai_init_lock = threading.RLock()
+
+_RESOURCE_PATTERN = re.compile(r"projects/([^/]+)/locations/([^/]+)/")
+
+def parse_resource_location(resource_name):
+    """'projects/<p>/locations/<l>/...' 형식의 리소스 이름에서 (project, location)을 추출합니다."""
+    match = _RESOURCE_PATTERN.search(resource_name or "")
+    return (match.group(1), match.group(2)) if match else (None, None)
+
+def run_in_location(project, location, fn):
+    """지정한 project/location으로 vertexai를 초기화한 상태에서 fn()을 실행합니다."""
+    with vertexai_init_lock:
+        vertexai.init(project=project, location=location)
+        return fn()
+
+def run_for_resource(resource_name, fn):
+    """리소스(예: Context Cache)가 속한 리전에서만 fn()을 실행합니다."""
+    project, location = parse_resource_location(resource_name)
+    if not project: project, location = os.getenv("PROJECT_ID"), os.getenv("LOCATION")
+    if not project or not location: raise ValueError(".env 설정 필요")
+    return run_in_location(project, location, fn)
+
+def load_endpoint_specs(run_options=None):
+    """실행 옵션의 endpoints, .env의 VERTEX_ENDPOINTS, PROJECT_ID/LOCATION 순으로 엔드포인트 목록을 읽습니다.
+
+    각 항목은 'project:location' 문자열이며 (project, location) 튜플 목록을 반환합니다.
+    """
+    raw = (run_options or {}).get('endpoints') or [s for s in os.getenv("VERTEX_ENDPOINTS", "").split(",")]
+    specs = []
+    for entry in raw:
+        entry = entry.strip()
+        if not entry: continue
+        if ':' not in entry: raise ValueError(f"엔드포인트 형식 오류: '{entry}' (project:location 형식이어야 합니다)")
+        project, location = (part.strip() for part in entry.split(':', 1))
+        if (project, location) not in specs: specs.append((project, location))
+    if not specs:
+        # 설정이 없으면 기존처럼 vertexai 기본값(ADC 프로젝트 등)에 맡깁니다.
+        specs.append((os.getenv("PROJECT_ID"), os.getenv("LOCATION")))
+    return specs
+
+def is_throttling_error(error):
+    text = f"{type(error).__name__} {error}"
+    return "ResourceExhausted" in text or "429" in text or "Quota" in text or "quota" in text
+
+def is_retryable_error(error):
+    text = f"{type(error).__name__} {error}"
+    return is_throttling_error(error) or any(k in text for k in ("ServiceUnavailable", "DeadlineExceeded", "503", "504", "InternalServerError"))
+
+class Endpoint:
+    """하나의 project/location 조합과 그 관측 통계(지연, 스로틀링, 상태)입니다."""
+    def __init__(self, project, location):
+        self.project = project; self.location = location
+        self.ewma_latency = None; self.requests = 0; self.failures = 0; self.throttles = 0
+        self.consecutive_failures = 0; self.cooldown_until = 0.0
+
+    @property
+    def key(self): return f"{self.project}:{self.location}"
+
+    def is_healthy(self, now=None): return (now or time.monotonic()) >= self.cooldown_until
+
+    def weight(self):
+        # 관측된 지연이 짧을수록, 최근 스로틀링이 적을수록 더 많은 요청을 받습니다.
+        latency = self.ewma_latency if self.ewma_latency else 1.0
+        throttle_penalty = 1.0 + self.throttles / max(1, self.requests) * 10
+        return 1.0 / (latency * throttle_penalty)
+
+    def __repr__(self):
+        return f"Endpoint({self.key}, latency={self.ewma_latency}, throttles={self.throttles})"
+
+class EndpointPool:
+    """여러 project/location에 요청을 분산하고, 엔드포인트별 상태를 추적하여 장애 시 다른 곳으로 넘깁니다."""
+    def __init__(self, specs, alpha=0.3, base_cooldown=5.0, max_cooldown=120.0):
+        self.endpoints = [Endpoint(p, l) for p, l in specs]
+        self.alpha = alpha; self.base_cooldown = base_cooldown; self.max_cooldown = max_cooldown
+        self._lock = threading.Lock(); self._models = {}
+
+    @classmethod
+    def from_run_options(cls, run_options=None): return cls(load_endpoint_specs(run_options))
+
+    def pinned_to(self, resource_name):
+        """리소스가 속한 리전의 엔드포인트만 포함하는 풀을 반환합니다. (Context Cache는 다른 리전에서 쓸 수 없습니다)"""
+        project, location = parse_resource_location(resource_name)
+        if not project: return self
+        pinned = [ep for ep in self.endpoints if ep.project == project and ep.location == location]
+        pool = EndpointPool([(project, location)], self.alpha, self.base_cooldown, self.max_cooldown)
+        if pinned: pool.endpoints = pinned
+        pool._models = self._models; pool._lock = self._lock
+        return pool
+
+    def acquire(self, exclude=()):
+        """가중치에 따라 엔드포인트를 하나 고릅니다. 모두 비정상이면 가장 먼저 회복될 엔드포인트를 반환합니다."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [ep for ep in self.endpoints if ep.is_healthy(now) and ep not in exclude]
+            if not candidates:
+                others = [ep for ep in self.endpoints if ep not in exclude] or self.endpoints
+                return min(others, key=lambda ep: ep.cooldown_until)
+            return random.choices(candidates, weights=[ep.weight() for ep in candidates])[0]
+
+    def report_success(self, endpoint, latency):
+        with self._lock:
+            endpoint.requests += 1; endpoint.consecutive_failures = 0; endpoint.cooldown_until = 0.0
+            endpoint.ewma_latency = latency if endpoint.ewma_latency is None else self.alpha * latency + (1 - self.alpha) * endpoint.ewma_latency
+
+    def report_failure(self, endpoint, error):
+        with self._lock:
+            endpoint.requests += 1; endpoint.failures += 1; endpoint.consecutive_failures += 1
+            if is_throttling_error(error): endpoint.throttles += 1
+            if is_retryable_error(error):
+                cooldown = min(self.max_cooldown, self.base_cooldown * (2 ** (endpoint.consecutive_failures - 1)))
+                endpoint.cooldown_until = time.monotonic() + cooldown
+
+    def model(self, endpoint, model_name=None, cached_content_name=None):
+        """엔드포인트에 묶인 GenerativeModel을 만들거나 재사용합니다."""
+        cache_key = (endpoint.key, model_name, cached_content_name)
+        model = self._models.get(cache_key)
+        if model is None:
+            def build():
+                if cached_content_name:
+                    return GenerativeModel.from_cached_content(cached_content=caching.CachedContent.get(cached_content_name))
+                return GenerativeModel(model_name)
+            model = run_in_location(endpoint.project, endpoint.location, build)
+            self._models[cache_key] = model
+        return model
+
+    def call(self, fn, model_name=None, cached_content_name=None, exclude=()):
+        """fn(model)을 실행하고 재시도 가능한 오류(스로틀링 등)는 다른 엔드포인트로 넘겨 다시 시도합니다.
+
+        (결과, 사용한 엔드포인트)를 반환합니다.
+        """
+        tried = list(exclude); last_error = None
+        for _ in range(len(self.endpoints)):
+            endpoint = self.acquire(exclude=tried); start = time.monotonic()
+            try:
+                result = fn(self.model(endpoint, model_name, cached_content_name))
+            except RequestCancelled:
+                # 취소/시간 초과는 엔드포인트의 상태와 무관합니다.
+                raise
+            except Exception as e:
+                self.report_failure(endpoint, e); last_error = e
+                if not is_retryable_error(e): raise
+                tried.append(endpoint)
+                if len(tried) >= len(self.endpoints): break
+                continue
+            self.report_success(endpoint, time.monotonic() - start)
+            return result, endpoint
+        raise last_error
+
+    def summary(self):
+        with self._lock:
+            return [f"{ep.key}: 요청 {ep.requests}, 실패 {ep.failures}, 스로틀 {ep.throttles}, 평균 지연 "
+                    + (f"{ep.ewma_latency:.2f}s" if ep.ewma_latency else "-") for ep in self.endpoints]
@@ -0,0 +1,123 @@
+# headless.py
+
+import os
+import sys
+import argparse
+import threading
+
+from dotenv import load_dotenv
+from PySide6.QtCore import Qt
+
+from project_io import load_project
+from core_logic import TaskRunner
+from endpoint_pool import EndpointPool, load_endpoint_specs
+from semantic_cache import SemanticResponseCache, DEFAULT_CAPACITY
+from run_scheduler import GlobalScheduler
+from watch_mode import WatchState, Debouncer, create_watcher, DEFAULT_DEBOUNCE, DEFAULT_MAX_WAIT, DEFAULT_POLL_INTERVAL
+
+BUILT_IN_VARS = {'RESPONSE'}
+
+class HeadlessSession:
+    """GUI 없이 프로젝트를 실행합니다. 엔드포인트 풀(모델 객체)과 유사 응답 캐시는 실행 사이에 유지됩니다.
+
+    여러 스레드에서 동시에 make_runner를 호출해도 같은 풀과 캐시를 나눠 씁니다. (workflow_server)
+    """
+    def __init__(self, project_path=None):
+        self.project_path = os.path.abspath(project_path) if project_path else None
+        self._pools = {}; self.semantic_cache = None; self._lock = threading.Lock()
+        self.scheduler = GlobalScheduler.from_env() # 동시에 실행되는 작업들이 하나의 속도 예산을 나눠 씁니다.
+
+    def load(self):
+        return load_project(self.project_path, BUILT_IN_VARS)
+
+    def _warm_pool(self, run_options):
+        specs = tuple(load_endpoint_specs(run_options))
+        with self._lock:
+            if specs not in self._pools: self._pools[specs] = EndpointPool(specs)
+            return self._pools[specs]
+
+    def _semantic_cache(self, run_options):
+        options = run_options.get('semantic_cache') or {}
+        if not options.get('enabled'): return None
+        capacity = int(options.get('capacity', DEFAULT_CAPACITY))
+        with self._lock:
+            if self.semantic_cache is None or self.semantic_cache.capacity != capacity: self.semantic_cache = SemanticResponseCache(capacity)
+            return self.semantic_cache
+
+    @staticmethod
+    def _print_log(message, level, task):
+        print(message, file=sys.stderr if level in ('ERROR', 'CRITICAL') else sys.stdout, flush=True)
+
+    def make_runner(self, variables, tasks, settings, output_folder=None, log_folder=None, api_key=None, priority='normal'):
+        """프로젝트 설정으로 TaskRunner를 만듭니다. output_folder/log_folder를 주면 프로젝트 설정 대신 사용합니다."""
+        run_options = settings.get('run_options', {}) or {}; cache_data = settings.get('context_cache') or {}
+        return TaskRunner(api_key=api_key or os.getenv("GEMINI_API_KEY", ""), model_name=cache_data.get('model') or settings.get('model_name', ""),
+                          variables=variables, tasks_in_order=tasks,
+                          output_folder=output_folder or settings.get('output_folder') or os.path.join(os.getcwd(), "output_pyside"),
+                          output_extension=settings.get('output_extension', '.md'),
+                          log_folder=settings.get('log_folder', '') if log_folder is None else log_folder,
+                          cached_content_name=cache_data.get('name'), run_options=run_options,
+                          semantic_cache=self._semantic_cache(run_options), endpoint_pool=self._warm_pool(run_options),
+                          scheduler=self.scheduler, priority=priority)
+
+    def run(self, variables, tasks, settings):
+        runner = self.make_runner(variables, tasks, settings); failed = []
+        # 이벤트 루프가 없고 로그는 태스크/저장 스레드에서도 나오므로 직접 연결합니다.
+        runner.signals.log_record.connect(self._print_log, Qt.DirectConnection); runner.signals.error.connect(failed.append, Qt.DirectConnection)
+        runner.run()
+        return not failed
+
+def _enabled(tasks, names):
+    tasks = [task for task in tasks if task.enabled]
+    return [task for task in tasks if task.name in names] if names else tasks
+
+def watch(session, names, debounce, max_wait, force_polling, poll_interval, initial_run):
+    variables, tasks, settings = session.load()
+    state = WatchState(session.project_path); state.reset(variables, tasks)
+    if initial_run: session.run(variables, _enabled(tasks, names), settings)
+    watcher = create_watcher(force_polling, poll_interval); watcher.set_paths(state.watched_paths(variables))
+    debouncer = Debouncer(debounce, max_wait)
+    print(f"👀 감시 모드 ({watcher.kind}): 파일 {len(state.watched_paths(variables))}개를 감시합니다. 종료하려면 Ctrl+C", flush=True)
+    try:
+        while True:
+            debouncer.add(watcher.poll(debouncer.wait_time(0.5)))
+            paths = debouncer.ready()
+            if not paths: continue
+            state.note_changes(paths)
+            try: variables, tasks, settings = session.load()
+            except (OSError, ValueError) as e:
+                # 저장 도중의 파일을 읽었을 수 있으므로 다음 변경을 기다립니다.
+                print(f"⚠ 프로젝트 파일을 읽지 못했습니다: {e}", file=sys.stderr, flush=True); continue
+            watcher.set_paths(state.watched_paths(variables))
+            affected = [task for task in state.plan(variables, tasks) if task in _enabled(tasks, names)]
+            changed = ", ".join(sorted(os.path.basename(path) for path in paths))
+            if not affected: print(f"👀 변경 감지 ({changed}): 영향을 받는 태스크가 없습니다.", flush=True); continue
+            print(f"👀 변경 감지 ({changed}): 태스크 {len(affected)}개를 다시 실행합니다: {', '.join(task.name for task in affected)}", flush=True)
+            session.run(variables, affected, settings)
+    except KeyboardInterrupt: print("감시를 종료합니다.", flush=True)
+    finally: watcher.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI Prompt Helper 프로젝트를 GUI 없이 실행합니다.")
+    parser.add_argument("project", help="프로젝트 파일 (.json)")
+    parser.add_argument("--task", action="append", dest="tasks", help="실행할 태스크 이름 (여러 번 지정 가능, 기본: 활성화된 모든 태스크)")
+    parser.add_argument("--watch", action="store_true", help="프로젝트 파일과 첨부 파일이 바뀌면 영향을 받는 태스크만 다시 실행")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE, help="마지막 변경 후 기다릴 시간(초)")
+    parser.add_argument("--max-wait", type=float, default=DEFAULT_MAX_WAIT, help="변경이 계속되어도 이 시간(초)이 지나면 실행")
+    parser.add_argument("--polling", action="store_true", help="inotify 대신 폴링으로 감시")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="폴링 간격(초)")
+    parser.add_argument("--no-initial-run", action="store_true", help="감시 모드에서 시작할 때 전체 실행을 건너뜀")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    session = HeadlessSession(args.project)
+    if args.watch:
+        watch(session, set(args.tasks or ()), args.debounce, args.max_wait, args.polling, args.poll_interval, not args.no_initial_run)
+        return 0
+    variables, tasks, settings = session.load()
+    tasks = _enabled(tasks, set(args.tasks or ()))
+    if not tasks: print("실행할 활성화된 태스크가 없습니다.", file=sys.stderr); return 1
+    return 0 if session.run(variables, tasks, settings) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# log_view.py
+
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QListView, QComboBox,
+                             QLineEdit, QLabel, QSpinBox, QAbstractItemView)
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer, Slot
+from PySide6.QtGui import QFont, QColor
+
+import os
+import re
+from collections import deque
+
+DEFAULT_MAX_LINES = int(os.getenv("LOG_MAX_LINES", "20000"))
+LEVELS = ["INFO", "WARNING", "ERROR"]
+LEVEL_COLORS = {"WARNING": QColor("#b8860b"), "ERROR": QColor("#d0021b")}
+ALL_TASKS = ""
+_ERROR_WORDS = re.compile(r"(오류|실패)(?!\s*0\s*개)") # 요약의 '실패 0개' 같은 개수 표시는 오류가 아닙니다.
+
+_TEXT_LOG_LEVEL = re.compile(r"^\d\d:\d\d:\d\d - \[(INFO|WARNING|ERROR)\] ")
+
+def infer_level(message):
+    """수준 없이 남은 이전 텍스트 로그의 줄에서 로그 수준을 문구(이모지/키워드)로 추정합니다.
+
+    새 로그는 남기는 쪽에서 수준을 정해 넘기므로 여기를 거치지 않습니다.
+    """
+    if "❌" in message or _ERROR_WORDS.search(message): return "ERROR"
+    if "⚠" in message or "⌛" in message or "경고" in message or "🔴" in message: return "WARNING"
+    return "INFO"
+
+def text_log_level(line):
+    """텍스트 로그 파일의 한 줄에서 기록된 수준을 읽습니다. 수준이 없는 이전 형식이면 문구로 추정합니다."""
+    match = _TEXT_LOG_LEVEL.match(line)
+    return match.group(1) if match else infer_level(line)
+
+def read_tail_lines(path, max_lines, block_size=64 * 1024, encoding='utf-8'):
+    """파일 끝에서부터 블록 단위로 거슬러 읽어 마지막 max_lines 줄만 반환합니다."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END); position = f.tell(); data = b""
+        while position > 0 and data.count(b"\n") <= max_lines:
+            read_size = min(block_size, position); position -= read_size
+            f.seek(position); data = f.read(read_size) + data
+    lines = data.decode(encoding, errors='replace').splitlines()
+    return lines[-max_lines:] if max_lines else lines
+
+class LogBufferModel(QAbstractListModel):
+    """최대 줄 수가 정해진 링 버퍼 로그 모델입니다.
+
+    항목은 (level, task, message) 튜플이며, 필터에 맞는 항목만 행으로 노출합니다.
+    추가는 모아서 일정 간격으로 반영하여 로그가 몰려도 화면 갱신 횟수를 제한합니다.
+    """
+    def __init__(self, max_lines=DEFAULT_MAX_LINES, flush_interval_ms=50, parent=None):
+        super().__init__(parent)
+        self._entries = deque(); self._visible = deque(); self._pending = []
+        self.max_lines = max_lines; self.tasks = set()
+        self._min_level = 0; self._task_filter = ALL_TASKS; self._text_filter = ""
+        self._flush_timer = QTimer(self); self._flush_timer.setSingleShot(True); self._flush_timer.setInterval(flush_interval_ms)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self._visible)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._visible): return None
+        level, task, message = self._visible[index.row()]
+        if role == Qt.DisplayRole: return message
+        if role == Qt.ForegroundRole: return LEVEL_COLORS.get(level)
+        if role == Qt.ToolTipRole: return f"[{level}] {task}" if task else f"[{level}]"
+        return None
+
+    def _accepts(self, entry):
+        level, task, message = entry
+        if LEVELS.index(level) < self._min_level: return False
+        if self._task_filter and task != self._task_filter: return False
+        return not self._text_filter or self._text_filter in message.casefold()
+
+    def append(self, message, level="INFO", task=""):
+        # 여러 줄 메시지는 줄 단위로 나누어 각 행의 높이를 일정하게 유지합니다.
+        for line in message.split("\n"): self._pending.append((level, task or "", line))
+        if not self._flush_timer.isActive(): self._flush_timer.start()
+
+    @Slot()
+    def flush(self):
+        if not self._pending: return
+        pending = self._pending[-self.max_lines:]; self._pending = []
+        self._trim(len(self._entries) + len(pending) - self.max_lines)
+        accepted = [entry for entry in pending if self._accepts(entry)]
+        for entry in pending:
+            self._entries.append(entry)
+            if entry[1]: self.tasks.add(entry[1])
+        if accepted:
+            first = len(self._visible); self.beginInsertRows(QModelIndex(), first, first + len(accepted) - 1)
+            self._visible.extend(accepted); self.endInsertRows()
+
+    def _trim(self, count):
+        """가장 오래된 항목 count개를 버퍼에서 제거합니다."""
+        count = min(count, len(self._entries))
+        if count <= 0: return
+        removed_visible = 0
+        for _ in range(count):
+            entry = self._entries.popleft()
+            if removed_visible < len(self._visible) and self._visible[removed_visible] is entry: removed_visible += 1
+        if removed_visible:
+            self.beginRemoveRows(QModelIndex(), 0, removed_visible - 1)
+            for _ in range(removed_visible): self._visible.popleft()
+            self.endRemoveRows()
+
+    def set_max_lines(self, max_lines):
+        self.flush(); self.max_lines = max(100, max_lines); self._trim(len(self._entries) - self.max_lines)
+
+    def set_filter(self, min_level=None, task=None, text=None):
+        self.flush()
+        if min_level is not None: self._min_level = LEVELS.index(min_level)
+        if task is not None: self._task_filter = task
+        if text is not None: self._text_filter = text.casefold()
+        self.beginResetModel(); self._visible = deque(e for e in self._entries if self._accepts(e)); self.endResetModel()
+
+    def clear(self):
+        self._pending = []; self.beginResetModel(); self._entries.clear(); self._visible.clear(); self.tasks.clear(); self.endResetModel()
+
+    def line_count(self): return len(self._entries) + len(self._pending)
+
+class LogView(QWidget):
+    """링 버퍼 모델을 보여주는 로그 뷰어입니다. 보이는 행만 그리며 수준/태스크/텍스트로 필터링합니다."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = LogBufferModel(parent=self)
+        self.view = QListView(); self.view.setModel(self.model)
+        self.view.setUniformItemSizes(True); self.view.setFont(QFont("Courier New", 9))
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection); self.view.setWordWrap(False)
+        self.level_combo = QComboBox(); self.level_combo.addItems(LEVELS)
+        self.task_combo = QComboBox(); self.task_combo.addItem("(모든 태스크)", ALL_TASKS)
+        self.task_combo.setSizeAdjustPolicy(QComboBox.AdjustToContents)
+        self.text_filter_edit = QLineEdit(); self.text_filter_edit.setPlaceholderText("검색...")
+        self.max_lines_spin = QSpinBox(); self.max_lines_spin.setRange(100, 1000000); self.max_lines_spin.setSingleStep(1000)
+        self.max_lines_spin.setValue(self.model.max_lines); self.max_lines_spin.setToolTip("로그 뷰어에 보관할 최대 줄 수")
+        filter_layout = QHBoxLayout(); filter_layout.setContentsMargins(0, 0, 0, 0)
+        filter_layout.addWidget(self.level_combo); filter_layout.addWidget(self.task_combo)
+        filter_layout.addWidget(self.text_filter_edit); filter_layout.addWidget(QLabel("최대 줄:")); filter_layout.addWidget(self.max_lines_spin)
+        layout = QVBoxLayout(self); layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(filter_layout); layout.addWidget(self.view)
+
+        self.model.rowsAboutToBeInserted.connect(self._remember_scroll)
+        self.model.rowsInserted.connect(self._restore_scroll)
+        self.level_combo.currentTextChanged.connect(lambda level: self.model.set_filter(min_level=level))
+        self.task_combo.activated.connect(lambda _: self.model.set_filter(task=self.task_combo.currentData()))
+        self.task_combo.installEventFilter(self)
+        self.text_filter_edit.textChanged.connect(lambda text: self.model.set_filter(text=text))
+        self.max_lines_spin.editingFinished.connect(lambda: self.model.set_max_lines(self.max_lines_spin.value()))
+        self._follow_tail = True
+
+    def eventFilter(self, obj, event):
+        # 태스크 목록은 펼칠 때만 갱신합니다.
+        if obj is self.task_combo and event.type() == event.Type.MouseButtonPress: self._refresh_task_combo()
+        return super().eventFilter(obj, event)
+
+    def _refresh_task_combo(self):
+        current = self.task_combo.currentData(); self.task_combo.blockSignals(True)
+        self.task_combo.clear(); self.task_combo.addItem("(모든 태스크)", ALL_TASKS)
+        for task in sorted(self.model.tasks): self.task_combo.addItem(task, task)
+        index = self.task_combo.findData(current); self.task_combo.setCurrentIndex(index if index != -1 else 0)
+        self.task_combo.blockSignals(False)
+
+    def _remember_scroll(self, *args):
+        bar = self.view.verticalScrollBar(); self._follow_tail = bar.value() >= bar.maximum() - 2
+
+    def _restore_scroll(self, *args):
+        if self._follow_tail: self.view.scrollToBottom()
+
+    def append(self, message, level="INFO", task=""): self.model.append(message, level, task)
+
+    def clear(self): self.model.clear()
@@ -1,10 +1,12 @@
 # main.py
 
 import sys
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from app import MainWindow
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # 패키징된 실행 파일에서 작업 프로세스를 띄울 수 있도록 합니다.
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,105 @@
+# model_router.py
+
+import os
+import json
+import threading
+
+from output_writer import atomic_write_bytes
+from cache_builder import estimate_text_tokens, IMAGE_TOKENS
+
+SUPPORTED_MODELS = [
+    "gemini-2.5-pro",
+    "gemini-2.5-flash",
+    "gemini-2.0-flash",
+    "gemini-1.5-flash"
+]
+MODEL_AUTO = 'auto'
+COMPLEXITY_LABELS = {'simple': "단순 (형식 변환, 요약 등)", 'normal': "보통", 'complex': "복잡 (추론, 긴 글 작성)"}
+COMPLEXITY_TIERS = {'simple': 1, 'normal': 2, 'complex': 3}
+LONG_PROMPT_TOKENS = 32 * 1024 # 이보다 긴 프롬프트는 최소 2등급 모델을 사용합니다.
+# tier: 품질 등급(높을수록 고성능), latency: 통계가 없을 때 쓰는 예상 지연(초), max_input_tokens/max_output_tokens: 입출력 한도
+MODEL_PROFILES = {
+    "gemini-2.5-pro": {'tier': 3, 'latency': 12.0, 'max_input_tokens': 1048576, 'max_output_tokens': 65536},
+    "gemini-2.5-flash": {'tier': 2, 'latency': 4.0, 'max_input_tokens': 1048576, 'max_output_tokens': 65536},
+    "gemini-2.0-flash": {'tier': 1, 'latency': 2.5, 'max_input_tokens': 1048576, 'max_output_tokens': 8192},
+    "gemini-1.5-flash": {'tier': 1, 'latency': 3.0, 'max_input_tokens': 1048576, 'max_output_tokens': 8192},
+}
+DEFAULT_MAX_OUTPUT_TOKENS = 8192
+DEFAULT_STATS_PATH = os.path.join(os.path.expanduser("~"), ".aiprompthelper", "model_stats.json")
+FAILURE_PENALTY = 4.0 # 실패율 10%면 예상 지연을 1.4배로 봅니다.
+THROTTLE_PENALTY = 8.0
+
+class ModelStats:
+    """모델별 지연(EWMA)과 실패/스로틀링 비율을 실행을 넘어 기록합니다. 여러 실행이 같은 객체를 나눠 씁니다."""
+    _shared = None; _shared_lock = threading.Lock()
+
+    def __init__(self, path=None, alpha=0.2):
+        self.path = path or os.getenv("MODEL_STATS_PATH") or DEFAULT_STATS_PATH; self.alpha = alpha
+        self._lock = threading.Lock(); self._data = self._read()
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None: cls._shared = cls()
+            return cls._shared
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError): return {}
+
+    def record(self, model, latency=None, failed=False, throttled=False):
+        with self._lock:
+            entry = self._data.setdefault(model, {'latency': None, 'requests': 0, 'failure_rate': 0.0, 'throttle_rate': 0.0})
+            entry['requests'] += 1
+            # 실패/스로틀링 비율도 EWMA로 두어 오래된 장애가 계속 불이익을 주지 않게 합니다.
+            entry['failure_rate'] += self.alpha * (float(failed) - entry['failure_rate'])
+            entry['throttle_rate'] += self.alpha * (float(throttled) - entry['throttle_rate'])
+            if latency is not None and not failed:
+                entry['latency'] = latency if entry['latency'] is None else entry['latency'] + self.alpha * (latency - entry['latency'])
+
+    def expected_latency(self, model):
+        """지연 통계와 실패/스로틀링 비율을 반영한 예상 비용(초)입니다."""
+        with self._lock: entry = dict(self._data.get(model) or {})
+        latency = entry.get('latency') or MODEL_PROFILES.get(model, {}).get('latency', 5.0)
+        return latency * (1 + FAILURE_PENALTY * entry.get('failure_rate', 0.0) + THROTTLE_PENALTY * entry.get('throttle_rate', 0.0))
+
+    def save(self):
+        with self._lock: data = json.dumps(self._data, ensure_ascii=False, indent=1).encode('utf-8')
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        atomic_write_bytes(self.path, data)
+
+def default_max_output_tokens(model_name):
+    """생성 설정에 상한이 없을 때 모델이 쓰는 최대 출력 토큰 수입니다. (모델 경로의 마지막 부분으로 찾습니다)"""
+    name = (model_name or "").rsplit("/", 1)[-1]
+    return MODEL_PROFILES.get(name, {}).get('max_output_tokens', DEFAULT_MAX_OUTPUT_TOKENS)
+
+def estimate_contents_tokens(contents):
+    """resolve_contents 결과([문자열 | 첨부])의 대략적인 입력 토큰 수입니다."""
+    return sum(estimate_text_tokens(item) if isinstance(item, str) else IMAGE_TOKENS for item in contents)
+
+class ModelRouter:
+    """태스크별 모델 정책을 모델 후보 목록(앞에서부터 시도)으로 바꿉니다.
+
+    ''(기본)은 실행 설정의 모델, 모델 이름은 그 모델만 사용합니다. 'auto'는 난이도와 프롬프트 크기로 필요한 등급을 정한 뒤,
+    그 등급 이상의 모델을 예상 지연이 짧은 순서로 시도하고, 스로틀링되면 다음 모델로 넘어갑니다.
+    """
+    def __init__(self, default_model, models=None, stats=None):
+        self.default_model = default_model; self.models = [m for m in (models or SUPPORTED_MODELS) if m in MODEL_PROFILES]
+        self.stats = stats or ModelStats.shared()
+
+    def chain(self, policy, complexity, contents):
+        """(모델 후보 목록, 선택 이유)를 반환합니다."""
+        if policy != MODEL_AUTO: return [policy or self.default_model], None
+        tokens = estimate_contents_tokens(contents)
+        tier = COMPLEXITY_TIERS.get(complexity, 2)
+        if tokens > LONG_PROMPT_TOKENS: tier = max(tier, 2)
+        fits = [m for m in self.models if MODEL_PROFILES[m]['max_input_tokens'] >= tokens]
+        by_cost = sorted(fits, key=self.stats.expected_latency)
+        preferred = [m for m in by_cost if MODEL_PROFILES[m]['tier'] >= tier]
+        # 필요한 등급의 모델이 모두 스로틀링되면 마지막 수단으로 낮은 등급 모델도 (등급이 높은 순서로) 시도합니다.
+        chain = preferred + sorted((m for m in by_cost if m not in preferred), key=lambda m: -MODEL_PROFILES[m]['tier'])
+        if not chain: return [self.default_model], None
+        return chain, f"난이도 {complexity}, 입력 약 {int(tokens):,} 토큰 → 등급 {tier} 이상"
+
+    def expected_latency(self, model): return self.stats.expected_latency(model)
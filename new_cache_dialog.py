@@ -1,10 +1,29 @@
 # new_cache_dialog.py
 
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
-                             QLabel, QLineEdit, QTextEdit, QComboBox, 
-                             QSpinBox, QPushButton, QDialogButtonBox)
+                             QLabel, QLineEdit, QTextEdit, QComboBox, QListWidget, QCheckBox,
+                             QSpinBox, QPushButton, QDialogButtonBox, QFileDialog, QInputDialog, QGroupBox)
+from PySide6.QtCore import QObject, Signal, QRunnable, QThreadPool, Slot
 import datetime
 
+from cache_builder import CachePlan, split_patterns, DEFAULT_CHUNK_CHARS
+
+class CachePlanWorkerSignals(QObject):
+    finished = Signal(object)
+    error = Signal(str)
+
+class CachePlanWorker(QRunnable):
+    """캐시에 넣을 파일을 훑어 크기와 토큰 수를 추정합니다."""
+    def __init__(self, plan):
+        super().__init__()
+        self.signals = CachePlanWorkerSignals()
+        self.plan = plan
+
+    @Slot()
+    def run(self):
+        try: self.signals.finished.emit(self.plan.scan())
+        except Exception as e: self.signals.error.emit(f"파일 확인 실패: {e}")
+
 class NewCacheDialog(QDialog):
     def __init__(self, model_list, parent=None):
         super().__init__(parent)
@@ -24,6 +43,23 @@ class NewCacheDialog(QDialog):
         self.ttl_spinbox.setRange(1, 60 * 24 * 30) # 1분 ~ 30일
         self.ttl_spinbox.setValue(60) # 기본값 1시간
 
+        # 파일 / 폴더 / glob 패턴으로 캐시 내용 구성
+        self.sources_list = QListWidget(); self.sources_list.setMaximumHeight(100)
+        self.add_files_btn = QPushButton("파일 추가..."); self.add_folder_btn = QPushButton("폴더 추가...")
+        self.add_pattern_btn = QPushButton("패턴 추가..."); self.remove_source_btn = QPushButton("제거")
+        self.include_edit = QLineEdit(); self.include_edit.setPlaceholderText("예: *.py, *.md (비워두면 모두 포함)")
+        self.exclude_edit = QLineEdit(); self.exclude_edit.setPlaceholderText("예: tests/**, *.lock (.git, node_modules 등은 기본 제외)")
+        self.chunk_spinbox = QSpinBox(); self.chunk_spinbox.setRange(1, 1024); self.chunk_spinbox.setSuffix(" KB (글자 수 기준)")
+        self.chunk_spinbox.setValue(DEFAULT_CHUNK_CHARS // 1024)
+        self.reuse_check = QCheckBox("같은 내용(해시)의 캐시가 이미 있으면 새로 만들지 않고 재사용")
+        self.reuse_check.setChecked(True)
+        self.estimate_btn = QPushButton("크기 / 토큰 추정"); self.estimate_label = QLabel("")
+        self.estimate_label.setWordWrap(True)
+
+        self.add_files_btn.clicked.connect(self.add_files); self.add_folder_btn.clicked.connect(self.add_folder)
+        self.add_pattern_btn.clicked.connect(self.add_pattern); self.estimate_btn.clicked.connect(self.estimate)
+        self.remove_source_btn.clicked.connect(lambda: self.sources_list.takeItem(self.sources_list.currentRow()))
+
         # 버튼 박스
         button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         button_box.accepted.connect(self.accept)
@@ -34,13 +70,67 @@ class NewCacheDialog(QDialog):
         form_layout.addRow("표시 이름:", self.name_edit)
         form_layout.addRow("기반 모델:", self.model_combo)
         form_layout.addRow("TTL (수명):", self.ttl_spinbox)
+
+        source_buttons = QHBoxLayout()
+        for btn in (self.add_files_btn, self.add_folder_btn, self.add_pattern_btn, self.remove_source_btn): source_buttons.addWidget(btn)
+        files_group = QGroupBox("파일에서 가져오기"); files_layout = QVBoxLayout(files_group)
+        files_layout.addWidget(self.sources_list); files_layout.addLayout(source_buttons)
+        files_form = QFormLayout()
+        files_form.addRow("포함 패턴:", self.include_edit)
+        files_form.addRow("제외 패턴:", self.exclude_edit)
+        files_form.addRow("조각 크기:", self.chunk_spinbox)
+        files_layout.addLayout(files_form); files_layout.addWidget(self.reuse_check)
+        estimate_layout = QHBoxLayout(); estimate_layout.addWidget(self.estimate_btn); estimate_layout.addWidget(self.estimate_label, 1)
+        files_layout.addLayout(estimate_layout)
         
         main_layout = QVBoxLayout(self)
         main_layout.addLayout(form_layout)
-        main_layout.addWidget(QLabel("캐시할 내용:"))
+        main_layout.addWidget(QLabel("캐시할 내용 (시스템 지시):"))
         main_layout.addWidget(self.content_edit)
+        main_layout.addWidget(files_group)
         main_layout.addWidget(button_box)
 
+    def _add_sources(self, paths):
+        existing = {self.sources_list.item(i).text() for i in range(self.sources_list.count())}
+        for path in paths:
+            if path and path not in existing: self.sources_list.addItem(path); existing.add(path)
+
+    @Slot()
+    def add_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "캐시에 넣을 파일 선택")
+        self._add_sources(paths)
+
+    @Slot()
+    def add_folder(self):
+        self._add_sources([QFileDialog.getExistingDirectory(self, "캐시에 넣을 폴더 선택")])
+
+    @Slot()
+    def add_pattern(self):
+        pattern, ok = QInputDialog.getText(self, "glob 패턴 추가", "예: C:/docs/**/*.md")
+        if ok: self._add_sources([pattern.strip()])
+
+    def sources(self): return [self.sources_list.item(i).text() for i in range(self.sources_list.count())]
+
+    def make_plan(self):
+        return CachePlan(self.model_combo.currentText(), self.content_edit.toPlainText(), self.sources(),
+                         split_patterns(self.include_edit.text()), split_patterns(self.exclude_edit.text()),
+                         chunk_chars=self.chunk_spinbox.value() * 1024)
+
+    @Slot()
+    def estimate(self):
+        self.estimate_btn.setEnabled(False); self.estimate_label.setText("파일을 확인하는 중...")
+        worker = CachePlanWorker(self.make_plan())
+        worker.signals.finished.connect(self.on_estimated); worker.signals.error.connect(self.on_estimate_error)
+        QThreadPool.globalInstance().start(worker)
+
+    @Slot(object)
+    def on_estimated(self, plan):
+        self.estimate_btn.setEnabled(True); self.estimate_label.setText(plan.summary())
+
+    @Slot(str)
+    def on_estimate_error(self, error_msg):
+        self.estimate_btn.setEnabled(True); self.estimate_label.setText(error_msg)
+
     def get_data(self):
         """사용자가 입력한 데이터를 딕셔너리 형태로 반환합니다."""
         if not self.name_edit.text().strip():
@@ -50,5 +140,10 @@ class NewCacheDialog(QDialog):
             'display_name': self.name_edit.text().strip(),
             'model_name': self.model_combo.currentText(),
             'contents': self.content_edit.toPlainText(),
-            'ttl': datetime.timedelta(minutes=self.ttl_spinbox.value())
+            'ttl': datetime.timedelta(minutes=self.ttl_spinbox.value()),
+            'sources': self.sources(),
+            'include': split_patterns(self.include_edit.text()),
+            'exclude': split_patterns(self.exclude_edit.text()),
+            'chunk_chars': self.chunk_spinbox.value() * 1024,
+            'reuse_existing': self.reuse_check.isChecked()
         }
\ No newline at end of file
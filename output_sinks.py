@@ -0,0 +1,438 @@
+# output_sinks.py
+
+import os
+import sys
+import json
+import mmap
+import struct
+import sqlite3
+import tarfile
+import threading
+import warnings
+import zipfile
+import zlib
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+from output_writer import content_hash, write_if_changed, atomic_write_bytes, normalize_output_path
+
+SINK_KINDS = ('directory', 'zip', 'tar', 'jsonl', 'sqlite')
+SINK_LABELS = {'directory': "폴더 (태스크마다 파일 하나)", 'zip': "ZIP 압축 파일", 'tar': "TAR 묶음 파일",
+               'jsonl': "JSONL 파일", 'sqlite': "SQLite 데이터베이스"}
+CONTAINER_EXTENSIONS = {'zip': ".zip", 'tar': ".tar", 'jsonl': ".jsonl", 'sqlite': ".sqlite"}
+DEFAULT_CONTAINER_NAME = "outputs"
+
+ContainerEntry = namedtuple('ContainerEntry', 'name meta size location') # 위치는 형식마다 다릅니다. (read_entries에서 사용)
+
+_ZIP_META_FIELD = 0x4150 # 메타데이터를 담는 ZIP 확장 필드 ID ("PA")
+_ZIP_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+def container_path(kind, output_folder, container_name=None):
+    name = container_name or DEFAULT_CONTAINER_NAME
+    ext = CONTAINER_EXTENSIONS[kind]
+    return os.path.join(output_folder, name if name.lower().endswith(ext) else name + ext)
+
+def create_sink(kind, output_folder, container_name=None, encoding='utf-8'):
+    """run_options의 output_sink 값에 맞는 결과 저장소를 만듭니다.
+
+    컨테이너 저장소는 경로마다 하나를 프로세스 안에서 공유합니다. 동시에 실행되는 같은 프로젝트의 실행들이 같은 파일을
+    따로 열면 서로의 항목을 덮어쓰거나(ZIP 중앙 디렉터리) 기록 중인 항목을 잘라내므로(TAR/JSONL 복구) 하나로 모아 씁니다.
+    """
+    if kind in (None, '', 'directory'): return DirectorySink(output_folder)
+    sink_class = {'zip': ZipSink, 'tar': TarSink, 'jsonl': JsonlSink, 'sqlite': SqliteSink}.get(kind)
+    if sink_class is None: raise ValueError(f"알 수 없는 결과 저장 방식입니다: '{kind}'")
+    path = container_path(kind, output_folder, container_name)
+    return SharedSink(path, sink_class.kind, lambda: sink_class(path, output_folder, encoding))
+
+class DirectorySink:
+    """기본 저장소: 태스크마다 결과 폴더에 파일 하나를 원자적으로 기록합니다."""
+    kind = 'directory'
+
+    def __init__(self, folder=None):
+        self.folder = folder; self.path = folder
+
+    def open(self):
+        if self.folder: os.makedirs(self.folder, exist_ok=True)
+        return self
+
+    def write(self, path, data, metadata=None): return write_if_changed(path, data)
+
+    def describe(self, path): return path
+
+    def close(self): pass
+
+def _lock_container(path):
+    """다른 프로세스(작업 서버, 다른 창)가 같은 컨테이너를 쓰고 있으면 OSError를 냅니다. 잠금은 프로세스가 끝나면 풀립니다."""
+    directory, name = os.path.split(os.path.abspath(path))
+    fd = os.open(os.path.join(directory, f".{name}.lock"), os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError: os.close(fd); raise
+    return fd
+
+def _unlock_container(fd):
+    if sys.platform == "win32":
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET); msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    os.close(fd) # flock 잠금은 닫으면 풀립니다.
+
+class SharedSink:
+    """같은 컨테이너 파일을 쓰는 실행들이 나눠 쓰는 핸들입니다.
+
+    처음 open()한 핸들이 실제 저장소를 열고, 마지막으로 close()한 핸들이 닫습니다. 기록은 저장소의 잠금으로 직렬화됩니다.
+    다른 프로세스가 같은 파일을 열고 있으면 open()이 RuntimeError를 냅니다.
+    """
+    _lock = threading.Lock(); _open_sinks = {} # 정규화한 경로 → [저장소, 참조 수, 잠금 파일 fd]
+
+    def __init__(self, path, kind, factory):
+        self.path = path; self.kind = kind; self.key = normalize_output_path(path); self._factory = factory; self._sink = None
+
+    def open(self):
+        with SharedSink._lock:
+            entry = SharedSink._open_sinks.get(self.key)
+            if entry is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                try: fd = _lock_container(self.path)
+                except OSError: raise RuntimeError(f"다른 프로그램이 결과 파일을 쓰고 있습니다: '{self.path}'") from None
+                sink = self._factory()
+                try: sink.open()
+                except BaseException: _unlock_container(fd); raise
+                entry = SharedSink._open_sinks[self.key] = [sink, 0, fd]
+            entry[1] += 1; self._sink = entry[0]
+        return self
+
+    def describe(self, path): return self._sink.describe(path)
+
+    def write(self, path, data, metadata=None): return self._sink.write(path, data, metadata)
+
+    def close(self):
+        with SharedSink._lock:
+            if self._sink is None: return
+            sink, self._sink = self._sink, None
+            entry = SharedSink._open_sinks[self.key]; entry[1] -= 1
+            if entry[1]: return
+            del SharedSink._open_sinks[self.key]
+            try: sink.close()
+            finally: _unlock_container(entry[2])
+
+class ContainerSink(ABC):
+    """모든 결과를 파일 하나(컨테이너)에 이어 쓰는 저장소의 공통 부분입니다.
+
+    항목 이름은 결과 폴더 기준의 상대 경로이며, 같은 이름이 다시 기록되면 마지막 항목이 최신 내용입니다.
+    내용 해시가 최신 항목과 같으면 다시 쓰지 않습니다('unchanged').
+    """
+    kind = None
+
+    def __init__(self, path, folder, encoding='utf-8'):
+        self.path = path; self.folder = folder; self.encoding = encoding; self._hashes = {}; self._lock = threading.Lock()
+
+    def open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._open(); return self
+
+    def entry_name(self, path):
+        return os.path.relpath(path, self.folder).replace(os.sep, '/') if self.folder else os.path.basename(path)
+
+    def describe(self, path): return f"{os.path.basename(self.path)}:{self.entry_name(path)}"
+
+    def write(self, path, data, metadata=None):
+        name = self.entry_name(path); digest = content_hash(data)
+        meta = dict(metadata or {}); meta.update(sha256=digest, size=len(data), written_at=datetime.now().astimezone().isoformat(timespec='seconds'))
+        with self._lock: # 여러 실행의 저장 스레드가 같은 저장소에 기록할 수 있습니다. (SharedSink)
+            if self._hashes.get(name) == digest: return 'unchanged'
+            self._append(name, data, meta); self._hashes[name] = digest
+        return 'written'
+
+    @abstractmethod
+    def _open(self):
+        """컨테이너를 열고 기존 항목의 해시를 self._hashes에 채웁니다."""
+
+    @abstractmethod
+    def _append(self, name, data, meta):
+        """항목 하나를 컨테이너 끝에 덧붙입니다. self._lock을 잡고 호출됩니다."""
+
+    def close(self): pass
+
+class JsonlSink(ContainerSink):
+    """한 줄에 결과 하나씩 JSON으로 이어 씁니다. 비정상 종료로 잘린 마지막 줄은 다음에 열 때 잘라냅니다."""
+    kind = 'jsonl'
+
+    def _open(self):
+        for name, _, meta, _, _ in _iter_jsonl(self.path, with_data=False): self._hashes[name] = meta.get('sha256')
+        _truncate_to(self.path, _jsonl_valid_length(self.path))
+        self._f = open(self.path, 'ab')
+
+    def _append(self, name, data, meta):
+        record = {'name': name, 'content': data.decode(self.encoding, errors='replace'), 'encoding': self.encoding, 'metadata': meta}
+        self._f.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b"\n"); self._f.flush()
+
+    def close(self):
+        f = getattr(self, '_f', None)
+        if f: f.flush(); os.fsync(f.fileno()); f.close(); self._f = None
+
+class SqliteSink(ContainerSink):
+    """결과를 SQLite 테이블에 저장합니다. 항목마다 트랜잭션을 커밋하므로 중간에 끊겨도 커밋된 결과는 유지됩니다."""
+    kind = 'sqlite'
+
+    def _open(self):
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL"); self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS outputs (name TEXT PRIMARY KEY, data BLOB NOT NULL, sha256 TEXT, metadata TEXT, written_at TEXT)")
+        self._db.commit()
+        self._hashes.update(self._db.execute("SELECT name, sha256 FROM outputs"))
+
+    def _append(self, name, data, meta):
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO outputs (name, data, sha256, metadata, written_at) VALUES (?, ?, ?, ?, ?)",
+                             (name, data, meta['sha256'], json.dumps(meta, ensure_ascii=False), meta['written_at']))
+
+    def close(self):
+        db = getattr(self, '_db', None)
+        if db: db.close(); self._db = None
+
+class TarSink(ContainerSink):
+    """결과를 TAR 묶음에 구성원(member)으로 이어 씁니다. 메타데이터는 PAX 헤더에 들어갑니다.
+
+    다음에 열 때 마지막으로 완전히 기록된 구성원 뒤를 잘라내므로, 중간에 끊긴 구성원이나 끝 표시는 남지 않습니다.
+    """
+    kind = 'tar'
+
+    def _open(self):
+        valid_length = 0
+        for name, _, meta, size, offset in _iter_tar(self.path, with_data=False):
+            self._hashes[name] = meta.get('sha256'); valid_length = _tar_end(offset, size)
+        _truncate_to(self.path, valid_length)
+        self._f = open(self.path, 'ab')
+
+    def _append(self, name, data, meta):
+        info = tarfile.TarInfo(name); info.size = len(data); info.mtime = int(datetime.now().timestamp()); info.mode = 0o644
+        info.pax_headers = {f"AIPromptHelper.{key}": str(value) for key, value in meta.items()}
+        padding = (tarfile.BLOCKSIZE - len(data) % tarfile.BLOCKSIZE) % tarfile.BLOCKSIZE
+        self._f.write(info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape') + data + tarfile.NUL * padding); self._f.flush()
+
+    def close(self):
+        f = getattr(self, '_f', None)
+        if f:
+            # 끝 표시(빈 블록 2개)를 붙여 일반 tar 도구로도 읽을 수 있게 합니다. 다음에 열 때 다시 잘라냅니다.
+            f.write(tarfile.NUL * (tarfile.BLOCKSIZE * 2)); f.flush(); os.fsync(f.fileno()); f.close(); self._f = None
+
+class ZipSink(ContainerSink):
+    """결과를 ZIP 항목으로 이어 씁니다. 메타데이터는 각 항목의 확장 필드에 들어갑니다.
+
+    중앙 디렉터리는 닫을 때 기록되므로, 비정상 종료로 중앙 디렉터리가 없으면 로컬 헤더를 훑어 항목을 복구한 뒤 이어 씁니다.
+    """
+    kind = 'zip'
+
+    def _open(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path) and not zipfile.is_zipfile(self.path): _repair_zip(self.path)
+        self._zip = zipfile.ZipFile(self.path, 'a', compression=zipfile.ZIP_DEFLATED)
+        for info in self._zip.infolist(): self._hashes[info.filename] = _zip_meta(info.extra).get('sha256')
+
+    def _append(self, name, data, meta):
+        info = zipfile.ZipInfo(name, datetime.now().timetuple()[:6]); info.compress_type = zipfile.ZIP_DEFLATED
+        payload = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        info.extra = struct.pack('<2H', _ZIP_META_FIELD, len(payload)) + payload
+        with _duplicate_names_allowed(): self._zip.writestr(info, data)
+        self._zip.fp.flush()
+
+    def close(self):
+        z = getattr(self, '_zip', None)
+        if z: z.close(); self._zip = None
+
+def _truncate_to(path, length):
+    if os.path.exists(path) and os.path.getsize(path) > length:
+        with open(path, 'r+b') as f: f.truncate(length)
+
+def _jsonl_valid_length(path):
+    """마지막 줄바꿈까지의 길이(=온전히 기록된 줄들의 길이)를 반환합니다."""
+    if not os.path.exists(path): return 0
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END); end = f.tell(); position = end
+        while position > 0:
+            step = min(1 << 16, position); f.seek(position - step); block = f.read(step)
+            newline = block.rfind(b"\n")
+            if newline != -1: return position - step + newline + 1
+            position -= step
+    return 0
+
+# 아래의 _iter_* 함수는 (이름, 내용 | None, 메타데이터, 크기, 위치)를 기록된 순서대로 돌려주고,
+# _read_* 함수는 (파일을 한 번만 열어) 위치로 항목 내용을 하나씩 읽습니다. 위치는 형식마다 다릅니다.
+
+def _jsonl_record(line):
+    record = json.loads(line)
+    return record, record.get('content', '').encode(record.get('encoding', 'utf-8'))
+
+def _iter_jsonl(path, with_data=True):
+    if not os.path.exists(path): return
+    with open(path, 'rb') as f:
+        position = 0
+        for line in f:
+            start = position; position += len(line)
+            if not line.endswith(b"\n"): break
+            try: record, data = _jsonl_record(line)
+            except ValueError: continue
+            yield record.get('name'), data if with_data else None, record.get('metadata', {}), len(data), start
+
+def _read_jsonl(path, entries):
+    with open(path, 'rb') as f:
+        for entry in entries: f.seek(entry.location); yield entry, _jsonl_record(f.readline())[1]
+
+def _iter_sqlite(path, with_data=True):
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        columns = "name, data, metadata, length(data)" if with_data else "name, NULL, metadata, length(data)"
+        for name, data, meta, size in db.execute(f"SELECT {columns} FROM outputs ORDER BY rowid"):
+            yield name, data, json.loads(meta) if meta else {}, size, name
+    finally: db.close()
+
+def _read_sqlite(path, entries):
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        for entry in entries: yield entry, db.execute("SELECT data FROM outputs WHERE name = ?", (entry.location,)).fetchone()[0]
+    finally: db.close()
+
+def _tar_end(offset, size): return offset + -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+def _iter_tar(path, with_data=True):
+    """위치는 내용의 시작 위치입니다. 잘린 구성원이 나오면 거기서 멈춥니다."""
+    if not os.path.exists(path) or not os.path.getsize(path): return
+    size = os.path.getsize(path)
+    try:
+        with tarfile.open(path, 'r:') as tar:
+            for member in tar:
+                if _tar_end(member.offset_data, member.size) > size: break
+                if not member.isfile(): continue
+                meta = {key[len("AIPromptHelper."):]: value for key, value in member.pax_headers.items() if key.startswith("AIPromptHelper.")}
+                yield member.name, tar.extractfile(member).read() if with_data else None, meta, member.size, member.offset_data
+    except (tarfile.ReadError, EOFError): return
+
+def _read_tar(path, entries):
+    with open(path, 'rb') as f:
+        for entry in entries: f.seek(entry.location); yield entry, f.read(entry.size)
+
+def _zip_meta(extra):
+    position = 0
+    while position + 4 <= len(extra):
+        field_id, length = struct.unpack_from('<2H', extra, position)
+        if field_id == _ZIP_META_FIELD:
+            try: return json.loads(extra[position + 4:position + 4 + length])
+            except ValueError: return {}
+        position += 4 + length
+    return {}
+
+@contextmanager
+def _mapped(path):
+    """파일 전체를 메모리에 읽지 않고 bytes처럼 다룰 수 있게 매핑합니다. 빈 파일은 b""입니다."""
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size: yield b""; return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as blob: yield blob
+
+def _zip_local_entry(blob, position):
+    """position의 로컬 헤더에서 온전한 항목을 (ZipInfo, 내용, 다음 위치)로 읽습니다. 잘렸거나 CRC가 맞지 않으면 None입니다."""
+    if position + _ZIP_LOCAL_HEADER.size > len(blob): return None
+    (_, _, flags, method, mtime, mdate, crc, compressed_size, _, name_length, extra_length) = _ZIP_LOCAL_HEADER.unpack_from(blob, position)
+    start = position + _ZIP_LOCAL_HEADER.size; data_start = start + name_length + extra_length
+    raw = blob[data_start:data_start + compressed_size]
+    try:
+        if len(raw) != compressed_size: return None
+        data = zlib.decompressobj(-15).decompress(raw) if method == zipfile.ZIP_DEFLATED else raw if method == zipfile.ZIP_STORED else None
+        if data is None or zlib.crc32(data) != crc: return None
+    except zlib.error: return None
+    name = bytes(blob[start:start + name_length]).decode('utf-8' if flags & 0x800 else 'cp437')
+    info = zipfile.ZipInfo(name, ((mdate >> 9) + 1980, (mdate >> 5) & 0xF, mdate & 0x1F, mtime >> 11, (mtime >> 5) & 0x3F, (mtime & 0x1F) * 2))
+    info.compress_type = zipfile.ZIP_DEFLATED; info.extra = bytes(blob[start + name_length:data_start]); info.header_offset = position
+    return info, data, data_start + compressed_size
+
+def _scan_zip_local_entries(path):
+    """중앙 디렉터리 없이 로컬 헤더만으로 온전한 항목을 (ZipInfo, 내용) 형태로 하나씩 복구합니다."""
+    with _mapped(path) as blob:
+        position = 0
+        while True:
+            position = blob.find(b"PK\x03\x04", position)
+            if position == -1: return
+            entry = _zip_local_entry(blob, position)
+            if entry is None: position += 4; continue
+            info, data, position = entry
+            yield info, data
+
+@contextmanager
+def _duplicate_names_allowed():
+    # 같은 이름의 항목을 다시 추가하는 것은 의도된 동작(마지막 항목이 최신)이므로 이 구간에서만 zipfile의 경고를 끕니다.
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message="Duplicate name", category=UserWarning, module='zipfile'); yield
+
+def _repair_zip(path):
+    """중앙 디렉터리가 없는 ZIP을 복구 가능한 항목들로 다시 만듭니다. 원본은 .corrupt로 남깁니다."""
+    temp_path = path + ".repair"
+    with zipfile.ZipFile(temp_path, 'w') as z, _duplicate_names_allowed():
+        for info, data in _scan_zip_local_entries(path): z.writestr(info, data)
+    os.replace(path, path + ".corrupt"); os.replace(temp_path, path)
+
+def _iter_zip(path, with_data=True):
+    """위치는 항목의 로컬 헤더 위치입니다. 중앙 디렉터리가 없으면(기록 중이거나 비정상 종료) 로컬 헤더를 훑습니다."""
+    if not zipfile.is_zipfile(path):
+        for info, data in _scan_zip_local_entries(path): yield info.filename, data if with_data else None, _zip_meta(info.extra), len(data), info.header_offset
+        return
+    with zipfile.ZipFile(path) as z:
+        for info in z.infolist(): yield info.filename, z.read(info) if with_data else None, _zip_meta(info.extra), info.file_size, info.header_offset
+
+def _read_zip(path, entries):
+    if not zipfile.is_zipfile(path):
+        with _mapped(path) as blob:
+            for entry in entries: yield entry, _zip_local_entry(blob, entry.location)[1]
+        return
+    with zipfile.ZipFile(path) as z:
+        by_offset = {info.header_offset: info for info in z.infolist()}
+        for entry in entries: yield entry, z.read(by_offset[entry.location])
+
+_ITERATORS = {'zip': _iter_zip, 'tar': _iter_tar, 'jsonl': _iter_jsonl, 'sqlite': _iter_sqlite}
+_READERS = {'zip': _read_zip, 'tar': _read_tar, 'jsonl': _read_jsonl, 'sqlite': _read_sqlite}
+
+def container_kind(path):
+    lower = path.lower()
+    for kind, ext in CONTAINER_EXTENSIONS.items():
+        if lower.endswith(ext): return kind
+    if lower.endswith(".db"): return 'sqlite'
+    raise ValueError(f"결과 컨테이너 형식을 알 수 없습니다: '{os.path.basename(path)}'")
+
+def iter_entries(path):
+    """컨테이너의 항목을 기록된 순서대로 (이름, 내용 bytes, 메타데이터)로 돌려줍니다. 같은 이름은 뒤의 항목이 최신입니다."""
+    for name, data, meta, _, _ in _ITERATORS[container_kind(path)](path): yield name, data, meta
+
+def latest_entries(path, include_partial=True):
+    """컨테이너의 최신 항목들을 이름 → ContainerEntry로 반환합니다. 내용은 읽지 않으므로 read_entries()로 하나씩 읽습니다."""
+    latest = {}
+    for name, _, meta, size, location in _ITERATORS[container_kind(path)](path, with_data=False):
+        if name.endswith(".partial") and not include_partial: continue
+        latest[name] = ContainerEntry(name, meta, size, location)
+    return latest
+
+def read_entries(path, entries):
+    """latest_entries()의 항목들을 (항목, 내용 bytes)로 하나씩 돌려줍니다. 컨테이너는 한 번만 엽니다."""
+    yield from _READERS[container_kind(path)](path, entries)
+
+def extract(path, dest_folder, include_partial=False):
+    """컨테이너의 최신 항목들을 dest_folder 아래에 파일로 꺼냅니다. (기록한 파일 수, 변경 없는 파일 수)를 반환합니다."""
+    latest = latest_entries(path, include_partial)
+    root = os.path.abspath(dest_folder); written = unchanged = 0
+    for name in latest:
+        target = os.path.abspath(os.path.join(root, *name.split('/')))
+        # 컨테이너 안의 이름이 대상 폴더 밖을 가리키지 못하게 합니다.
+        if os.path.commonpath([root, target]) != root: raise ValueError(f"잘못된 항목 이름입니다: '{name}'")
+    for entry, data in read_entries(path, latest.values()):
+        target = os.path.join(root, *entry.name.split('/')); os.makedirs(os.path.dirname(target), exist_ok=True)
+        if write_if_changed(target, data) == 'written': written += 1
+        else: unchanged += 1
+    return written, unchanged
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3: print("사용법: python output_sinks.py <컨테이너 파일> <대상 폴더>"); sys.exit(2)
+    written, unchanged = extract(sys.argv[1], sys.argv[2])
+    print(f"{written}개 파일을 기록했습니다. (변경 없음 {unchanged}개)")
@@ -0,0 +1,106 @@
+# output_writer.py
+
+import os
+import hashlib
+import queue
+import tempfile
+import threading
+
+_STOP = object()
+# mkstemp는 파일을 0600으로 만들므로, 새 파일에는 open()과 같은 umask 기준 권한을 줍니다. (umask는 읽으려면 바꿔야 하므로 시작할 때 한 번만 읽습니다.)
+_UMASK = os.umask(0); os.umask(_UMASK)
+
+def normalize_output_path(path):
+    """대소문자만 다른 파일명도 같은 파일로 취급하도록 경로를 정규화합니다."""
+    return os.path.normcase(os.path.abspath(path)).casefold()
+
+def find_collisions(planned_outputs):
+    """(태스크 이름, 파일 경로) 목록에서 같은 파일에 쓰게 되는 항목들을 찾습니다."""
+    owners = {}
+    for task_name, path in planned_outputs: owners.setdefault(normalize_output_path(path), []).append((task_name, path))
+    return {entries[0][1]: [name for name, _ in entries] for entries in owners.values() if len(entries) > 1}
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''): h.update(chunk)
+    return h.hexdigest()
+
+def atomic_write_bytes(path, data):
+    """같은 폴더의 임시 파일에 기록한 뒤 os.replace로 교체하여 중간에 잘린 파일이 남지 않도록 합니다."""
+    directory = os.path.dirname(os.path.abspath(path))
+    try: mode = os.stat(path).st_mode & 0o7777 # 기존 파일의 권한을 유지합니다.
+    except OSError: mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try: os.remove(tmp_path)
+        except OSError: pass
+        raise
+
+def write_if_changed(path, data):
+    """내용이 기존 파일과 같으면 쓰지 않고 'unchanged'를, 새로 썼으면 'written'을 반환합니다."""
+    if os.path.isfile(path) and os.path.getsize(path) == len(data) and file_hash(path) == content_hash(data):
+        return 'unchanged'
+    atomic_write_bytes(path, data)
+    return 'written'
+
+class OutputWriter:
+    """요청 루프와 분리된 별도 스레드에서 결과 파일을 기록하는 writer 단계입니다.
+
+    submit()은 큐에 넣고 즉시 반환하며, 각 기록 결과는 on_result(path, status, error) 콜백으로 전달됩니다.
+    status는 'written', 'unchanged', 'failed' 중 하나입니다.
+    sink(output_sinks 참고)를 주면 결과를 그 저장소에 기록하며, 없으면 경로마다 파일 하나를 씁니다.
+    """
+    def __init__(self, on_result=None, encoding='utf-8', sink=None):
+        self.on_result = on_result; self.encoding = encoding; self.sink = sink
+        self._queue = queue.Queue(); self._thread = None
+        self.stats = {'written': 0, 'unchanged': 0, 'failed': 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._worker, name="OutputWriter", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, path, content, metadata=None):
+        if self._thread is None: raise RuntimeError("OutputWriter가 시작되지 않았습니다.")
+        self._queue.put((path, content, metadata))
+
+    def pending(self): return self._queue.qsize()
+
+    def close(self, timeout=None):
+        """남은 기록을 모두 처리한 뒤 스레드를 종료합니다. 시간 내에 끝나면 True를 반환합니다."""
+        if self._thread is None: return True
+        self._queue.put(_STOP); self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _close_sink(self):
+        try:
+            if self.sink: self.sink.close()
+        except Exception as e:
+            if self.on_result:
+                try: self.on_result(getattr(self.sink, 'path', ""), 'failed', e)
+                except Exception: pass
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP: self._close_sink(); break
+            path, content, metadata = item
+            try:
+                # 기존의 텍스트 모드 open(..., "w")와 같은 줄바꿈 변환을 유지합니다.
+                data = content.replace('\n', os.linesep).encode(self.encoding)
+                status = self.sink.write(path, data, metadata) if self.sink else write_if_changed(path, data); error = None
+            except Exception as e:
+                status = 'failed'; error = e
+            self.stats[status] += 1
+            if self.on_result:
+                try: self.on_result(path, status, error)
+                except Exception: pass
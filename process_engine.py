@@ -0,0 +1,218 @@
+# process_engine.py
+
+from PySide6.QtCore import QObject, Signal, Qt
+
+import os
+import time
+import threading
+import multiprocessing
+
+from core_logic import TaskRunnerSignals
+
+LOG_FLUSH_INTERVAL = 0.05 # 로그는 이 간격으로 묶어서 보냅니다. (IPC 메시지와 GUI 갱신 횟수 감소)
+MAX_RESTARTS = 5; RESTART_WINDOW = 60.0 # 이 시간 안에 이만큼 죽으면 자동 재시작을 멈춥니다.
+SHUTDOWN_TIMEOUT = 3.0
+
+# 메시지 형식 (튜플, pickle)
+# GUI → 작업 프로세스: ('run', run_id, payload), ('stop', run_id), ('priority', run_id, priority), ('shutdown',)
+# 작업 프로세스 → GUI: ('ready', pid), ('logs', run_id, [(message, level, task), ...]), ('progress', run_id, done, total),
+#                      ('output', run_id, path, status), ('error', run_id, message), ('finished', run_id)
+
+def run_payload(api_key, variables, tasks, settings, priority='normal', profile=None):
+    """실행에 필요한 내용을 작업 프로세스로 보낼 수 있는 형태로 바꿉니다. settings는 프로젝트 파일의 settings와 같은 형식입니다.
+
+    profile({'dir': 폴더, 'memory': bool})을 주면 작업 프로세스가 실행 전체를 cProfile로 측정하여 그 폴더에 저장합니다.
+    """
+    return {'api_key': api_key, 'variables': [var.to_dict() for var in variables.values()], 'tasks': [task.to_dict() for task in tasks],
+            'settings': settings, 'priority': priority, 'profile': profile}
+
+class _Outbox:
+    """작업 프로세스에서 GUI로 메시지를 보냅니다. 로그는 모아 두었다가 주기적으로, 다른 메시지를 보내기 전에 한꺼번에 보냅니다."""
+    def __init__(self, conn):
+        self.conn = conn; self._lock = threading.Lock(); self._logs = {}; self._closed = threading.Event()
+        threading.Thread(target=self._flush_loop, name="OutboxFlusher", daemon=True).start()
+
+    def _flush(self):
+        # self._lock을 잡고 호출합니다.
+        logs, self._logs = self._logs, {}
+        for run_id, records in logs.items(): self.conn.send(('logs', run_id, records))
+
+    def _flush_loop(self):
+        while not self._closed.wait(LOG_FLUSH_INTERVAL):
+            with self._lock:
+                try: self._flush()
+                except OSError: return
+
+    def log(self, run_id, message, level, task):
+        with self._lock: self._logs.setdefault(run_id, []).append((message, level, task))
+
+    def send(self, message):
+        # 로그가 다른 이벤트(진행률, 종료)보다 늦게 도착하지 않도록 먼저 보냅니다.
+        with self._lock: self._flush(); self.conn.send(message)
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            try: self._flush()
+            except OSError: pass
+
+def worker_main(conn):
+    """작업 프로세스의 진입점입니다. 명령을 받아 실행마다 스레드에서 TaskRunner를 실행합니다.
+
+    엔드포인트 풀, 유사 응답 캐시, 전역 스케줄러는 HeadlessSession에 두어 실행 사이에 유지합니다.
+    """
+    from headless import HeadlessSession
+    from project_io import variable_from_dict, task_from_dict
+    from diagnostics import profile_to_file
+
+    session = HeadlessSession(); outbox = _Outbox(conn); runners = {}; threads = []; lock = threading.Lock()
+
+    def start(run_id, payload):
+        variables = {var.id: var for var in map(variable_from_dict, payload['variables'])}
+        runner = session.make_runner(variables, [task_from_dict(data) for data in payload['tasks']], payload['settings'],
+                                     api_key=payload['api_key'], priority=payload['priority'])
+        runner.run_id = run_id # GUI가 정한 id를 그대로 써서 로그/이벤트를 맞춥니다.
+        # 이 프로세스의 어느 스레드에도 Qt 이벤트 루프가 없으므로, 시그널은 실행 스레드/태스크 스레드/저장 스레드에서
+        # 바로 처리되도록 직접 연결합니다. (큐 연결이면 전달되지 않고 쌓이기만 합니다) _Outbox는 스레드 안전합니다.
+        runner.signals.log_record.connect(lambda message, level, task: outbox.log(run_id, message, level, task), Qt.DirectConnection)
+        runner.signals.progress.connect(lambda done, total: outbox.send(('progress', run_id, done, total)), Qt.DirectConnection)
+        runner.signals.output_written.connect(lambda path, status: outbox.send(('output', run_id, path, status)), Qt.DirectConnection)
+        runner.signals.error.connect(lambda message: outbox.send(('error', run_id, message)), Qt.DirectConnection)
+        profile = payload.get('profile')
+        def run():
+            try:
+                if profile: profile_to_file(runner, os.path.join(profile['dir'], f"run_{run_id}.prof"), profile.get('memory'))
+                else: runner.run()
+            except Exception as e: outbox.send(('error', run_id, f"❌ 작업 프로세스 오류: {type(e).__name__}: {e}"))
+            finally:
+                with lock: runners.pop(run_id, None)
+                outbox.send(('finished', run_id))
+        with lock: runners[run_id] = runner
+        thread = threading.Thread(target=run, name=f"Run-{run_id}", daemon=True); threads.append(thread); thread.start()
+
+    outbox.send(('ready', os.getpid()))
+    try:
+        while True:
+            try: message = conn.recv()
+            except (EOFError, OSError): break # GUI가 종료되었습니다.
+            command = message[0]
+            if command == 'run':
+                try: start(message[1], message[2])
+                except Exception as e:
+                    outbox.send(('error', message[1], f"❌ 실행을 시작하지 못했습니다: {type(e).__name__}: {e}")); outbox.send(('finished', message[1]))
+            elif command == 'stop':
+                with lock: runner = runners.get(message[1])
+                if runner: runner.stop()
+            elif command == 'priority': session.scheduler.set_priority(message[1], message[2])
+            elif command == 'shutdown': break
+    finally:
+        with lock: active = list(runners.values())
+        for runner in active: runner.stop()
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for thread in threads: thread.join(max(0.0, deadline - time.monotonic()))
+        outbox.close()
+
+class RemoteRun:
+    """작업 프로세스에서 실행 중인 워크플로우의 GUI 쪽 대리 객체입니다. TaskRunner와 같은 signals/run_id/stop()을 제공합니다."""
+    def __init__(self, engine, run_id):
+        self.engine = engine; self.run_id = run_id; self.signals = TaskRunnerSignals()
+
+    def stop(self): self.engine.send(('stop', self.run_id))
+
+class ProcessEngineSignals(QObject):
+    log = Signal(str, str); worker_restarted = Signal(int) # worker_restarted: 새 작업 프로세스의 pid
+
+class ProcessEngine:
+    """워크플로우를 별도 작업 프로세스에서 실행하는 백엔드입니다.
+
+    GUI 스레드는 진행률과 로그를 그리기만 하며, 템플릿 해석/응답 처리/SDK 호출은 작업 프로세스에서 이루어집니다.
+    작업 프로세스가 비정상 종료되면 진행 중이던 실행을 실패로 정리하고 새 프로세스를 띄웁니다.
+    """
+    def __init__(self):
+        self.signals = ProcessEngineSignals(); self._ctx = multiprocessing.get_context('spawn') # Qt 스레드가 있는 프로세스는 fork하지 않습니다.
+        self._lock = threading.Lock(); self._send_lock = threading.Lock()
+        self._process = None; self._conn = None; self._runs = {}; self._crashes = []; self._closing = False; self._killed = None
+
+    @property
+    def pid(self): return self._process.pid if self._process else None
+
+    def start(self):
+        """작업 프로세스를 미리 띄워 둡니다. (첫 실행에서 SDK 임포트 시간을 기다리지 않도록)"""
+        with self._lock:
+            if self._process is None or not self._process.is_alive(): self._spawn()
+
+    def _spawn(self):
+        # self._lock을 잡고 호출합니다.
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=worker_main, args=(child_conn,), name="AIPromptHelperWorker", daemon=True)
+        process.start(); child_conn.close()
+        self._process = process; self._conn = parent_conn
+        threading.Thread(target=self._read_loop, args=(process, parent_conn), name="ProcessEngineReader", daemon=True).start()
+
+    def send(self, message):
+        with self._send_lock:
+            try: self._conn.send(message); return True
+            except (OSError, AttributeError): return False # 프로세스가 죽은 경우는 읽기 스레드가 정리합니다.
+
+    def submit(self, payload, run_id):
+        """payload(run_payload)를 작업 프로세스에서 실행하고 RemoteRun을 반환합니다."""
+        self.start(); run = RemoteRun(self, run_id)
+        with self._lock: self._runs[run_id] = run
+        if not self.send(('run', run_id, payload)):
+            with self._lock: self._runs.pop(run_id, None)
+            raise RuntimeError("작업 프로세스에 실행을 전달하지 못했습니다.")
+        return run
+
+    def set_priority(self, run_id, priority): self.send(('priority', run_id, priority))
+
+    def force_stop(self, run_id):
+        """중지 요청에 응답하지 않는 실행을 끝냅니다. 그 실행만 남아 있으면 작업 프로세스를 종료하고 다시 띄웁니다."""
+        with self._lock:
+            if run_id not in self._runs or len(self._runs) > 1: return False
+            process = self._process
+        if process and process.is_alive():
+            self._killed = process; self.signals.log.emit("⚠ 응답하지 않는 작업 프로세스를 종료하고 다시 시작합니다.", "WARNING"); process.kill()
+        return True
+
+    def _read_loop(self, process, conn):
+        while True:
+            try: message = conn.recv()
+            except (EOFError, OSError): break
+            kind = message[0]
+            if kind == 'ready': continue
+            with self._lock: run = self._runs.get(message[1])
+            if run is None: continue
+            if kind == 'logs':
+                for record in message[2]: run.signals.log_record.emit(*record)
+            elif kind == 'progress': run.signals.progress.emit(message[2], message[3])
+            elif kind == 'output': run.signals.output_written.emit(message[2], message[3])
+            elif kind == 'error': run.signals.error.emit(message[2])
+            elif kind == 'finished':
+                with self._lock: self._runs.pop(message[1], None)
+                run.signals.finished.emit()
+        process.join(SHUTDOWN_TIMEOUT); conn.close()
+        self._on_worker_exit(process)
+
+    def _on_worker_exit(self, process):
+        with self._lock:
+            if process is not self._process: return
+            orphans = list(self._runs.values()); self._runs.clear(); self._process = None; self._conn = None
+            if self._closing: return
+            killed = process is self._killed; self._killed = None
+            if not killed: # 중지 요청으로 종료한 경우는 장애로 세지 않습니다.
+                now = time.monotonic(); self._crashes = [t for t in self._crashes if now - t < RESTART_WINDOW] + [now]
+            restart = killed or len(self._crashes) <= MAX_RESTARTS
+            if restart: self._spawn()
+        if killed:
+            for run in orphans: run.signals.finished.emit()
+            return
+        message = f"❌ 작업 프로세스가 비정상 종료되었습니다. (exit code {process.exitcode})"
+        for run in orphans: run.signals.error.emit(message); run.signals.finished.emit()
+        if restart: self.signals.log.emit(f"{message} 새 작업 프로세스를 시작했습니다.", "ERROR"); self.signals.worker_restarted.emit(self.pid or 0)
+        else: self.signals.log.emit(f"{message} {RESTART_WINDOW:.0f}초 안에 {MAX_RESTARTS}회 넘게 종료되어 다음 실행 때 다시 시작합니다.", "ERROR")
+
+    def shutdown(self):
+        with self._lock: self._closing = True; process = self._process
+        if process is None: return
+        self.send(('shutdown',)); process.join(SHUTDOWN_TIMEOUT + 1.0)
+        if process.is_alive(): process.kill()
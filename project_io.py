@@ -0,0 +1,143 @@
+# project_io.py
+
+from PySide6.QtCore import QObject, Signal, QRunnable, Slot
+
+import codecs
+import json
+import os
+import time
+
+from data_models import Variable, Task, TextPool
+
+def variable_from_dict(data, pool=None):
+    """pool(TextPool)을 주면 같은 내용의 긴 값을 하나의 문자열로 공유합니다. (파일 하나를 읽는 동안)"""
+    value = data.get('value')
+    return Variable(id=data.get('id'), name=data.get('name'), value=pool.intern(value) if pool else value, kind=data.get('kind', 'text'))
+
+def task_from_dict(data, pool=None):
+    prompt = data.get('prompt'); output_template = data.get('output_template', '')
+    if pool: prompt = pool.intern(prompt); output_template = pool.intern(output_template)
+    return Task(id=data.get('id'), name=data.get('name'), prompt=prompt,
+                enabled=data.get('enabled', True), output_template=output_template,
+                timeout=data.get('timeout', 0), cacheable=data.get('cacheable', True),
+                semantic_threshold=data.get('semantic_threshold', 0.0), model=data.get('model', ""),
+                complexity=data.get('complexity', 'normal'), generation=data.get('generation'))
+
+class _StreamingJsonReader:
+    """파일을 조금씩 읽으면서 JSON 값을 하나씩 디코딩합니다.
+
+    값이 버퍼 끝에서 잘려 디코딩에 실패하면 더 읽어서 다시 시도하며, 연속 실패 시 읽는 크기를 두 배로 늘려
+    큰 값(수 MB의 프롬프트 등)도 재시도 비용이 선형에 가깝도록 합니다.
+    """
+    def __init__(self, f, chunk_size=1 << 20):
+        self.f = f; self.chunk_size = chunk_size; self.buf = ""; self.pos = 0; self.eof = False; self.bytes_read = 0
+        self._decoder = json.JSONDecoder(); self._text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+
+    def _fill(self, size=None):
+        data = self.f.read(size or self.chunk_size)
+        if not data: self.eof = True; self.buf = self.buf[self.pos:] + self._text_decoder.decode(b"", final=True); self.pos = 0; return
+        self.bytes_read += len(data)
+        self.buf = self.buf[self.pos:] + self._text_decoder.decode(data); self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n": self.pos += 1
+            if self.pos < len(self.buf) or self.eof: return self.buf[self.pos] if self.pos < len(self.buf) else ""
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char: raise ValueError(f"프로젝트 파일 형식 오류: '{char}'이(가) 필요합니다. (위치 {self.bytes_read})")
+        self.pos += 1
+
+    def value(self):
+        self.peek(); size = self.chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+                # 숫자/리터럴이 버퍼 끝에서 끝나면 잘린 값일 수 있으므로 더 읽어서 확인합니다.
+                if end < len(self.buf) or self.eof: self.pos = end; return value
+            except json.JSONDecodeError:
+                if self.eof: raise
+            self._fill(size); size *= 2
+
+def iter_project_items(f, progress=None):
+    """프로젝트 JSON을 스트리밍으로 읽어 ('variable', dict), ('task', dict), ('setting', (키, 값))을 차례로 돌려줍니다.
+
+    progress가 주어지면 읽은 바이트 수로 progress(bytes_read)를 호출합니다.
+    """
+    reader = _StreamingJsonReader(f); reader.expect('{')
+    while reader.peek() != '}':
+        key = reader.value(); reader.expect(':')
+        if key in ('variables', 'tasks') and reader.peek() == '[':
+            kind = 'variable' if key == 'variables' else 'task'; reader.expect('[')
+            while reader.peek() != ']':
+                yield kind, reader.value()
+                if progress: progress(reader.bytes_read)
+                if reader.peek() == ',': reader.pos += 1
+            reader.expect(']')
+        else: yield 'setting', (key, reader.value())
+        if reader.peek() == ',': reader.pos += 1
+    reader.expect('}')
+
+def load_project(path, built_in_vars=()):
+    """프로젝트 파일을 한 번에 읽어 (변수 dict, 태스크 목록, 설정 dict)를 반환합니다. 헤드리스 실행과 감시 모드에서 사용합니다."""
+    variables = {}; tasks = []; settings = {}; pool = TextPool()
+    with open(path, 'rb') as f:
+        for kind, data in iter_project_items(f):
+            if kind == 'variable':
+                if data.get('name', '').upper() in built_in_vars: continue
+                var = variable_from_dict(data, pool)
+                if var.id and var.name: variables[var.id] = var
+            elif kind == 'task':
+                task = task_from_dict(data, pool)
+                if task.id and task.name: tasks.append(task)
+            else: settings[data[0]] = data[1]
+    return variables, tasks, settings.get('settings', {}) or {}
+
+class ProjectLoaderSignals(QObject):
+    variables_batch = Signal(object); tasks_batch = Signal(object); settings_loaded = Signal(dict)
+    progress = Signal(int); finished = Signal(str); error = Signal(str)
+
+class ProjectLoader(QRunnable):
+    """작업 스레드에서 프로젝트 파일을 스트리밍으로 파싱하여 변수/태스크를 묶음(batch) 단위로 전달합니다."""
+    def __init__(self, path, built_in_vars, batch_size=500, batch_interval=0.05):
+        super().__init__()
+        self.signals = ProjectLoaderSignals()
+        self.path = path; self.built_in_vars = built_in_vars
+        self.batch_size = batch_size; self.batch_interval = batch_interval; self.is_cancelled = False
+
+    def cancel(self): self.is_cancelled = True
+
+    @Slot()
+    def run(self):
+        try:
+            total = max(1, os.path.getsize(self.path)); variables = []; tasks = []; last_emit = 0; last_percent = -1 # 0이면 첫 묶음은 바로 보냅니다.
+            def report(bytes_read):
+                nonlocal last_percent
+                percent = min(100, bytes_read * 100 // total)
+                if percent != last_percent: last_percent = percent; self.signals.progress.emit(percent)
+            def flush(force=False):
+                nonlocal variables, tasks, last_emit
+                # 첫 묶음은 바로 보내 화면에 빨리 나타나게 하고, 이후에는 크기나 시간 간격마다 보냅니다.
+                if not force and len(variables) + len(tasks) < self.batch_size and time.monotonic() - last_emit < self.batch_interval: return
+                if variables: self.signals.variables_batch.emit(variables); variables = []
+                if tasks: self.signals.tasks_batch.emit(tasks); tasks = []
+                last_emit = time.monotonic()
+            settings = {}; pool = TextPool()
+            with open(self.path, 'rb') as f:
+                for kind, data in iter_project_items(f, report):
+                    if self.is_cancelled: return
+                    if kind == 'variable':
+                        if data.get('name', '').upper() in self.built_in_vars: continue
+                        var = variable_from_dict(data, pool)
+                        if var.id and var.name: variables.append(var)
+                    elif kind == 'task':
+                        task = task_from_dict(data, pool)
+                        if task.id and task.name: tasks.append(task)
+                    else: settings[data[0]] = data[1]
+                    flush()
+            flush(force=True)
+            self.signals.settings_loaded.emit(settings.get('settings', {}) or {})
+            self.signals.progress.emit(100); self.signals.finished.emit(self.path)
+        except Exception as e:
+            if not self.is_cancelled: self.signals.error.emit(f"{type(e).__name__}: {e}")
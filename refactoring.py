@@ -0,0 +1,78 @@
+# refactoring.py
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem,
+                             QPushButton, QLabel)
+from PySide6.QtGui import QUndoCommand
+from PySide6.QtCore import Qt, Signal, Slot
+
+from reference_index import rename_references
+
+FIELD_LABELS = {'name': "이름", 'prompt': "프롬프트", 'output_template': "저장 내용 템플릿", 'value': "값"}
+
+class RenameVariableCommand(QUndoCommand):
+    """변수 이름과 그 변수를 참조하는 모든 {이름}을 한 번에 바꾸는 실행 취소 가능한 명령입니다.
+
+    참조 위치는 역색인에서 찾으므로 실제로 참조하는 필드만 수정합니다.
+    적용(또는 취소) 후 on_applied(command)가 한 번 호출되어 화면 갱신과 상태 변경 알림을 처리합니다.
+    """
+    def __init__(self, var, new_name, variables, tasks, index, on_applied):
+        super().__init__(f"변수 이름 변경: '{var.name}' -> '{new_name}'")
+        self.var = var; self.old_name = var.name; self.new_name = new_name
+        self.index = index; self.on_applied = on_applied; self.edits = []
+        for kind, owner_id, field in index.usages(self.old_name):
+            owner = tasks.get(owner_id) if kind == 'task' else variables.get(owner_id)
+            if owner is None: continue
+            old_text = getattr(owner, field)
+            self.edits.append((kind, owner, field, old_text, rename_references(old_text, self.old_name, new_name)))
+
+    def affected(self, kind):
+        return [(owner, field) for k, owner, field, _, _ in self.edits if k == kind]
+
+    def _apply(self, forward):
+        self.var.name = self.new_name if forward else self.old_name
+        for kind, owner, field, old_text, new_text in self.edits:
+            current = getattr(owner, field)
+            if forward: text = new_text if current == old_text else rename_references(current, self.old_name, self.new_name)
+            # 명령 이후에 필드가 다시 편집되었다면 그 편집은 유지하고 참조만 되돌립니다.
+            else: text = old_text if current == new_text else rename_references(current, self.new_name, self.old_name)
+            setattr(owner, field, text); self.index.update_field(kind, owner.id, field, text)
+        self.on_applied(self)
+
+    def redo(self): self._apply(True)
+
+    def undo(self): self._apply(False)
+
+class FindUsagesDialog(QDialog):
+    """변수의 사용처 목록을 보여줍니다. 항목을 더블클릭하면 해당 태스크/변수로 이동합니다."""
+    navigate_requested = Signal(str, str)
+    rename_requested = Signal(str)
+
+    def __init__(self, var, usages, variables, tasks, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"'{var.name}' 사용처")
+        self.setMinimumSize(450, 350)
+        self.var_id = var.id
+
+        self.list_widget = QListWidget()
+        for kind, owner_id, field in usages:
+            owner = tasks.get(owner_id) if kind == 'task' else variables.get(owner_id)
+            if owner is None: continue
+            kind_label = "태스크" if kind == 'task' else "변수"
+            item = QListWidgetItem(f"[{kind_label}] {owner.name} — {FIELD_LABELS.get(field, field)}")
+            item.setData(Qt.UserRole, (kind, owner_id)); self.list_widget.addItem(item)
+        self.rename_btn = QPushButton("참조 포함 이름 바꾸기..."); self.close_btn = QPushButton("닫기")
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.rename_btn); button_layout.addStretch(); button_layout.addWidget(self.close_btn)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"{{{var.name}}}을(를) 참조하는 곳: {self.list_widget.count()}개"))
+        layout.addWidget(self.list_widget); layout.addLayout(button_layout)
+
+        self.list_widget.itemDoubleClicked.connect(self.on_item_double_clicked)
+        self.rename_btn.clicked.connect(lambda: (self.rename_requested.emit(self.var_id), self.accept()))
+        self.close_btn.clicked.connect(self.accept)
+
+    @Slot(QListWidgetItem)
+    def on_item_double_clicked(self, item):
+        kind, owner_id = item.data(Qt.UserRole)
+        self.navigate_requested.emit(kind, owner_id)
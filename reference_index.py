@@ -0,0 +1,67 @@
+# reference_index.py
+
+import re
+
+VAR_PATTERN = re.compile(r"\{([^}]+)\}")
+
+TASK_FIELDS = ('name', 'prompt', 'output_template')
+VARIABLE_FIELDS = ('value',)
+
+def referenced_names(text):
+    return set(VAR_PATTERN.findall(text or ""))
+
+def rename_references(text, old_name, new_name):
+    """text 안의 {old_name} 참조만 {new_name}으로 바꿉니다. 다른 이름의 참조는 건드리지 않습니다."""
+    if not text: return text
+    return text.replace("{" + old_name + "}", "{" + new_name + "}")
+
+class VariableReferenceIndex:
+    """변수 이름 → 그 변수를 참조하는 (종류, 소유자 id, 필드) 위치 집합의 역색인입니다.
+
+    종류는 'task' 또는 'variable'입니다. 편집된 필드만 다시 색인하므로 태스크 수와 무관하게 갱신 비용이 작습니다.
+    """
+    def __init__(self):
+        self._postings = {}; self._forward = {}
+
+    def clear(self): self._postings.clear(); self._forward.clear()
+
+    def update_field(self, kind, owner_id, field, text):
+        key = (kind, owner_id, field); new_names = referenced_names(text)
+        old_names = self._forward.get(key, set())
+        if new_names == old_names: return
+        for name in old_names - new_names:
+            locations = self._postings.get(name)
+            if locations is not None:
+                locations.discard(key)
+                if not locations: del self._postings[name]
+        for name in new_names - old_names: self._postings.setdefault(name, set()).add(key)
+        if new_names: self._forward[key] = new_names
+        else: self._forward.pop(key, None)
+
+    def index_task(self, task):
+        for field in TASK_FIELDS: self.update_field('task', task.id, field, getattr(task, field))
+
+    def index_variable(self, var):
+        for field in VARIABLE_FIELDS: self.update_field('variable', var.id, field, getattr(var, field))
+
+    def remove_owner(self, kind, owner_id):
+        fields = TASK_FIELDS if kind == 'task' else VARIABLE_FIELDS
+        for field in fields: self.update_field(kind, owner_id, field, "")
+
+    def rebuild(self, variables, tasks):
+        self.clear()
+        for var in variables.values(): self.index_variable(var)
+        for task in tasks.values(): self.index_task(task)
+
+    def usages(self, name):
+        """name을 참조하는 위치를 (종류, 소유자 id, 필드) 목록으로 반환합니다."""
+        return sorted(self._postings.get(name, ()))
+
+    def references_of(self, kind, owner_id):
+        """소유자가 참조하는 변수 이름 집합을 반환합니다."""
+        fields = TASK_FIELDS if kind == 'task' else VARIABLE_FIELDS
+        names = set()
+        for field in fields: names |= self._forward.get((kind, owner_id, field), set())
+        return names
+
+    def names(self): return set(self._postings)
@@ -0,0 +1,250 @@
+# request_engine.py
+
+import hashlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+
+POLL_INTERVAL = 0.1
+
+class RequestCancelled(Exception):
+    """사용자 중지나 hedge 패배 등으로 요청이 취소되었습니다. 받은 부분 응답은 partial_text에 담깁니다."""
+    def __init__(self, message="요청이 취소되었습니다.", partial_text=""):
+        super().__init__(message); self.partial_text = partial_text
+
+class RequestTimeout(RequestCancelled):
+    """요청이 제한 시간(deadline)을 넘겨 취소되었습니다."""
+
+class CancelToken:
+    """요청 취소 신호와 제한 시간을 전달합니다. 부모 토큰이 취소되면 자식 토큰도 취소된 것으로 봅니다.
+
+    요청이 끝나면 release()로 부모에서 떼어 내야 실행 내내 살아 있는 부모 토큰에 자식과 부분 응답이 쌓이지 않습니다.
+    """
+    def __init__(self, parent=None, timeout=None):
+        self.parent = parent; self.deadline = time.monotonic() + timeout if timeout else None
+        self._event = threading.Event(); self._reason = None; self._partial = []; self._children = []
+        self._lock = threading.Lock(); self._released = False
+        if parent is not None:
+            with parent._lock: parent._children.append(self)
+
+    def cancel(self, reason='cancelled'):
+        if not self._event.is_set(): self._reason = reason; self._event.set()
+
+    def reason(self):
+        if self._event.is_set(): return self._reason
+        if self.deadline is not None and time.monotonic() >= self.deadline: return 'deadline'
+        return self.parent.reason() if self.parent is not None else None
+
+    def is_cancelled(self): return self.reason() is not None
+
+    def error(self):
+        if self.reason() == 'deadline': return RequestTimeout("요청 제한 시간을 초과했습니다.", self.partial_text())
+        return RequestCancelled("요청이 취소되었습니다.", self.partial_text())
+
+    def add_partial(self, text):
+        if not self._released: self._partial.append(text) # 버려진 요청이 계속 받는 조각은 모으지 않습니다.
+
+    def partial_text(self):
+        """이 토큰과 자식 토큰(hedge 등)이 받은 부분 응답 중 가장 긴 것을 반환합니다."""
+        with self._lock: children = list(self._children)
+        return max(["".join(self._partial)] + [child.partial_text() for child in children], key=len)
+
+    def release(self):
+        """요청이 끝났을 때 부르면 부모 토큰에서 떼어 내고 받은 부분 응답을 버립니다. (취소 예외는 부분 응답을 이미 담고 있습니다)"""
+        self._released = True; self._partial = []
+        if self.parent is None: return
+        with self.parent._lock:
+            if self in self.parent._children: self.parent._children.remove(self)
+
+def wait_future(future, token=None, poll_interval=POLL_INTERVAL):
+    """future의 결과를 기다리되, token이 취소되거나 제한 시간을 넘기면 즉시 예외를 발생시킵니다."""
+    while True:
+        if token is not None and token.is_cancelled(): raise token.error()
+        try: return future.result(timeout=poll_interval)
+        except FutureTimeoutError: continue
+
+class StreamedResponse:
+    """스트리밍 응답 조각을 모은 결과입니다. generate_content의 응답처럼 .text를 제공합니다."""
+    def __init__(self):
+        self._chunks = []; self.usage_metadata = None; self._text_error = None; self.finish_reason = None
+
+    def add_chunk(self, chunk):
+        try: text = chunk.text
+        except ValueError as e: text = ""; self._text_error = e
+        if text: self._chunks.append(text)
+        usage = getattr(chunk, 'usage_metadata', None)
+        if usage is not None: self.usage_metadata = usage
+        candidates = getattr(chunk, 'candidates', None)
+        reason = getattr(candidates[0], 'finish_reason', None) if candidates else None
+        if reason: self.finish_reason = getattr(reason, 'name', str(reason)) # 'STOP', 'MAX_TOKENS' 등
+        return text
+
+    @property
+    def text(self):
+        # 텍스트가 전혀 없는 응답(안전 필터 차단 등)은 기존 response.text와 같이 오류를 발생시킵니다.
+        if not self._chunks and self._text_error is not None: raise self._text_error
+        return "".join(self._chunks)
+
+def usage_to_dict(usage):
+    """응답의 usage_metadata를 토큰 수 딕셔너리로 변환합니다. 값이 없으면 None을 반환합니다."""
+    if usage is None: return None
+    return {'prompt': getattr(usage, 'prompt_token_count', 0), 'candidates': getattr(usage, 'candidates_token_count', 0),
+            'cached': getattr(usage, 'cached_content_token_count', 0), 'total': getattr(usage, 'total_token_count', 0)}
+
+def stream_generate(model, prompt, token=None, **kwargs):
+    """generate_content를 스트리밍으로 호출하고 조각 사이마다 취소 여부를 확인합니다."""
+    response = StreamedResponse()
+    for chunk in model.generate_content(prompt, stream=True, **kwargs):
+        if token is not None and token.is_cancelled(): raise token.error()
+        text = response.add_chunk(chunk)
+        if token is not None and text: token.add_partial(text)
+    return response
+
+def submit_detached(fn, *args, **kwargs):
+    """fn을 데몬 스레드에서 실행하고 Future를 반환합니다.
+
+    ThreadPoolExecutor와 달리 응답이 오지 않는 요청을 버려도 프로그램 종료를 막지 않습니다.
+    """
+    future = Future()
+    def runner():
+        if not future.set_running_or_notify_cancel(): return
+        try: future.set_result(fn(*args, **kwargs))
+        except BaseException as e: future.set_exception(e)
+    threading.Thread(target=runner, name="RequestWorker", daemon=True).start()
+    return future
+
+class LatencyTracker:
+    """실행 중 관측한 요청 지연 시간(초)을 보관하고 백분위 값을 계산합니다."""
+    def __init__(self, max_samples=500):
+        self._samples = deque(maxlen=max_samples); self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock: self._samples.append(seconds)
+
+    def count(self):
+        with self._lock: return len(self._samples)
+
+    def percentile(self, p):
+        with self._lock: samples = sorted(self._samples)
+        if not samples: return None
+        k = (len(samples) - 1) * (p / 100.0); lo = int(k); hi = min(lo + 1, len(samples) - 1)
+        return samples[lo] + (samples[hi] - samples[lo]) * (k - lo)
+
+class HedgePolicy:
+    """지연 백분위를 넘긴 요청에 대해 중복 요청(hedge)을 보내는 정책입니다."""
+    def __init__(self, enabled=False, percentile=95, min_samples=5, budget_ratio=0.1, max_hedges=0,
+                 secondary_model="", secondary_location=""):
+        self.enabled = enabled; self.percentile = percentile; self.min_samples = min_samples
+        self.budget_ratio = budget_ratio; self.max_hedges = max_hedges
+        self.secondary_model = secondary_model; self.secondary_location = secondary_location
+
+    def to_dict(self):
+        return {'enabled': self.enabled, 'percentile': self.percentile, 'min_samples': self.min_samples,
+                'budget_ratio': self.budget_ratio, 'max_hedges': self.max_hedges,
+                'secondary_model': self.secondary_model, 'secondary_location': self.secondary_location}
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(enabled=data.get('enabled', False), percentile=data.get('percentile', 95),
+                   min_samples=data.get('min_samples', 5), budget_ratio=data.get('budget_ratio', 0.1),
+                   max_hedges=data.get('max_hedges', 0), secondary_model=data.get('secondary_model', ''),
+                   secondary_location=data.get('secondary_location', ''))
+
+class HedgedCaller:
+    """요청을 실행하고, 정책에 따라 지연된 요청에 hedge 요청을 추가로 보냅니다.
+
+    call()은 (결과, hedge 여부, 승자) 튜플을 반환합니다. 승자는 'primary' 또는 'hedge'입니다.
+    먼저 성공한 응답을 사용하고 나머지 요청은 취소(또는 결과 폐기)합니다.
+    """
+    def __init__(self, policy, tracker=None):
+        self.policy = policy; self.tracker = tracker or LatencyTracker()
+        self._lock = threading.Lock(); self.requests_started = 0; self.hedges_issued = 0; self.hedge_wins = 0
+
+    def hedge_delay(self):
+        if not self.policy.enabled or self.tracker.count() < self.policy.min_samples: return None
+        return self.tracker.percentile(self.policy.percentile)
+
+    def _acquire_budget(self):
+        with self._lock:
+            if self.policy.max_hedges and self.hedges_issued >= self.policy.max_hedges: return False
+            if self.hedges_issued + 1 > self.policy.budget_ratio * self.requests_started: return False
+            self.hedges_issued += 1; return True
+
+    def call(self, primary_fn, hedge_fn=None, token=None):
+        """primary_fn/hedge_fn은 CancelToken 하나를 인자로 받습니다. token이 취소되면 두 요청 모두 취소됩니다."""
+        with self._lock: self.requests_started += 1
+        start = time.monotonic(); primary_token = CancelToken(token); hedge_token = None
+        try:
+            primary = submit_detached(primary_fn, primary_token)
+            delay = self.hedge_delay() if hedge_fn else None
+            if delay is not None:
+                done, _ = self._wait_any([primary], time.monotonic() + delay, token)
+                if not done and self._acquire_budget():
+                    hedge_token = CancelToken(token)
+                    hedge = submit_detached(hedge_fn, hedge_token)
+                    result, winner = self._first_success({primary: ('primary', primary_token), hedge: ('hedge', hedge_token)}, token)
+                    self.tracker.record(time.monotonic() - start)
+                    if winner == 'hedge':
+                        with self._lock: self.hedge_wins += 1
+                    return result, True, winner
+            result = wait_future(primary, token); self.tracker.record(time.monotonic() - start)
+            return result, False, 'primary'
+        finally:
+            primary_token.release()
+            if hedge_token: hedge_token.release()
+
+    @staticmethod
+    def _wait_any(futures, until, token):
+        while True:
+            if token is not None and token.is_cancelled(): raise token.error()
+            remaining = until - time.monotonic() if until is not None else POLL_INTERVAL
+            if remaining <= 0: return set(), set(futures)
+            done, pending = wait(futures, timeout=min(POLL_INTERVAL, remaining), return_when=FIRST_COMPLETED)
+            if done: return done, pending
+
+    def _first_success(self, pending, token):
+        first_error = None
+        while pending:
+            done, _ = self._wait_any(list(pending), None, token)
+            for future in done:
+                label, _ = pending.pop(future)
+                if future.exception() is None:
+                    # 진 요청은 취소 토큰으로 스트리밍을 중단시킵니다.
+                    for loser, (_, loser_token) in pending.items(): loser_token.cancel('hedge_lost'); loser.cancel()
+                    return future.result(), label
+                if first_error is None: first_error = future.exception()
+        raise first_error
+
+class RequestCoalescer:
+    """한 실행 안에서 (모델, 캐시, 프롬프트)가 같은 요청을 하나로 합칩니다.
+
+    먼저 도착한 요청만 실제로 실행되고, 같은 키로 들어온 나머지 요청은 그 결과를 기다려 공유합니다.
+    성공한 결과는 실행이 끝날 때까지 보관하여 뒤늦게 도착한 같은 요청에도 재사용합니다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock(); self._futures = {}; self.calls_saved = 0
+
+    @staticmethod
+    def make_key(model_name, cached_content_name, prompt):
+        return (model_name or "", cached_content_name or "", hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+
+    def call(self, key, fn, token=None):
+        """(결과, 공유 여부)를 반환합니다. 공유된 결과는 다른 태스크의 요청으로 받은 것입니다."""
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None
+            if leader: future = self._futures[key] = Future()
+        if not leader:
+            result = wait_future(future, token)
+            with self._lock: self.calls_saved += 1
+            return result, True
+        try:
+            result = fn()
+        except BaseException as e:
+            # 실패한 요청은 보관하지 않아 이후의 같은 요청이 다시 시도할 수 있게 합니다.
+            with self._lock: self._futures.pop(key, None)
+            future.set_exception(e); raise
+        future.set_result(result)
+        return result, False
@@ -0,0 +1,96 @@
+# run_log.py
+
+import os
+import gzip
+import json
+import shutil
+import threading
+from datetime import datetime
+
+ACTIVE_SEGMENT = "runlog.jsonl"
+SEGMENT_PREFIX = "runlog-"
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+
+_folder_locks = {}; _folder_locks_guard = threading.Lock()
+
+def _lock_for(folder):
+    # 같은 폴더에 여러 실행이 동시에 기록해도 회전(rotate)이 한 번만 일어나도록 폴더별 잠금을 공유합니다.
+    with _folder_locks_guard: return _folder_locks.setdefault(os.path.abspath(folder), threading.Lock())
+
+def _compress_segment(path):
+    try:
+        with open(path, 'rb') as src, gzip.open(path + ".gz", 'wb') as dst: shutil.copyfileobj(src, dst)
+        os.remove(path)
+    except OSError:
+        # 압축에 실패하면 압축하지 않은 세그먼트를 그대로 둡니다.
+        try: os.remove(path + ".gz")
+        except OSError: pass
+
+class RunLogWriter:
+    """실행 이벤트를 한 줄에 JSON 객체 하나씩(JSONL) 기록합니다.
+
+    활성 세그먼트(runlog.jsonl)가 max_bytes를 넘으면 runlog-<시각>.jsonl로 넘기고 gzip으로 압축합니다.
+    모든 이벤트에는 ts, run_id, event가 들어가며 task_id, latency, tokens 등은 있을 때만 기록됩니다.
+    """
+    def __init__(self, folder, run_id, max_bytes=DEFAULT_MAX_BYTES, compress=True):
+        self.folder = folder; self.run_id = run_id; self.max_bytes = max_bytes; self.compress = compress
+        self.path = os.path.join(folder, ACTIVE_SEGMENT); self._lock = _lock_for(folder)
+        os.makedirs(folder, exist_ok=True)
+
+    def write(self, event, task_id=None, **fields):
+        record = {'ts': datetime.now().astimezone().isoformat(timespec='milliseconds'), 'run_id': self.run_id, 'event': event}
+        if task_id: record['task_id'] = task_id
+        record.update({k: v for k, v in fields.items() if v is not None})
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f: f.write(line)
+            if os.path.getsize(self.path) >= self.max_bytes: self._rotate()
+
+    def _rotate(self):
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        rotated = os.path.join(self.folder, f"{SEGMENT_PREFIX}{stamp}.jsonl")
+        os.replace(self.path, rotated)
+        if self.compress: threading.Thread(target=_compress_segment, args=(rotated,), daemon=True).start()
+
+def list_segments(folder):
+    """오래된 세그먼트부터 활성 세그먼트까지 시간 순서대로 경로 목록을 반환합니다."""
+    if not os.path.isdir(folder): return []
+    rotated = {}
+    for name in os.listdir(folder):
+        if not name.startswith(SEGMENT_PREFIX): continue
+        # 압축 중이라 .jsonl과 .jsonl.gz가 함께 있으면 완성된 원본(.jsonl)을 읽습니다.
+        base = name[:-3] if name.endswith(".jsonl.gz") else name if name.endswith(".jsonl") else None
+        if base and (base not in rotated or name == base): rotated[base] = name
+    segments = [os.path.join(folder, rotated[base]) for base in sorted(rotated)]
+    active = os.path.join(folder, ACTIVE_SEGMENT)
+    if os.path.exists(active): segments.append(active)
+    return segments
+
+def _open_segment(path):
+    return gzip.open(path, 'rt', encoding='utf-8') if path.endswith(".gz") else open(path, 'r', encoding='utf-8')
+
+def iter_events(folder, run_id=None, task_id=None, events=None):
+    """세그먼트를 한 줄씩 읽으며 조건에 맞는 이벤트만 돌려줍니다. 파일 전체를 메모리에 올리지 않습니다.
+
+    JSON 파싱 전에 문자열 포함 여부로 먼저 걸러 대부분의 줄은 파싱하지 않습니다.
+    """
+    run_marker = f'"run_id": {json.dumps(run_id, ensure_ascii=False)}' if run_id else None
+    task_marker = f'"task_id": {json.dumps(task_id, ensure_ascii=False)}' if task_id else None
+    events = set(events) if events else None
+    for path in list_segments(folder):
+        try: f = _open_segment(path)
+        except OSError: continue
+        with f:
+            for line in f:
+                if run_marker and run_marker not in line: continue
+                if task_marker and task_marker not in line: continue
+                try: record = json.loads(line)
+                except ValueError: continue
+                if run_id and record.get('run_id') != run_id: continue
+                if task_id and record.get('task_id') != task_id: continue
+                if events and record.get('event') not in events: continue
+                yield record
+
+def list_runs(folder):
+    """기록된 실행 목록을 [(run_id, 시작 시각)] 형태로 시작 순서대로 반환합니다."""
+    return [(record['run_id'], record['ts']) for record in iter_events(folder, events={'run_started'})]
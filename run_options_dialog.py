@@ -0,0 +1,163 @@
+# run_options_dialog.py
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QGroupBox, QCheckBox, QLabel,
+                             QSpinBox, QDoubleSpinBox, QComboBox, QLineEdit, QPlainTextEdit, QDialogButtonBox)
+
+from request_engine import HedgePolicy
+from output_sinks import SINK_KINDS, SINK_LABELS, DEFAULT_CONTAINER_NAME
+from semantic_cache import DEFAULT_THRESHOLD, DEFAULT_CAPACITY
+from data_models import GenerationSettings
+from ui_components import GenerationSettingsWidget
+
+class RunOptionsDialog(QDialog):
+    """프로젝트에 저장되는 고급 실행 옵션(settings['run_options'])을 편집합니다."""
+    def __init__(self, run_options, supported_models, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("실행 옵션")
+        self.setMinimumWidth(450)
+        self.run_options = dict(run_options or {})
+
+        # 엔드포인트 / 동시 실행
+        self.concurrency_spin = QSpinBox(); self.concurrency_spin.setRange(1, 64)
+        self.concurrency_spin.setValue(int(self.run_options.get('max_concurrency', 1)))
+        self.endpoints_edit = QPlainTextEdit("\n".join(self.run_options.get('endpoints', [])))
+        self.endpoints_edit.setPlaceholderText("한 줄에 하나씩 project:location\n(비워두면 .env의 VERTEX_ENDPOINTS 또는 PROJECT_ID/LOCATION 사용)")
+        self.endpoints_edit.setMaximumHeight(90)
+        self.coalesce_check = QCheckBox("같은 프롬프트의 요청은 한 번만 보내고 결과 공유")
+        self.coalesce_check.setChecked(self.run_options.get('coalesce_requests', True))
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItem("별도 작업 프로세스 (GUI 응답성 유지, 충돌 격리)", 'process')
+        self.backend_combo.addItem("GUI 프로세스 안의 스레드", 'thread')
+        index = self.backend_combo.findData(self.run_options.get('execution_backend', 'process'))
+        self.backend_combo.setCurrentIndex(index if index != -1 else 0)
+
+        endpoint_group = QGroupBox("엔드포인트 및 동시 실행"); endpoint_form = QFormLayout(endpoint_group)
+        endpoint_form.addRow("실행 방식:", self.backend_combo)
+        endpoint_form.addRow("동시 실행 태스크 수:", self.concurrency_spin)
+        endpoint_form.addRow("엔드포인트:", self.endpoints_edit)
+        endpoint_form.addRow(self.coalesce_check)
+
+        # 취소 및 제한 시간
+        self.request_timeout_spin = QSpinBox(); self.request_timeout_spin.setRange(0, 24 * 60 * 60)
+        self.request_timeout_spin.setSuffix(" 초"); self.request_timeout_spin.setSpecialValueText("제한 없음")
+        self.request_timeout_spin.setValue(int(self.run_options.get('request_timeout', 0)))
+        self.keep_partial_check = QCheckBox("취소/시간 초과된 요청의 부분 응답을 .partial 파일로 보관")
+        self.keep_partial_check.setChecked(self.run_options.get('keep_partial_outputs', False))
+
+        timeout_group = QGroupBox("취소 및 제한 시간"); timeout_form = QFormLayout(timeout_group)
+        timeout_form.addRow("요청 제한 시간 (전역):", self.request_timeout_spin)
+        timeout_form.addRow(self.keep_partial_check)
+
+        # 결과 저장
+        self.output_sink_combo = QComboBox()
+        for kind in SINK_KINDS: self.output_sink_combo.addItem(SINK_LABELS[kind], kind)
+        index = self.output_sink_combo.findData(self.run_options.get('output_sink', 'directory'))
+        self.output_sink_combo.setCurrentIndex(index if index != -1 else 0)
+        self.output_container_edit = QLineEdit(self.run_options.get('output_container', ""))
+        self.output_container_edit.setPlaceholderText(f"{DEFAULT_CONTAINER_NAME} (확장자는 형식에 맞게 붙습니다)")
+        self.output_sink_combo.currentIndexChanged.connect(
+            lambda: self.output_container_edit.setEnabled(self.output_sink_combo.currentData() != 'directory'))
+        self.output_container_edit.setEnabled(self.output_sink_combo.currentData() != 'directory')
+
+        output_group = QGroupBox("결과 저장"); output_form = QFormLayout(output_group)
+        output_form.addRow("저장 방식:", self.output_sink_combo)
+        output_form.addRow("컨테이너 파일 이름:", self.output_container_edit)
+
+        # 로그
+        self.log_format_combo = QComboBox()
+        self.log_format_combo.addItem("텍스트 (실행마다 log_<시각>.txt)", 'text')
+        self.log_format_combo.addItem("구조화 JSONL (크기별 회전 + gzip 압축)", 'jsonl')
+        index = self.log_format_combo.findData(self.run_options.get('log_format', 'text'))
+        self.log_format_combo.setCurrentIndex(index if index != -1 else 0)
+        self.log_max_mb_spin = QSpinBox(); self.log_max_mb_spin.setRange(1, 1024); self.log_max_mb_spin.setSuffix(" MB")
+        self.log_max_mb_spin.setValue(int(self.run_options.get('log_max_mb', 10)))
+
+        log_group = QGroupBox("로그 파일"); log_form = QFormLayout(log_group)
+        log_form.addRow("형식:", self.log_format_combo)
+        log_form.addRow("세그먼트 최대 크기:", self.log_max_mb_spin)
+
+        # Hedged 요청
+        hedge = HedgePolicy.from_dict(self.run_options.get('hedging'))
+        self.hedge_enabled_check = QCheckBox("느린 요청에 중복 요청(hedge) 보내기")
+        self.hedge_enabled_check.setChecked(hedge.enabled)
+        self.hedge_percentile_spin = QSpinBox(); self.hedge_percentile_spin.setRange(50, 99)
+        self.hedge_percentile_spin.setSuffix(" 백분위"); self.hedge_percentile_spin.setValue(int(hedge.percentile))
+        self.hedge_min_samples_spin = QSpinBox(); self.hedge_min_samples_spin.setRange(1, 1000)
+        self.hedge_min_samples_spin.setValue(int(hedge.min_samples))
+        self.hedge_budget_spin = QSpinBox(); self.hedge_budget_spin.setRange(1, 100); self.hedge_budget_spin.setSuffix(" %")
+        self.hedge_budget_spin.setValue(int(round(hedge.budget_ratio * 100)))
+        self.hedge_max_spin = QSpinBox(); self.hedge_max_spin.setRange(0, 100000); self.hedge_max_spin.setSpecialValueText("제한 없음")
+        self.hedge_max_spin.setValue(int(hedge.max_hedges))
+        self.hedge_model_combo = QComboBox(); self.hedge_model_combo.addItem("(같은 모델)", "")
+        for model_name in supported_models: self.hedge_model_combo.addItem(model_name, model_name)
+        index = self.hedge_model_combo.findData(hedge.secondary_model)
+        self.hedge_model_combo.setCurrentIndex(index if index != -1 else 0)
+        self.hedge_location_edit = QLineEdit(hedge.secondary_location); self.hedge_location_edit.setPlaceholderText("(같은 Location)")
+
+        hedge_group = QGroupBox("Hedged 요청 (꼬리 지연 단축)"); hedge_form = QFormLayout(hedge_group)
+        hedge_form.addRow(self.hedge_enabled_check)
+        hedge_form.addRow("발송 기준 지연:", self.hedge_percentile_spin)
+        hedge_form.addRow("최소 표본 수:", self.hedge_min_samples_spin)
+        hedge_form.addRow("추가 요청 예산:", self.hedge_budget_spin)
+        hedge_form.addRow("최대 hedge 횟수:", self.hedge_max_spin)
+        hedge_form.addRow("보조 모델:", self.hedge_model_combo)
+        hedge_form.addRow("보조 Location:", self.hedge_location_edit)
+
+        # 유사 응답 캐시
+        semantic = self.run_options.get('semantic_cache') or {}
+        self.semantic_enabled_check = QCheckBox("비슷한 프롬프트에는 이전 응답을 재사용 (API 호출 생략)")
+        self.semantic_enabled_check.setChecked(semantic.get('enabled', False))
+        self.semantic_threshold_spin = QDoubleSpinBox(); self.semantic_threshold_spin.setRange(0.5, 1.0)
+        self.semantic_threshold_spin.setDecimals(3); self.semantic_threshold_spin.setSingleStep(0.005)
+        self.semantic_threshold_spin.setValue(float(semantic.get('threshold', DEFAULT_THRESHOLD)))
+        self.semantic_capacity_spin = QSpinBox(); self.semantic_capacity_spin.setRange(10, 100000); self.semantic_capacity_spin.setSuffix(" 개")
+        self.semantic_capacity_spin.setValue(int(semantic.get('capacity', DEFAULT_CAPACITY)))
+
+        semantic_group = QGroupBox("유사 응답 캐시"); semantic_form = QFormLayout(semantic_group)
+        semantic_form.addRow(self.semantic_enabled_check)
+        semantic_form.addRow("유사도 기준 (전역):", self.semantic_threshold_spin)
+        semantic_form.addRow("최대 항목 수:", self.semantic_capacity_spin)
+        semantic_note = QLabel("변수로 넣은 값이 하나라도 다르면(날짜, 이름 등) 나머지가 같아도 재사용하지 않습니다. "
+                               "변수 값이 다르면 다른 답이 필요한 경우가 많기 때문입니다. 프롬프트 본문에 직접 쓴 작은 차이는 유사도 기준으로 판단합니다.")
+        semantic_note.setWordWrap(True); semantic_form.addRow(semantic_note)
+
+        # 생성 설정 (태스크에 지정하지 않은 항목의 기본값)
+        self.generation_group = GenerationSettingsWidget("생성 설정 (프로젝트 기본값)", "모델 기본값")
+        self.generation_group.set_settings(GenerationSettings.from_dict(self.run_options.get('generation')))
+
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+
+        main_layout = QVBoxLayout(self)
+        main_layout.addWidget(endpoint_group)
+        main_layout.addWidget(timeout_group)
+        main_layout.addWidget(output_group)
+        main_layout.addWidget(log_group)
+        main_layout.addWidget(hedge_group)
+        main_layout.addWidget(semantic_group)
+        main_layout.addWidget(self.generation_group)
+        main_layout.addWidget(button_box)
+
+    def get_options(self):
+        """편집된 실행 옵션을 딕셔너리 형태로 반환합니다."""
+        options = dict(self.run_options)
+        options['execution_backend'] = self.backend_combo.currentData()
+        options['max_concurrency'] = self.concurrency_spin.value()
+        options['coalesce_requests'] = self.coalesce_check.isChecked()
+        options['request_timeout'] = self.request_timeout_spin.value()
+        options['keep_partial_outputs'] = self.keep_partial_check.isChecked()
+        options['output_sink'] = self.output_sink_combo.currentData()
+        options['output_container'] = self.output_container_edit.text().strip()
+        options['log_format'] = self.log_format_combo.currentData()
+        options['log_max_mb'] = self.log_max_mb_spin.value()
+        options['semantic_cache'] = {'enabled': self.semantic_enabled_check.isChecked(), 'threshold': self.semantic_threshold_spin.value(),
+                                     'capacity': self.semantic_capacity_spin.value()}
+        options['generation'] = self.generation_group.settings().to_dict()
+        options['endpoints'] = [line.strip() for line in self.endpoints_edit.toPlainText().splitlines() if line.strip()]
+        options['hedging'] = HedgePolicy(
+            enabled=self.hedge_enabled_check.isChecked(), percentile=self.hedge_percentile_spin.value(),
+            min_samples=self.hedge_min_samples_spin.value(), budget_ratio=self.hedge_budget_spin.value() / 100.0,
+            max_hedges=self.hedge_max_spin.value(), secondary_model=self.hedge_model_combo.currentData() or "",
+            secondary_location=self.hedge_location_edit.text().strip()).to_dict()
+        return options
@@ -0,0 +1,106 @@
+# run_scheduler.py
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+PRIORITY_WEIGHTS = {'high': 4, 'normal': 2, 'low': 1}
+PRIORITY_LABELS = {'high': "높음", 'normal': "보통", 'low': "낮음"}
+DEFAULT_MAX_INFLIGHT = 16
+POLL_INTERVAL = 0.1
+
+class GlobalScheduler:
+    """여러 실행(run)이 보내는 API 요청을 하나의 예산으로 조율합니다.
+
+    - 속도 예산: 분당 요청 수(rpm) 토큰 버킷을 모든 실행이 나눠 씁니다. 0이면 제한하지 않습니다.
+    - 동시 요청 수: 모든 실행을 합쳐 max_inflight개까지만 요청을 보냅니다.
+    - 공정성: 기다리는 실행 중 (허락받은 요청 수 / 우선순위 가중치)가 가장 작은 실행에 먼저 허락합니다.
+      새로 시작하거나 한동안 쉬던 실행은 현재 가장 뒤처진 실행과 같은 위치에서 시작하여 몰아서 받지 않습니다.
+    """
+    def __init__(self, rpm=0, max_inflight=DEFAULT_MAX_INFLIGHT, burst=None):
+        self.rpm = max(0, rpm); self.max_inflight = max(1, max_inflight)
+        self.burst = burst or max(1, self.rpm // 6) # 약 10초 분량까지 몰아서 보낼 수 있습니다.
+        self._cond = threading.Condition(); self._runs = {}; self._order = 0
+        self._tokens = float(self.burst); self._refilled_at = time.monotonic(); self.inflight = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(rpm=int(os.getenv("SCHEDULER_RPM", "0") or 0), max_inflight=int(os.getenv("SCHEDULER_MAX_INFLIGHT", DEFAULT_MAX_INFLIGHT) or DEFAULT_MAX_INFLIGHT))
+
+    def describe(self):
+        rate = f"분당 {self.rpm}회" if self.rpm else "속도 제한 없음"
+        return f"{rate}, 동시 요청 최대 {self.max_inflight}개"
+
+    def _virtual_floor(self, exclude=None):
+        # self._cond를 잡고 호출합니다. 요청을 기다리거나 보내는 중인 실행들의 가장 작은 가상 시간입니다.
+        active = [run['served'] / run['weight'] for run_id, run in self._runs.items()
+                  if run_id != exclude and (run['waiting'] or run['inflight'])]
+        return min(active) if active else None
+
+    def register(self, run_id, priority='normal'):
+        with self._cond:
+            weight = PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS['normal']); self._order += 1
+            floor = self._virtual_floor()
+            self._runs[run_id] = {'weight': weight, 'served': (floor or 0.0) * weight, 'waiting': 0, 'inflight': 0, 'granted': 0, 'order': self._order}
+
+    def unregister(self, run_id):
+        with self._cond: self._runs.pop(run_id, None); self._cond.notify_all()
+
+    def set_priority(self, run_id, priority):
+        with self._cond:
+            run = self._runs.get(run_id)
+            if run is None: return
+            # 가상 시간(served / weight)을 유지한 채 가중치만 바꿉니다.
+            weight = PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS['normal'])
+            run['served'] = run['served'] / run['weight'] * weight; run['weight'] = weight; self._cond.notify_all()
+
+    def _refill(self, now):
+        if self.rpm: self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rpm / 60.0)
+        self._refilled_at = now
+
+    def _is_next(self, run_id):
+        waiting = [(run['served'] / run['weight'], run['order'], key) for key, run in self._runs.items() if run['waiting']]
+        return min(waiting)[2] == run_id
+
+    def acquire(self, run_id, token=None):
+        """이 실행이 요청을 하나 보내도 될 때까지 기다립니다. token이 취소되면 token.error()를 발생시킵니다."""
+        with self._cond:
+            run = self._runs.get(run_id)
+            if run is None: self.register(run_id); run = self._runs[run_id]
+            if not run['waiting'] and not run['inflight']:
+                floor = self._virtual_floor(exclude=run_id)
+                if floor is not None: run['served'] = max(run['served'], floor * run['weight'])
+            run['waiting'] += 1
+            try:
+                while True:
+                    if token is not None and token.is_cancelled(): raise token.error()
+                    now = time.monotonic(); self._refill(now); wait = POLL_INTERVAL
+                    if self.inflight < self.max_inflight and self._is_next(run_id):
+                        if not self.rpm or self._tokens >= 1: break
+                        wait = min(wait, (1 - self._tokens) * 60.0 / self.rpm)
+                    self._cond.wait(wait)
+                if self.rpm: self._tokens -= 1
+                self.inflight += 1; run['inflight'] += 1; run['served'] += 1; run['granted'] += 1
+            finally: run['waiting'] -= 1
+            self._cond.notify_all() # 다음 순서의 실행이 바로 확인할 수 있게 합니다.
+
+    def release(self, run_id):
+        with self._cond:
+            self.inflight -= 1
+            run = self._runs.get(run_id)
+            if run: run['inflight'] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, run_id, token=None):
+        self.acquire(run_id, token)
+        try: yield
+        finally: self.release(run_id)
+
+    def stats(self, run_id=None):
+        with self._cond:
+            if run_id is not None:
+                run = self._runs.get(run_id)
+                return {'granted': run['granted'], 'waiting': run['waiting'], 'inflight': run['inflight']} if run else None
+            return {'runs': len(self._runs), 'inflight': self.inflight, 'waiting': sum(run['waiting'] for run in self._runs.values())}
@@ -0,0 +1,115 @@
+# semantic_cache.py
+
+import re
+import time
+import zlib
+import threading
+
+import numpy as np
+
+DEFAULT_DIM = 2048
+DEFAULT_CAPACITY = 1000
+DEFAULT_THRESHOLD = 0.99
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+class HashedNgramEmbedder:
+    """외부 모델 없이 단어(1~2-gram)와 글자 n-gram을 해시하여 고정 길이 벡터로 만드는 가벼운 임베더입니다.
+
+    공백/대소문자 차이는 정규화로 없애고, 날짜나 단어 몇 개만 다른 프롬프트는 대부분의 n-gram을 공유하므로
+    코사인 유사도가 1에 가깝게 나옵니다. 해시는 zlib.crc32를 사용하여 실행할 때마다 같은 벡터가 나옵니다.
+    (TaskRunner는 변수 값을 범위에 넣으므로 이 근사 일치는 프롬프트 본문에 직접 쓴 차이에만 적용됩니다)
+    """
+    def __init__(self, dim=DEFAULT_DIM, char_ngram=4):
+        self.dim = dim; self.char_ngram = char_ngram
+
+    @staticmethod
+    def normalize(text):
+        return _WHITESPACE.sub(" ", text or "").strip().lower()
+
+    def _features(self, text):
+        words = _WORD.findall(text); n = self.char_ngram
+        yield from words
+        yield from (f"{a} {b}" for a, b in zip(words, words[1:]))
+        yield from (f"#{text[i:i + n]}" for i in range(max(1, len(text) - n + 1)))
+
+    def embed(self, text):
+        text = self.normalize(text)
+        hashes = np.fromiter((zlib.crc32(feature.encode('utf-8')) for feature in self._features(text)), dtype=np.uint32)
+        # 해시 값의 최상위 비트를 부호로 써서 서로 다른 특징이 같은 칸에 모여도 값이 상쇄되도록 합니다.
+        signs = np.where(hashes >> 31, -1.0, 1.0)
+        vector = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_batch(self, texts):
+        if not texts: return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed(text) for text in texts])
+
+class SemanticResponseCache:
+    """정규화된 프롬프트 벡터 → 응답 텍스트를 보관하는 유사 응답 캐시입니다.
+
+    벡터는 (capacity × dim) NumPy 행렬 하나에 담고, 조회는 행렬 곱 한 번으로 여러 프롬프트의 코사인 유사도를 계산합니다.
+    항목은 범위(모델, 캐시, 생성 설정, 변수 값 등 호출하는 쪽이 정한 키)별로 구분되며, 가득 차면 가장 오래 사용하지 않은 항목을 내보냅니다.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY, embedder=None):
+        self.capacity = max(1, int(capacity)); self.embedder = embedder or HashedNgramEmbedder()
+        self._vectors = np.zeros((self.capacity, self.embedder.dim), dtype=np.float32)
+        self._scope_ids = np.full(self.capacity, -1, dtype=np.int32) # -1은 빈 칸
+        self._last_used = np.zeros(self.capacity, dtype=np.float64)
+        self._entries = [None] * self.capacity; self._scopes = {}; self._next_scope_id = 0; self._lock = threading.Lock()
+        self.lookups = 0; self.hits = 0; self.evictions = 0
+
+    def __len__(self): return int(np.count_nonzero(self._scope_ids >= 0))
+
+    def _scope_id(self, scope):
+        scope_id = self._scopes.get(scope)
+        if scope_id is None: scope_id = self._scopes[scope] = self._next_scope_id; self._next_scope_id += 1
+        return scope_id
+
+    def embed(self, text): return self.embedder.embed(text)
+
+    def lookup_batch(self, vectors, thresholds, scope, count=True):
+        """각 벡터에 대해 임계값 이상인 가장 비슷한 항목을 찾아 [(응답 텍스트, 유사도) | None] 목록을 반환합니다.
+
+        같은 프롬프트를 다시 찾아보는 경우 count=False로 하면 조회 수에 더하지 않습니다. (적중은 항상 셉니다)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(vectors): return []
+        with self._lock:
+            if count: self.lookups += len(vectors)
+            scope_id = self._scopes.get(scope)
+            if scope_id is None: return [None] * len(vectors)
+            rows = np.flatnonzero(self._scope_ids == scope_id)
+            if not len(rows): return [None] * len(vectors)
+            similarities = vectors @ self._vectors[rows].T # 벡터는 모두 정규화되어 있으므로 내적이 곧 코사인 유사도
+            best = similarities.argmax(axis=1); best_scores = similarities[np.arange(len(vectors)), best]
+            results = []; now = time.monotonic()
+            for score, column, threshold in zip(best_scores, best, thresholds):
+                if score < threshold: results.append(None); continue
+                row = rows[column]; self._last_used[row] = now; self.hits += 1
+                results.append((self._entries[row]['response'], float(score)))
+            return results
+
+    def lookup(self, vector, threshold, scope, count=True):
+        return self.lookup_batch(vector[None, :], [threshold], scope, count)[0]
+
+    def add(self, vector, response_text, scope, task_name=None):
+        with self._lock:
+            empty = np.flatnonzero(self._scope_ids < 0)
+            if len(empty): row = int(empty[0])
+            else: row = int(self._last_used.argmin()); self.evictions += 1
+            old_scope_id = self._scope_ids[row]
+            self._vectors[row] = vector; self._scope_ids[row] = self._scope_id(scope); self._last_used[row] = time.monotonic()
+            if old_scope_id >= 0 and not np.any(self._scope_ids == old_scope_id):
+                # 항목이 하나도 남지 않은 범위는 지워서 범위 목록이 (변수 값마다 생기는 범위로) 끝없이 늘지 않게 합니다.
+                self._scopes = {key: value for key, value in self._scopes.items() if value != old_scope_id}
+            self._entries[row] = {'response': response_text, 'task': task_name}
+
+    def clear(self):
+        with self._lock:
+            self._scope_ids.fill(-1); self._entries = [None] * self.capacity; self._scopes.clear()
+
+    def stats(self):
+        return {'entries': len(self), 'capacity': self.capacity, 'lookups': self.lookups, 'hits': self.hits,
+                'evictions': self.evictions, 'hit_rate': self.hits / self.lookups if self.lookups else 0.0}
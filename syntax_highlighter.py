@@ -1,9 +1,11 @@
 # syntax_highlighter.py
 
-from PySide6.QtCore import QRegularExpression, Qt
-from PySide6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont
+from PySide6.QtCore import QRegularExpression, Qt, QObject, QTimer, Signal
+from PySide6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont, QTextLayout
 
 class VariableSyntaxHighlighter(QSyntaxHighlighter):
+    valid_variables_changed = Signal()
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self._valid_variables = set()
@@ -20,16 +22,62 @@ class VariableSyntaxHighlighter(QSyntaxHighlighter):
 
     def set_valid_variables(self, var_set):
         self._valid_variables = var_set
-        self.rehighlight()
+        # 큰 문서 모드에서는 문서와 분리되어 있으므로 전체를 다시 칠하지 않고 화면에 보이는 부분만 다시 칠합니다.
+        if self.document() is not None: self.rehighlight()
+        self.valid_variables_changed.emit()
 
-    def highlightBlock(self, text):
+    def spans(self, text):
+        """text에서 변수 참조의 (시작, 길이, 형식) 목록을 반환합니다."""
         # *** 수정됨: globalIterator -> globalMatch ***
-        iterator = self.pattern.globalMatch(text)
+        iterator = self.pattern.globalMatch(text); spans = []
         while iterator.hasNext():
             match = iterator.next()
-            var_name = match.captured(1)
-            
-            if var_name in self._valid_variables:
-                self.setFormat(match.capturedStart(), match.capturedLength(), self.valid_format)
-            else:
-                self.setFormat(match.capturedStart(), match.capturedLength(), self.invalid_format)
\ No newline at end of file
+            var_format = self.valid_format if match.captured(1) in self._valid_variables else self.invalid_format
+            spans.append((match.capturedStart(), match.capturedLength(), var_format))
+        return spans
+
+    def highlightBlock(self, text):
+        for start, length, var_format in self.spans(text): self.setFormat(start, length, var_format)
+
+class ViewportHighlighter(QObject):
+    """큰 문서 모드에서 화면에 보이는 블록만 필요할 때 칠합니다.
+
+    형식은 문서가 아니라 블록 레이아웃(QTextLayout.setFormats)에 적용하므로 문서 내용이나 실행 취소 기록이 바뀌지 않습니다.
+    editor는 visible_blocks()를 제공해야 합니다. (CompleterTextEdit)
+    """
+    def __init__(self, editor, highlighter):
+        super().__init__(editor)
+        self.editor = editor; self.highlighter = highlighter; self.enabled = False
+        self._done = set(); self._applying = False # _done: 이번 내용/변수 목록 기준으로 칠한 블록 번호
+        self._timer = QTimer(self); self._timer.setSingleShot(True); self._timer.setInterval(0); self._timer.timeout.connect(self.highlight_visible)
+        editor.verticalScrollBar().valueChanged.connect(self.schedule)
+        editor.document().contentsChange.connect(self._on_contents_change)
+        highlighter.valid_variables_changed.connect(self.invalidate)
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled; self._done.clear()
+        if enabled: self.schedule()
+
+    def schedule(self):
+        if self.enabled: self._timer.start()
+
+    def invalidate(self):
+        self._done.clear(); self.schedule()
+
+    def _on_contents_change(self, position, removed, added):
+        # 블록 번호가 밀릴 수 있으므로 다시 칠할 범위를 따지지 않고 보이는 블록을 모두 다시 칠합니다. (수십 개 수준)
+        if not self._applying: self.invalidate()
+
+    def highlight_visible(self):
+        if not self.enabled: return
+        document = self.editor.document(); self._applying = True
+        try:
+            for block in self.editor.visible_blocks():
+                if block.blockNumber() in self._done: continue
+                ranges = []
+                for start, length, var_format in self.highlighter.spans(block.text()):
+                    format_range = QTextLayout.FormatRange(); format_range.start = start; format_range.length = length; format_range.format = var_format
+                    ranges.append(format_range)
+                block.layout().setFormats(ranges); document.markContentsDirty(block.position(), block.length())
+                self._done.add(block.blockNumber())
+        finally: self._applying = False
@@ -3,15 +3,15 @@
 from PySide6.QtCore import QObject, Signal, Slot, Qt
 from PySide6.QtWidgets import QListWidgetItem, QMessageBox
 
-from data_models import Task
+from data_models import Task, GenerationSettings
 
 class TaskHandlerSignals(QObject):
     state_changed = Signal()
     log_message = Signal(str)
 
 class TaskHandler(QObject):
-    def __init__(self, ui_panel, tasks_dict):
-        super().__init__(); self.ui = ui_panel; self.data = tasks_dict
+    def __init__(self, ui_panel, tasks_dict, reference_index=None):
+        super().__init__(); self.ui = ui_panel; self.data = tasks_dict; self.index = reference_index
         self.signals = TaskHandlerSignals(); self.is_loading = False
 
     def connect_signals(self):
@@ -28,6 +28,12 @@ class TaskHandler(QObject):
         # *** 수정됨: 슬롯 연결 대상 함수에 @Slot() 데코레이터가 필요함 ***
         self.ui.prompt_edit.textChanged.connect(self.update_prompt_from_panel)
         self.ui.output_template_edit.textChanged.connect(self.update_template_from_panel)
+        self.ui.timeout_spin.valueChanged.connect(self.update_timeout_from_panel)
+        self.ui.cacheable_check.toggled.connect(self.update_cacheable_from_panel)
+        self.ui.semantic_threshold_spin.valueChanged.connect(self.update_semantic_threshold_from_panel)
+        self.ui.model_policy_combo.currentIndexChanged.connect(self.update_model_policy_from_panel)
+        self.ui.complexity_combo.currentIndexChanged.connect(self.update_complexity_from_panel)
+        self.ui.generation_widget.changed.connect(self.update_generation_from_panel)
         self.ui.check_all_btn.clicked.connect(lambda: self.set_all_tasks_checked(True))
         self.ui.uncheck_all_btn.clicked.connect(lambda: self.set_all_tasks_checked(False))
     
@@ -43,6 +49,7 @@ class TaskHandler(QObject):
     def add_task(self):
         all_task_names = {t.name for t in self.data.values()}; unique_name = self._generate_unique_name("새 태스크", all_task_names)
         task = Task(name=unique_name); self.data[task.id] = task
+        if self.index: self.index.index_task(task)
         item = QListWidgetItem(task.name); item.setData(Qt.UserRole, task.id)
         item.setFlags(item.flags() | Qt.ItemIsEditable | Qt.ItemIsUserCheckable)
         item.setCheckState(Qt.Checked if task.enabled else Qt.Unchecked); self.ui.list_widget.addItem(item)
@@ -57,6 +64,7 @@ class TaskHandler(QObject):
             task_name = self.data[task_id].name
             if QMessageBox.question(self.ui, "확인", f"'{task_name}' 태스크를 정말 삭제하시겠습니까?") == QMessageBox.Yes:
                 del self.data[task_id]; self.ui.list_widget.takeItem(self.ui.list_widget.row(item))
+                if self.index: self.index.remove_owner('task', task_id)
                 self.signals.log_message.emit(f"태스크 '{task_name}' 삭제됨"); self.signals.state_changed.emit()
     @Slot()
     def copy_task(self):
@@ -65,8 +73,13 @@ class TaskHandler(QObject):
         original_task = self.data[item.data(Qt.UserRole)]; all_task_names = {t.name for t in self.data.values()}
         base_name = f"{original_task.name} (복사본)"; unique_name = self._generate_unique_name(base_name, all_task_names)
         new_task = Task(name=unique_name, prompt=original_task.prompt, 
-                        output_template=original_task.output_template, enabled=original_task.enabled)
-        self.data[new_task.id] = new_task; new_item = QListWidgetItem(new_task.name); new_item.setData(Qt.UserRole, new_task.id)
+                        output_template=original_task.output_template, enabled=original_task.enabled,
+                        timeout=original_task.timeout, cacheable=original_task.cacheable,
+                        semantic_threshold=original_task.semantic_threshold, model=original_task.model,
+                        complexity=original_task.complexity, generation=original_task.generation)
+        self.data[new_task.id] = new_task
+        if self.index: self.index.index_task(new_task)
+        new_item = QListWidgetItem(new_task.name); new_item.setData(Qt.UserRole, new_task.id)
         new_item.setFlags(new_item.flags() | Qt.ItemIsEditable | Qt.ItemIsUserCheckable)
         new_item.setCheckState(Qt.Checked if new_task.enabled else Qt.Unchecked); current_row = self.ui.list_widget.row(item)
         self.ui.list_widget.insertItem(current_row + 1, new_item); self.ui.list_widget.setCurrentItem(new_item)
@@ -94,7 +107,9 @@ class TaskHandler(QObject):
                     QMessageBox.warning(self.ui, "이름 중복", f"'{new_name}'은(는) 이미 사용 중인 태스크 이름입니다.")
                     self.ui.name_edit.setText(task.name)
                     return
-                task.name = new_name; item.setText(new_name); self.signals.state_changed.emit()
+                task.name = new_name; item.setText(new_name)
+                if self.index: self.index.update_field('task', task_id, 'name', new_name)
+                self.signals.state_changed.emit()
     
     # *** 수정됨: @Slot() 데코레이터 추가 ***
     @Slot()
@@ -102,8 +117,10 @@ class TaskHandler(QObject):
         item = self.ui.list_widget.currentItem()
         if not item or self.is_loading: return
         task_id = item.data(Qt.UserRole)
-        if task_id in self.data and self.data[task_id].prompt != self.ui.prompt_edit.toPlainText():
-            self.data[task_id].prompt = self.ui.prompt_edit.toPlainText()
+        text = self.ui.prompt_edit.toPlainText()
+        if task_id in self.data and self.data[task_id].prompt != text:
+            self.data[task_id].prompt = text
+            if self.index: self.index.update_field('task', task_id, 'prompt', self.data[task_id].prompt)
             self.signals.state_changed.emit()
 
     # *** 수정됨: @Slot() 데코레이터 추가 ***
@@ -112,10 +129,65 @@ class TaskHandler(QObject):
         item = self.ui.list_widget.currentItem()
         if not item or self.is_loading: return
         task_id = item.data(Qt.UserRole)
-        if task_id in self.data and self.data[task_id].output_template != self.ui.output_template_edit.toPlainText():
-            self.data[task_id].output_template = self.ui.output_template_edit.toPlainText()
+        text = self.ui.output_template_edit.toPlainText()
+        if task_id in self.data and self.data[task_id].output_template != text:
+            self.data[task_id].output_template = text
+            if self.index: self.index.update_field('task', task_id, 'output_template', self.data[task_id].output_template)
+            self.signals.state_changed.emit()
+
+    @Slot(int)
+    def update_timeout_from_panel(self, value):
+        item = self.ui.list_widget.currentItem()
+        if not item or self.is_loading: return
+        task_id = item.data(Qt.UserRole)
+        if task_id in self.data and self.data[task_id].timeout != value:
+            self.data[task_id].timeout = value
+            self.signals.state_changed.emit()
+
+    @Slot(bool)
+    def update_cacheable_from_panel(self, checked):
+        item = self.ui.list_widget.currentItem()
+        if not item or self.is_loading: return
+        task_id = item.data(Qt.UserRole)
+        if task_id in self.data and self.data[task_id].cacheable != checked:
+            self.data[task_id].cacheable = checked; self.ui.semantic_threshold_spin.setEnabled(checked)
+            self.signals.state_changed.emit()
+
+    @Slot(float)
+    def update_semantic_threshold_from_panel(self, value):
+        item = self.ui.list_widget.currentItem()
+        if not item or self.is_loading: return
+        task_id = item.data(Qt.UserRole)
+        if task_id in self.data and self.data[task_id].semantic_threshold != value:
+            self.data[task_id].semantic_threshold = value
+            self.signals.state_changed.emit()
+
+    @Slot()
+    def update_model_policy_from_panel(self):
+        item = self.ui.list_widget.currentItem()
+        if not item or self.is_loading: return
+        task = self.data.get(item.data(Qt.UserRole)); model = self.ui.model_policy_combo.currentData() or ""
+        if task is not None and task.model != model:
+            task.model = model; self.ui.complexity_combo.setEnabled(model == 'auto')
             self.signals.state_changed.emit()
 
+    @Slot()
+    def update_complexity_from_panel(self):
+        item = self.ui.list_widget.currentItem()
+        if not item or self.is_loading: return
+        task = self.data.get(item.data(Qt.UserRole)); complexity = self.ui.complexity_combo.currentData()
+        if task is not None and task.complexity != complexity:
+            task.complexity = complexity; self.signals.state_changed.emit()
+
+    @Slot()
+    def update_generation_from_panel(self):
+        item = self.ui.list_widget.currentItem()
+        if not item or self.is_loading: return
+        task = self.data.get(item.data(Qt.UserRole)); generation = self.ui.generation_widget.settings()
+        if task is not None and task.generation != generation:
+            # 실행 중인 스냅샷이 같은 객체를 쓰고 있을 수 있으므로 고치지 않고 새 객체로 바꿉니다.
+            task.generation = generation; self.signals.state_changed.emit()
+
     @Slot(QListWidgetItem)
     def on_item_changed(self, item):
         if self.is_loading or not item: return
@@ -127,6 +199,7 @@ class TaskHandler(QObject):
                 if new_name in other_task_names:
                     QMessageBox.warning(self.ui, "이름 중복", f"'{new_name}'은(는) 이미 사용 중인 태스크 이름입니다."); item.setText(old_name); return
                 self.signals.log_message.emit(f"태스크 이름 변경: '{old_name}' -> '{new_name}'"); task.name = new_name
+                if self.index: self.index.update_field('task', task_id, 'name', new_name)
                 if self.ui.list_widget.currentItem() == item:
                     self.ui.name_edit.blockSignals(True); self.ui.name_edit.setText(new_name); self.ui.name_edit.blockSignals(False)
                 self.signals.state_changed.emit()
@@ -154,8 +227,15 @@ class TaskHandler(QObject):
         self.ui.name_edit.setEnabled(is_item_selected)
         self.ui.prompt_edit.setEnabled(is_item_selected)
         self.ui.output_template_edit.setEnabled(is_item_selected)
+        self.ui.timeout_spin.setEnabled(is_item_selected); self.ui.cacheable_check.setEnabled(is_item_selected)
+        self.ui.semantic_threshold_spin.setEnabled(is_item_selected)
+        self.ui.model_policy_combo.setEnabled(is_item_selected); self.ui.complexity_combo.setEnabled(False)
+        self.ui.generation_widget.setEnabled(is_item_selected)
         if not current:
-            self.ui.name_edit.clear(); self.ui.prompt_edit.clear(); self.ui.output_template_edit.clear()
+            self.ui.name_edit.clear(); self.ui.prompt_edit.clear(); self.ui.output_template_edit.clear(); self.ui.timeout_spin.setValue(0)
+            self.ui.cacheable_check.setChecked(True); self.ui.semantic_threshold_spin.setValue(0)
+            self.ui.model_policy_combo.setCurrentIndex(0); self.ui.complexity_combo.setCurrentIndex(1)
+            self.ui.generation_widget.set_settings(GenerationSettings())
         else:
             task_id = current.data(Qt.UserRole)
             if task_id in self.data:
@@ -163,4 +243,13 @@ class TaskHandler(QObject):
                 self.ui.name_edit.setText(task.name)
                 self.ui.prompt_edit.setPlainText(task.prompt)
                 self.ui.output_template_edit.setPlainText(task.output_template)
+                self.ui.timeout_spin.setValue(task.timeout)
+                self.ui.cacheable_check.setChecked(task.cacheable); self.ui.semantic_threshold_spin.setValue(task.semantic_threshold)
+                self.ui.semantic_threshold_spin.setEnabled(task.cacheable)
+                index = self.ui.model_policy_combo.findData(task.model)
+                if index == -1: self.ui.model_policy_combo.addItem(task.model, task.model); index = self.ui.model_policy_combo.count() - 1
+                self.ui.model_policy_combo.setCurrentIndex(index)
+                self.ui.complexity_combo.setCurrentIndex(max(0, self.ui.complexity_combo.findData(task.complexity)))
+                self.ui.complexity_combo.setEnabled(task.model == 'auto')
+                self.ui.generation_widget.set_settings(task.generation)
         self.is_loading = False
\ No newline at end of file
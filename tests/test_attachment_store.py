@@ -0,0 +1,66 @@
+# tests/test_attachment_store.py
+
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attachment_store import AttachmentRegistry, LocalAttachmentStore
+
+@pytest.fixture
+def files(tmp_path):
+    paths = {}
+    for name in ("a.pdf", "b.pdf"):
+        path = tmp_path / "inputs" / name; path.parent.mkdir(exist_ok=True); path.write_bytes(name.encode() * 1000); paths[name] = str(path)
+    return paths
+
+def registry(tmp_path, ttl=3600):
+    # 실행마다 새 레지스트리와 저장소 객체를 만드는 것처럼 씁니다. (uploads는 저장소 객체별로 셉니다)
+    return AttachmentRegistry(str(tmp_path / "attachments.json"), LocalAttachmentStore(str(tmp_path / "store")), ttl)
+
+def test_same_file_is_uploaded_once_across_tasks_and_runs(tmp_path, files):
+    first = registry(tmp_path)
+    with ThreadPoolExecutor(8) as executor: results = list(executor.map(lambda _: first.resolve(files["a.pdf"]), range(8)))
+    assert first.store.uploads == 1 and len({info['uri'] for info, _ in results}) == 1
+    assert sorted(reused for _, reused in results) == [False] + [True] * 7
+    first.flush()
+    second = registry(tmp_path)
+    info, reused = second.resolve(files["a.pdf"])
+    assert reused and second.store.uploads == 0 and info['uri'] == results[0][0]['uri']
+
+def test_expired_reference_is_checked_and_uploaded_again_when_missing(tmp_path, files):
+    first = registry(tmp_path, ttl=0.01)
+    info, _ = first.resolve(files["a.pdf"]); time.sleep(0.02)
+    # 만료되었지만 저장소에 남아 있으면 업로드 없이 다시 씁니다.
+    assert first.resolve(files["a.pdf"])[1] and first.store.uploads == 1
+    time.sleep(0.02); os.remove(info['uri'][len("file:"):])
+    info, reused = first.resolve(files["a.pdf"])
+    assert not reused and first.store.uploads == 2 and os.path.exists(info['uri'][len("file:"):])
+
+def test_changed_file_at_same_path_gets_new_reference(tmp_path, files):
+    first = registry(tmp_path)
+    before, _ = first.resolve(files["a.pdf"])
+    with open(files["a.pdf"], 'ab') as f: f.write(b"changed")
+    after, reused = first.resolve(files["a.pdf"])
+    assert not reused and after['digest'] != before['digest'] and after['uri'] != before['uri'] and first.store.uploads == 2
+
+def test_flush_merges_concurrent_registries(tmp_path, files):
+    first = registry(tmp_path); second = registry(tmp_path)
+    first.resolve(files["a.pdf"]); second.resolve(files["b.pdf"])
+    first.flush(); second.flush()
+    with open(tmp_path / "attachments.json", encoding='utf-8') as f: data = json.load(f)
+    assert len(data['refs']) == 2 and sorted(os.path.basename(path) for path in data['files']) == ["a.pdf", "b.pdf"]
+
+def test_expired_entries_are_pruned(tmp_path, files):
+    first = registry(tmp_path, ttl=0.05)
+    first.resolve(files["a.pdf"]); first.resolve(files["b.pdf"]); first.flush()
+    os.remove(files["b.pdf"]); time.sleep(0.06)
+    assert first.purge_expired() == 4 # 참조 2개, 쓰지 않은 해시 기억 2개
+    with open(tmp_path / "attachments.json", encoding='utf-8') as f: data = json.load(f)
+    # 저장된 파일에 남아 있던 항목도 다시 들여오지 않습니다.
+    assert data['refs'] == {} and data['files'] == {}
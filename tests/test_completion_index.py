@@ -0,0 +1,34 @@
+# tests/test_completion_index.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from completion_index import CompletionIndex, SCAN_LIMIT
+
+def test_exact_and_shortest_prefix_matches_win_over_many_prefix_hits():
+    index = CompletionIndex()
+    for i in range(5000): index.add(f"ab_{i:05d}_x")
+    index.add("ab"); index.add("ab_1")
+    assert len(index) > SCAN_LIMIT
+    results = [name for name, _ in index.search("ab", limit=5)]
+    assert results[:2] == ["ab", "ab_1"]
+    # 나머지는 가장 짧은(점수가 같으면 이름 순) 접두어 일치입니다.
+    assert results[2:] == ["ab_00000_x", "ab_00001_x", "ab_00002_x"]
+
+def test_index_changes_refresh_prefix_order():
+    index = CompletionIndex()
+    for i in range(3000): index.add(f"ab_{i:05d}_x")
+    index.search("ab")
+    index.add("abc"); assert index.search("ab", limit=1) == [("abc", 'user')]
+    index.remove("abc"); assert index.search("ab", limit=1) == [("ab_00000_x", 'user')]
+
+def test_recent_use_and_fuzzy_matches():
+    index = CompletionIndex()
+    for name in ["user_name", "username", "USER", "total_user", "other"]: index.add(name)
+    index.add("DATE", 'built-in')
+    assert [name for name, _ in index.search("usrnm")] == ["username", "user_name"]
+    assert ("DATE", 'built-in') not in index.search("d", built_in=False)
+    index.record_use("total_user")
+    assert index.search("u", limit=1) == [("total_user", 'user')]
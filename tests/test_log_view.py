@@ -0,0 +1,18 @@
+# tests/test_log_view.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip("PySide6")
+
+from log_view import text_log_level
+
+def test_text_log_level_prefers_recorded_level():
+    assert text_log_level("12:00:01 - [INFO] ▶ 태스크 '오류 보고서' 실행 시작...") == "INFO"
+    assert text_log_level("12:00:02 - [WARNING] 🔴 작업이 사용자에 의해 중단되었습니다.") == "WARNING"
+    # 수준이 없는 이전 형식의 줄만 문구로 추정합니다.
+    assert text_log_level("12:00:03 - ❌ 파일 저장 실패: a.md") == "ERROR"
+    assert text_log_level("12:00:04 - 💾 저장 2개, 변경 없음 0개, 실패 0개") == "INFO"
@@ -0,0 +1,81 @@
+# tests/test_output_sinks.py
+
+import os
+import sys
+import shutil
+import tarfile
+import warnings
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from output_sinks import create_sink, iter_entries, latest_entries, read_entries, extract
+
+def names(path): return sorted(name for name, _, _ in iter_entries(path))
+
+@pytest.mark.parametrize("kind", ['zip', 'tar', 'jsonl', 'sqlite'])
+def test_concurrent_runs_share_one_container(tmp_path, kind):
+    # 같은 프로젝트의 두 실행이 번갈아 기록하고 각자 닫아도 두 실행의 항목이 모두 남아야 합니다.
+    first = create_sink(kind, str(tmp_path)).open(); second = create_sink(kind, str(tmp_path)).open()
+    first.write(str(tmp_path / "a1.md"), b"A1"); second.write(str(tmp_path / "t1.md"), b"B1")
+    first.write(str(tmp_path / "a2.md"), b"A2"); first.close()
+    second.write(str(tmp_path / "t2.md"), b"B2"); second.close()
+    assert names(first.path) == ['a1.md', 'a2.md', 't1.md', 't2.md']
+    # 모두 닫은 뒤에는 다시 열 수 있고, 이전 항목과 같은 내용은 다시 쓰지 않습니다.
+    third = create_sink(kind, str(tmp_path)).open()
+    assert third.write(str(tmp_path / "a1.md"), b"A1") == 'unchanged'
+    third.close()
+
+def test_container_in_use_by_another_process_is_refused(tmp_path):
+    sink = create_sink('zip', str(tmp_path)).open()
+    try:
+        code = f"import sys; sys.path.insert(0, {os.path.dirname(os.path.dirname(os.path.abspath(__file__)))!r})\n" \
+               f"from output_sinks import create_sink\ncreate_sink('zip', {str(tmp_path)!r}).open()"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=60)
+        assert result.returncode != 0 and "RuntimeError" in result.stderr
+    finally: sink.close()
+
+@pytest.mark.parametrize("kind", ['zip', 'tar', 'jsonl', 'sqlite'])
+def test_latest_entries_are_read_one_by_one(tmp_path, kind):
+    sink = create_sink(kind, str(tmp_path)).open()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error') # 같은 이름을 다시 쓸 때 경고를 내지 않고, 전역 경고 설정도 바꾸지 않습니다.
+        for name, data in [("a.md", b"old"), ("b.md", "내용".encode()), ("a.md", b"new a"), ("c.md.partial", b"part")]: sink.write(str(tmp_path / name), data)
+    sink.close()
+    latest = latest_entries(sink.path, include_partial=False)
+    assert {name: entry.size for name, entry in latest.items()} == {'a.md': 5, 'b.md': 6}
+    assert {entry.name: data for entry, data in read_entries(sink.path, latest.values())} == {'a.md': b"new a", 'b.md': "내용".encode()}
+    assert extract(sink.path, str(tmp_path / "out")) == (2, 0) and (tmp_path / "out" / "a.md").read_bytes() == b"new a"
+
+def test_zip_without_central_directory_is_repaired(tmp_path):
+    sink = create_sink('zip', str(tmp_path)).open()
+    sink.write(str(tmp_path / "a.md"), b"A" * 1000); sink.write(str(tmp_path / "b.md"), b"B")
+    # 닫기 전(중앙 디렉터리 없음)의 파일에 기록 중 끊긴 항목을 덧붙여 비정상 종료를 흉내 냅니다.
+    crashed = tmp_path / "crashed"; crashed.mkdir(); shutil.copy(sink.path, crashed / "outputs.zip"); sink.close()
+    with open(crashed / "outputs.zip", 'ab') as f: f.write(b"PK\x03\x04" + b"\x14\x00" * 8)
+    entries = latest_entries(str(crashed / "outputs.zip")) # 복구 전에도 로컬 헤더로 읽을 수 있습니다.
+    assert {entry.name: data for entry, data in read_entries(str(crashed / "outputs.zip"), entries.values())} == {'a.md': b"A" * 1000, 'b.md': b"B"}
+    reopened = create_sink('zip', str(crashed)).open()
+    assert (crashed / "outputs.zip.corrupt").exists()
+    assert reopened.write(str(crashed / "a.md"), b"A" * 1000) == 'unchanged'
+    reopened.write(str(crashed / "c.md"), b"C"); reopened.close()
+    assert names(reopened.path) == ['a.md', 'b.md', 'c.md']
+
+def test_tar_truncated_member_is_cut_off(tmp_path):
+    sink = create_sink('tar', str(tmp_path)).open(); sink.write(str(tmp_path / "a.md"), b"A" * 700); sink.close()
+    size = os.path.getsize(sink.path)
+    with open(sink.path, 'r+b') as f: f.truncate(size - 1024); f.seek(0, os.SEEK_END); f.write(b"x" * 300) # 끝 표시 대신 잘린 구성원
+    reopened = create_sink('tar', str(tmp_path)).open()
+    assert reopened.write(str(tmp_path / "a.md"), b"A" * 700) == 'unchanged'
+    reopened.write(str(tmp_path / "b.md"), b"B"); reopened.close()
+    assert [name for name, _, _ in iter_entries(reopened.path)] == ['a.md', 'b.md']
+    with tarfile.open(reopened.path) as tar: assert tar.getnames() == ['a.md', 'b.md'] # 일반 tar 도구로도 읽힙니다.
+
+def test_jsonl_partial_line_is_cut_off(tmp_path):
+    sink = create_sink('jsonl', str(tmp_path)).open(); sink.write(str(tmp_path / "a.md"), b"A"); sink.close()
+    with open(sink.path, 'ab') as f: f.write(b'{"name": "b.md", "cont')
+    reopened = create_sink('jsonl', str(tmp_path)).open(); reopened.write(str(tmp_path / "c.md"), b"C"); reopened.close()
+    with open(reopened.path, 'rb') as f: lines = f.read().splitlines()
+    assert len(lines) == 2 and [name for name, _, _ in iter_entries(reopened.path)] == ['a.md', 'c.md']
@@ -0,0 +1,80 @@
+# tests/test_process_engine.py
+
+import os
+import sys
+import pstats
+import threading
+import multiprocessing
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip("PySide6"); pytest.importorskip("vertexai")
+
+import core_logic
+from process_engine import worker_main
+
+class FakeResponse:
+    def __init__(self, text): self.text = text; self.usage_metadata = None; self.finish_reason = None
+
+def echo_generate(self, pool, prompt, model_name, token, config=None): return FakeResponse(f"echo: {prompt}")
+
+@pytest.fixture
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_STATS_PATH", str(tmp_path / "model_stats.json"))
+    monkeypatch.setenv("CACHE_USAGE_DB", str(tmp_path / "cache_usage.sqlite"))
+    monkeypatch.setenv("ATTACHMENT_STORE", "")
+    # API 대신 프롬프트를 그대로 돌려줍니다. 태스크 스레드/저장 스레드에서 시그널이 나가는 경로는 그대로입니다.
+    monkeypatch.setattr(core_logic.TaskRunner, '_generate', echo_generate)
+    return tmp_path
+
+def run_worker(payload, timeout=30):
+    parent, child = multiprocessing.Pipe()
+    thread = threading.Thread(target=worker_main, args=(child,), daemon=True); thread.start()
+    messages = []
+    try:
+        parent.send(('run', 'run1', payload))
+        while True:
+            assert parent.poll(timeout), f"작업 프로세스가 응답하지 않습니다: {messages}"
+            message = parent.recv(); messages.append(message)
+            if message[0] == 'finished': break
+    finally:
+        parent.send(('shutdown',)); thread.join(10)
+    return messages
+
+def make_payload(output_folder, profile=None):
+    tasks = [{'id': f"t{i}", 'name': f"task{i}", 'prompt': f"hello {i}"} for i in range(2)]
+    settings = {'model_name': "gemini-2.5-flash", 'output_folder': str(output_folder), 'output_extension': '.md', 'log_folder': '',
+                'run_options': {'max_concurrency': 2}}
+    return {'api_key': '', 'variables': [], 'tasks': tasks, 'settings': settings, 'priority': 'normal', 'profile': profile}
+
+def test_worker_forwards_logs_progress_and_outputs(isolated):
+    output_folder = isolated / "out"
+    messages = run_worker(make_payload(output_folder))
+
+    kinds = [message[0] for message in messages]
+    assert 'error' not in kinds, messages
+    logs = [record for message in messages if message[0] == 'logs' for record in message[2]]
+    assert any("task0" in text for text, _, _ in logs) and any("task1" in text for text, _, _ in logs)
+    progress = [message[2:] for message in messages if message[0] == 'progress']
+    assert progress and progress[-1] == (2, 2)
+    outputs = sorted(os.path.basename(message[2]) for message in messages if message[0] == 'output')
+    assert outputs == ["task0.md", "task1.md"]
+    assert (output_folder / "task0.md").read_text(encoding='utf-8') == "echo: hello 0"
+    assert kinds[-1] == 'finished'
+
+def test_run_profile_includes_task_threads(isolated):
+    # 태스크와 API 요청은 실행 스레드가 아닌 작업 스레드에서 돌므로, 그 본문도 실행 프로파일에 들어 있어야 합니다.
+    profile_dir = isolated / "profile"; profile_dir.mkdir()
+    messages = run_worker(make_payload(isolated / "out", {'dir': str(profile_dir), 'memory': False}))
+    assert 'error' not in [message[0] for message in messages], messages
+    functions = {name for _, _, name in pstats.Stats(str(profile_dir / "run_run1.prof")).stats}
+    assert {'run', 'run_task', 'echo_generate'} <= functions
+
+def test_log_levels_are_not_guessed_from_task_names(isolated):
+    payload = make_payload(isolated / "out")
+    payload['tasks'] = [{'id': "t1", 'name': "오류 보고서", 'prompt': "실패 원인 요약"}]
+    messages = run_worker(payload)
+    logs = [record for message in messages if message[0] == 'logs' for record in message[2]]
+    # 태스크 이름이나 내용에 '오류', '실패'가 들어 있어도 정상 진행 로그는 INFO입니다.
+    assert logs and {level for text, level, _ in logs if "오류 보고서" in text} == {"INFO"}
@@ -0,0 +1,40 @@
+# tests/test_request_engine.py
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_engine import CancelToken, HedgePolicy, HedgedCaller, LatencyTracker, RequestTimeout
+
+def streaming(chunks, delay):
+    def fn(token):
+        for chunk in chunks:
+            if token.is_cancelled(): raise token.error()
+            token.add_partial(chunk); time.sleep(delay)
+        return "".join(chunks)
+    return fn
+
+def test_finished_requests_are_detached_from_the_run_token():
+    root = CancelToken()
+    tracker = LatencyTracker()
+    for _ in range(5): tracker.record(0.01)
+    caller = HedgedCaller(HedgePolicy(enabled=True, budget_ratio=1.0), tracker)
+    for _ in range(20):
+        task_token = CancelToken(root)
+        result, _, _ = caller.call(streaming(["a", "b"], 0.02), streaming(["c"], 0.0), task_token)
+        assert result in ("ab", "c")
+        task_token.release()
+    assert caller.hedges_issued > 0
+    # 끝난 요청의 토큰과 부분 응답이 실행 토큰에 남지 않습니다.
+    assert root._children == [] and root.partial_text() == ""
+
+def test_timeout_keeps_partial_text_after_release():
+    root = CancelToken(); task_token = CancelToken(root, timeout=0.15)
+    with pytest.raises(RequestTimeout) as error:
+        HedgedCaller(HedgePolicy()).call(streaming(["x"] * 100, 0.01), None, task_token)
+    task_token.release()
+    assert error.value.partial_text.startswith("xxx") and root._children == []
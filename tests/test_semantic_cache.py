@@ -0,0 +1,84 @@
+# tests/test_semantic_cache.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+np = pytest.importorskip("numpy")
+
+from semantic_cache import HashedNgramEmbedder, SemanticResponseCache
+
+class FakeResponse:
+    def __init__(self, text): self.text = text; self.usage_metadata = None; self.finish_reason = None
+
+@pytest.fixture
+def headless(tmp_path, monkeypatch):
+    pytest.importorskip("PySide6"); pytest.importorskip("vertexai")
+    import core_logic
+    from headless import HeadlessSession
+    monkeypatch.setenv("MODEL_STATS_PATH", str(tmp_path / "model_stats.json"))
+    monkeypatch.setenv("CACHE_USAGE_DB", str(tmp_path / "cache_usage.sqlite"))
+    monkeypatch.setenv("ATTACHMENT_STORE", "")
+    calls = []
+    def generate(self, pool, prompt, model_name, token, config=None): calls.append(model_name); return FakeResponse(f"{model_name}: {prompt}")
+    monkeypatch.setattr(core_logic.TaskRunner, '_generate', generate)
+    return HeadlessSession(), calls
+
+def run_once(session, tmp_path, model, prompt="같은 프롬프트입니다.", variables=None):
+    from data_models import Task
+    settings = {'model_name': "gemini-2.5-flash", 'output_folder': str(tmp_path / model), 'log_folder': '',
+                'run_options': {'semantic_cache': {'enabled': True}}}
+    task = Task(name="summary", prompt=prompt, model=model)
+    session.make_runner({var.id: var for var in variables or []}, [task], settings).run()
+    return (tmp_path / model / "summary.md").read_text(encoding='utf-8')
+
+def test_embedder_is_deterministic_and_normalized():
+    embedder = HashedNgramEmbedder()
+    a = embedder.embed("Summarize the report for 2024-05-01.")
+    assert np.isclose(np.linalg.norm(a), 1.0) and np.array_equal(a, HashedNgramEmbedder().embed("Summarize the report for 2024-05-01."))
+    # 공백/대소문자 차이는 같은 벡터가 되고, 날짜만 다른 프롬프트는 다른 내용의 프롬프트보다 훨씬 가깝습니다.
+    assert np.allclose(a, embedder.embed("  summarize   THE report for 2024-05-01. "))
+    near = float(a @ embedder.embed("Summarize the report for 2024-05-02."))
+    far = float(a @ embedder.embed("Translate this poem into French."))
+    assert near > 0.9 and far < 0.3
+    assert embedder.embed_batch([]).shape == (0, embedder.dim) and embedder.embed_batch(["a", "b"]).shape == (2, embedder.dim)
+
+def test_lookup_batch_applies_per_row_thresholds_within_scope():
+    cache = SemanticResponseCache(capacity=10); embed = cache.embed
+    cache.add(embed("Summarize the quarterly sales report."), "answer", 'scope')
+    vectors = np.stack([embed("Summarize the quarterly sales report."), embed("Summarize the quarterly sales reports."), embed("Write a haiku.")])
+    similarity = float(vectors[1] @ vectors[0])
+    hits = cache.lookup_batch(vectors, [0.99, similarity + 0.001, 0.0], 'scope')
+    assert hits[0][0] == "answer" and hits[1] is None and hits[2][0] == "answer" # 임계값 0이면 가장 가까운 항목을 돌려줍니다.
+    assert cache.lookup_batch(vectors, [0.0] * 3, 'other scope') == [None] * 3
+    assert cache.stats()['lookups'] == 6 and cache.stats()['hits'] == 2
+
+def test_least_recently_used_entry_is_evicted_and_empty_scopes_pruned():
+    cache = SemanticResponseCache(capacity=2); embed = cache.embed
+    cache.add(embed("first prompt"), "1", 'a'); cache.add(embed("second prompt"), "2", 'b')
+    assert cache.lookup(embed("first prompt"), 0.99, 'a')[0] == "1" # 'a'를 최근에 사용했으므로 'b'가 밀려납니다.
+    cache.add(embed("third prompt"), "3", 'a')
+    assert cache.lookup(embed("second prompt"), 0.0, 'b') is None and cache.stats()['evictions'] == 1
+    # 항목이 남지 않은 범위는 범위 목록에서도 지워집니다.
+    assert set(cache._scopes) == {'a'} and len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0 and cache._scopes == {}
+
+def test_responses_are_not_shared_across_models(headless, tmp_path):
+    session, calls = headless
+    assert run_once(session, tmp_path, "gemini-2.5-pro").startswith("gemini-2.5-pro")
+    # 같은 프롬프트라도 다른 모델로 보낼 요청은 앞의 응답을 재사용하지 않습니다.
+    assert run_once(session, tmp_path, "gemini-2.0-flash").startswith("gemini-2.0-flash")
+    assert run_once(session, tmp_path, "gemini-2.5-pro").startswith("gemini-2.5-pro")
+    assert calls == ["gemini-2.5-pro", "gemini-2.0-flash"]
+
+def test_prompts_differing_only_in_a_variable_value_are_not_reused(headless, tmp_path):
+    from data_models import Variable
+    session, calls = headless
+    # 변수로 넣은 값은 날짜처럼 사소해 보여도 다르면 재사용하지 않습니다. (문서화된 절충)
+    assert "2024-05-01" in run_once(session, tmp_path, "gemini-2.5-pro", "{DATE} 보고서 요약", [Variable(name="DATE", value="2024-05-01")])
+    assert "2024-05-02" in run_once(session, tmp_path, "gemini-2.5-pro", "{DATE} 보고서 요약", [Variable(name="DATE", value="2024-05-02")])
+    assert "2024-05-01" in run_once(session, tmp_path, "gemini-2.5-pro", "{DATE} 보고서 요약", [Variable(name="DATE", value="2024-05-01")])
+    assert len(calls) == 2
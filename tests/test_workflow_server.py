@@ -0,0 +1,59 @@
+# tests/test_workflow_server.py
+
+import os
+import sys
+import json
+import threading
+import http.client
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip("PySide6"); pytest.importorskip("vertexai")
+
+from workflow_server import WorkflowService, create_server
+
+TOKEN = "test-token"
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_STATS_PATH", str(tmp_path / "model_stats.json"))
+    monkeypatch.setenv("CACHE_USAGE_DB", str(tmp_path / "cache_usage.sqlite"))
+    # 작업자를 시작하지 않으므로 받은 작업은 대기열에만 쌓입니다.
+    service = WorkflowService(jobs_root=str(tmp_path / "jobs"))
+    server = create_server(service, port=0, token=TOKEN)
+    thread = threading.Thread(target=server.serve_forever, daemon=True); thread.start()
+    yield server
+    server.shutdown(); server.server_close()
+
+def post(server, body, content_type="application/json", token=TOKEN):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+    headers = {"Content-Type": content_type}
+    if token: headers["Authorization"] = f"Bearer {token}"
+    connection.request("POST", "/jobs", json.dumps(body), headers)
+    response = connection.getresponse(); data = json.loads(response.read() or b"{}"); connection.close()
+    return response.status, data
+
+def project(variables=()):
+    return {'variables': list(variables), 'tasks': [{'id': "t1", 'name': "task1", 'prompt': "hello {{NAME}}"}], 'settings': {}}
+
+def test_post_requires_token_and_json(server):
+    assert post(server, {'project': project()}, token=None)[0] == 401
+    # 다른 출처의 웹 페이지가 사전 요청 없이 보낼 수 있는 형식은 거부합니다.
+    assert post(server, {'project': project()}, content_type="text/plain")[0] == 415
+    assert post(server, {'project': project()})[0] == 202
+
+def test_file_variables_are_rejected_by_default(server, tmp_path):
+    status, data = post(server, {'project': project([{'id': "v1", 'name': "DOC", 'value': "/etc/passwd", 'kind': "file"}])})
+    assert status == 400 and "DOC" in data['error']
+    path = tmp_path / "project.json"
+    path.write_text(json.dumps(project([{'id': "v1", 'name': "DOC", 'value': str(tmp_path / "doc.txt"), 'kind': "file"}])), encoding='utf-8')
+    # 프로젝트 파일의 파일 변수는 쓸 수 있지만 그 경로를 요청으로 바꿀 수는 없습니다.
+    assert post(server, {'project': str(path)})[0] == 202
+    status, data = post(server, {'project': str(path), 'variables': {'DOC': "/etc/passwd"}})
+    assert status == 400 and "DOC" in data['error']
+    assert post(server, {'project': str(path), 'variables': {'NAME': "world"}})[0] == 202
+
+def test_file_variables_allowed_explicitly(server):
+    server.service.allow_file_variables = True
+    assert post(server, {'project': project([{'id': "v1", 'name': "DOC", 'value': "doc.txt", 'kind': "file"}])})[0] == 202
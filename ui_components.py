@@ -1,12 +1,19 @@
 # ui_components.py
 
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QListWidget, QCompleter,
-                             QPushButton, QLineEdit, QTextEdit, QGroupBox, QLabel,
-                             QAbstractItemView, QComboBox) # QComboBox는 이미 임포트됨
-from PySide6.QtCore import Qt, Slot
-from PySide6.QtGui import QTextCursor, QPalette, QIcon
+                             QPushButton, QLineEdit, QGroupBox, QLabel,
+                             QAbstractItemView, QComboBox, QSpinBox, QDoubleSpinBox, QCheckBox,
+                             QProgressBar, QTreeWidget, QTreeWidgetItem, QFormLayout, QPlainTextEdit) # QComboBox는 이미 임포트됨
+from PySide6.QtCore import Qt, Slot, Signal, QTimer
+from PySide6.QtGui import QTextCursor, QPalette, QIcon, QStandardItemModel, QColor
 
-from syntax_highlighter import VariableSyntaxHighlighter
+import json
+
+from syntax_highlighter import VariableSyntaxHighlighter, ViewportHighlighter
+from log_view import LogView
+from run_scheduler import PRIORITY_LABELS
+from model_router import SUPPORTED_MODELS, COMPLEXITY_LABELS
+from data_models import TASK_COMPLEXITIES, GenerationSettings
 
 # ... EditableListWidget, CompleterTextEdit, VariablePanel, TaskPanel 클래스는 변경 없음 ...
 class EditableListWidget(QListWidget):
@@ -19,21 +26,107 @@ class EditableListWidget(QListWidget):
             item = self.currentItem()
             if item: self.editItem(item)
         else: super().keyPressEvent(event)
-class CompleterTextEdit(QTextEdit):
+BUILT_IN_COLOR = "#4a90e2"
+LARGE_DOCUMENT_CHARS = 256 * 1024 # 이 크기 이상의 내용은 큰 문서 모드로 편집합니다.
+LOAD_CHUNK_CHARS = 128 * 1024 # 큰 내용은 이만큼씩 나눠 이벤트 루프 사이사이에 넣습니다.
+
+class CompleterTextEdit(QPlainTextEdit):
+    """'{' 자동완성과 변수 강조를 제공하는 편집기입니다.
+
+    내용이 LARGE_DOCUMENT_CHARS 이상이면 큰 문서 모드로 바뀝니다. 줄바꿈을 끄고 문서 전체 강조 대신 화면에 보이는 블록만
+    필요할 때 강조하며, setPlainText로 받은 큰 내용은 나눠서 불러옵니다. 불러오는 동안은 읽기 전용이며 끝나면 textChanged를 한 번 보냅니다.
+    """
     def __init__(self, parent=None):
         super().__init__(parent)
         self._completer = QCompleter(self); self._completer.setWidget(self)
         self._completer.setCompletionMode(QCompleter.PopupCompletion)
+        self._completion_model = QStandardItemModel(0, 1, self); self._index = None; self._built_in = True; self._exclude = None
         self.highlighter = VariableSyntaxHighlighter(self.document())
-    def setModel(self, model):
-        if self._completer.model():
-            try: self._completer.activated.disconnect(self.insertCompletion)
-            except RuntimeError: pass
-        self._completer.setModel(model)
-        if model: self._completer.activated.connect(self.insertCompletion)
+        self.viewport_highlighter = ViewportHighlighter(self, self.highlighter)
+        self.large_mode = False; self._pending = None; self._pending_pos = 0; self._read_only = False
+        self._load_timer = QTimer(self); self._load_timer.setInterval(0); self._load_timer.timeout.connect(self._load_next_chunk)
+        self.textChanged.connect(self._check_size)
+    def set_large_mode(self, enabled):
+        if enabled == self.large_mode: return
+        self.large_mode = enabled
+        # 분리된 하이라이터는 문서 변경에 반응하지 않으며, 다시 붙이면 (작아진) 문서 전체를 한 번 강조합니다.
+        self.highlighter.setDocument(None if enabled else self.document())
+        self.setLineWrapMode(QPlainTextEdit.NoWrap if enabled else QPlainTextEdit.WidgetWidth)
+        self.viewport_highlighter.set_enabled(enabled)
+    def _check_size(self):
+        count = self.document().characterCount()
+        if not self.large_mode and count >= LARGE_DOCUMENT_CHARS: self.set_large_mode(True)
+        elif self.large_mode and count < LARGE_DOCUMENT_CHARS // 2: self.set_large_mode(False) # 경계에서 모드가 오락가락하지 않도록 절반 아래에서 돌아옵니다.
+    def _prepare_insert(self, length):
+        # 큰 내용을 넣기 전에 모드를 바꿔야 하이라이터가 넣은 내용 전체를 강조하지 않습니다.
+        if self._pending is not None: self._flush_load()
+        if not self.large_mode and self.document().characterCount() + length >= LARGE_DOCUMENT_CHARS: self.set_large_mode(True)
+    def visible_blocks(self):
+        block = self.firstVisibleBlock(); offset = self.contentOffset(); bottom = self.viewport().height()
+        while block.isValid():
+            if self.blockBoundingGeometry(block).translated(offset).top() > bottom: break
+            if block.isVisible(): yield block
+            block = block.next()
+    def is_loading(self): return self._pending is not None
+    def setPlainText(self, text):
+        self._cancel_load()
+        # 작은 내용은 바꾼 뒤에 하이라이터를 다시 붙여 이전의 큰 문서를 강조하지 않게 합니다.
+        if len(text) < LARGE_DOCUMENT_CHARS: super().setPlainText(text); self.set_large_mode(False); return
+        self.set_large_mode(True); self.setUndoRedoEnabled(False); super().setReadOnly(True)
+        self._pending = text; self._pending_pos = self._chunk_end(text, 0)
+        self.blockSignals(True)
+        try: super().setPlainText(text[:self._pending_pos])
+        finally: self.blockSignals(False)
+        self._load_timer.start()
+    def clear(self): self.setPlainText("")
+    def insertPlainText(self, text): self._prepare_insert(len(text)); super().insertPlainText(text)
+    def insertFromMimeData(self, source):
+        if source.hasText(): self._prepare_insert(len(source.text()))
+        super().insertFromMimeData(source)
+    def setReadOnly(self, read_only):
+        self._read_only = read_only
+        if self._pending is None: super().setReadOnly(read_only) # 불러오는 중이면 끝난 뒤에 적용합니다.
+    @staticmethod
+    def _chunk_end(text, start):
+        end = min(len(text), start + LOAD_CHUNK_CHARS)
+        if end < len(text):
+            newline = text.rfind('\n', start, end)
+            if newline > start: end = newline + 1 # 한 줄이 두 번에 나뉘어 레이아웃되지 않도록 줄 끝에서 자릅니다.
+        return end
+    def _load_next_chunk(self):
+        text = self._pending; start = self._pending_pos; end = self._chunk_end(text, start)
+        cursor = QTextCursor(self.document()); cursor.movePosition(QTextCursor.MoveOperation.End)
+        self.blockSignals(True)
+        try: cursor.insertText(text[start:end])
+        finally: self.blockSignals(False)
+        self._pending_pos = end
+        if end < len(text): return
+        self._cancel_load(); self.textChanged.emit() # 연결된 핸들러는 다 불러온 내용을 한 번만 봅니다.
+    def _flush_load(self):
+        while self._pending is not None: self._load_next_chunk()
+    def _cancel_load(self):
+        if self._pending is None: return
+        self._load_timer.stop(); self._pending = None; self.setUndoRedoEnabled(True); super().setReadOnly(self._read_only)
+    def resizeEvent(self, e):
+        super().resizeEvent(e); self.viewport_highlighter.schedule()
+    def set_completion_index(self, index, built_in=True, exclude=None):
+        """index(CompletionIndex)에서 후보를 찾아 팝업에 보여줍니다. exclude는 제외할 이름 목록을 돌려주는 함수입니다."""
+        self._index = index; self._built_in = built_in; self._exclude = exclude
+        # 걸러내기와 정렬은 색인이 하므로 QCompleter는 받은 목록을 그대로 보여줍니다.
+        self._completer.setModel(self._completion_model); self._completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self._completer.activated.connect(self.insertCompletion)
     def completer(self): return self._completer
+    def _update_completions(self, prefix):
+        results = self._index.search(prefix, exclude=self._exclude() if self._exclude else (), built_in=self._built_in)
+        model = self._completion_model; model.setRowCount(len(results))
+        for row, (name, kind) in enumerate(results):
+            index = model.index(row, 0); model.setData(index, name)
+            model.setData(index, QColor(BUILT_IN_COLOR) if kind == 'built-in' else None, Qt.ForegroundRole)
+            model.setData(index, f"내장 변수: {name}" if kind == 'built-in' else None, Qt.ToolTipRole)
+        return len(results)
     @Slot(str)
     def insertCompletion(self, completion):
+        if self._index is not None: self._index.record_use(completion)
         tc = self.textCursor(); prefix = self.completer().completionPrefix()
         tc.movePosition(QTextCursor.MoveOperation.Left, QTextCursor.MoveMode.KeepAnchor, len(prefix) + 1)
         tc.insertText("{" + completion + "}"); self.setTextCursor(tc)
@@ -49,7 +142,7 @@ class CompleterTextEdit(QTextEdit):
             if e.key() in (Qt.Key_Enter, Qt.Key_Return, Qt.Key_Escape, Qt.Key_Tab, Qt.Key_Backtab): e.ignore(); return
         super().keyPressEvent(e)
         prefix = self.textUnderCursor()
-        if not self._completer or (not prefix and e.text() != '{'): self._completer.popup().hide(); return
+        if self._index is None or (not prefix and e.text() != '{') or not self._update_completions(prefix): self._completer.popup().hide(); return
         if self._completer.completionPrefix() != prefix: self._completer.setCompletionPrefix(prefix)
         cr = self.cursorRect(); cr.setWidth(300); self._completer.complete(cr)
         self._completer.popup().setCurrentIndex(self._completer.completionModel().index(0, 0))
@@ -62,8 +155,77 @@ class VariablePanel(QGroupBox):
         layout.addWidget(QLabel("변수 이름:")); self.name_edit = QLineEdit(); layout.addWidget(self.name_edit)
         reserved_label = QLabel("(예약어: RESPONSE)"); palette = reserved_label.palette()
         palette.setColor(QPalette.WindowText, Qt.gray); reserved_label.setPalette(palette); layout.addWidget(reserved_label)
+        kind_layout = QHBoxLayout(); kind_layout.addWidget(QLabel("변수 종류:")); self.kind_combo = QComboBox()
+        self.kind_combo.addItem("텍스트", 'text'); self.kind_combo.addItem("첨부 파일 (이미지, PDF 등)", 'file')
+        kind_layout.addWidget(self.kind_combo); kind_layout.addStretch(); layout.addLayout(kind_layout)
         layout.addWidget(QLabel("변수 내용 (자동완성: '{' 입력):")); self.value_edit = CompleterTextEdit(); layout.addWidget(self.value_edit)
         self.load_file_btn = QPushButton("파일 내용 불러오기..."); layout.addWidget(self.load_file_btn)
+def parse_stop_sequences(text):
+    """'|'로 구분된 중지 시퀀스를 목록으로 바꿉니다. \\n, \\t, \\|, \\\\ 이스케이프를 지원합니다."""
+    items = []; current = []; chars = iter(text)
+    for c in chars:
+        if c == '\\': n = next(chars, ''); current.append({'n': '\n', 't': '\t'}.get(n, n))
+        elif c == '|': items.append("".join(current)); current = []
+        else: current.append(c)
+    items.append("".join(current))
+    return [item for item in items if item]
+
+def format_stop_sequences(sequences):
+    escape = lambda s: s.replace('\\', '\\\\').replace('|', '\\|').replace('\n', '\\n').replace('\t', '\\t')
+    return "|".join(escape(s) for s in sequences)
+
+class GenerationSettingsWidget(QGroupBox):
+    """생성 설정 편집기입니다. 태스크 패널(태스크별)과 실행 옵션(프로젝트 기본값)에서 함께 씁니다."""
+    changed = Signal()
+    SCHEMA_MIME_TYPES = ('application/json', 'text/x.enum')
+
+    def __init__(self, title, inherit_text, parent=None):
+        super().__init__(title, parent)
+        form = QFormLayout(self); self._loading = False; self._schema = None
+        self.max_tokens_spin = QSpinBox(); self.max_tokens_spin.setRange(0, 65536); self.max_tokens_spin.setSingleStep(64)
+        self.max_tokens_spin.setSuffix(" 토큰"); self.max_tokens_spin.setSpecialValueText(inherit_text)
+        self.temperature_spin = QDoubleSpinBox(); self.temperature_spin.setRange(-0.1, 2.0); self.temperature_spin.setSingleStep(0.1)
+        self.temperature_spin.setDecimals(2); self.temperature_spin.setSpecialValueText(inherit_text); self.temperature_spin.setValue(-0.1)
+        self.stop_edit = QLineEdit(); self.stop_edit.setPlaceholderText("'|'로 구분, 줄바꿈은 \\n (예: \\n\\n|끝)")
+        self.mime_combo = QComboBox()
+        for label, mime in ((inherit_text, ""), ("일반 텍스트", 'text/plain'), ("JSON", 'application/json'), ("열거형 (text/x.enum)", 'text/x.enum')):
+            self.mime_combo.addItem(label, mime)
+        self.schema_edit = QPlainTextEdit(); self.schema_edit.setMaximumHeight(70)
+        self.schema_edit.setPlaceholderText('응답 스키마 (JSON, 선택 사항) 예: {"type": "object", "properties": {...}}')
+        form.addRow("최대 출력 토큰:", self.max_tokens_spin); form.addRow("Temperature:", self.temperature_spin)
+        form.addRow("중지 시퀀스:", self.stop_edit); form.addRow("응답 형식:", self.mime_combo); form.addRow("응답 스키마:", self.schema_edit)
+        self.max_tokens_spin.valueChanged.connect(self._on_edited); self.temperature_spin.valueChanged.connect(self._on_edited)
+        self.stop_edit.editingFinished.connect(self._on_edited); self.mime_combo.currentIndexChanged.connect(self._on_edited)
+        self.schema_edit.textChanged.connect(self._on_edited); self.schema_edit.setEnabled(False)
+
+    def _update_schema_enabled(self): self.schema_edit.setEnabled(self.mime_combo.currentData() in self.SCHEMA_MIME_TYPES)
+
+    def _on_edited(self):
+        self._update_schema_enabled()
+        if self._loading: return
+        text = self.schema_edit.toPlainText().strip()
+        try: schema = json.loads(text) if text else None
+        except ValueError as e:
+            # 입력 중인 스키마는 올바른 JSON이 될 때까지 반영하지 않습니다.
+            self.schema_edit.setStyleSheet("border: 1px solid red;"); self.schema_edit.setToolTip(f"JSON 오류: {e}"); return
+        self.schema_edit.setStyleSheet(""); self.schema_edit.setToolTip(""); self._schema = schema; self.changed.emit()
+
+    def set_settings(self, settings):
+        self._loading = True
+        self.max_tokens_spin.setValue(settings.max_output_tokens)
+        self.temperature_spin.setValue(self.temperature_spin.minimum() if settings.temperature is None else settings.temperature)
+        self.stop_edit.setText(format_stop_sequences(settings.stop_sequences))
+        self.mime_combo.setCurrentIndex(max(0, self.mime_combo.findData(settings.response_mime_type)))
+        self._schema = settings.response_schema
+        self.schema_edit.setPlainText(json.dumps(settings.response_schema, ensure_ascii=False, indent=1) if settings.response_schema else "")
+        self.schema_edit.setStyleSheet(""); self._loading = False; self._update_schema_enabled()
+
+    def settings(self):
+        temperature = self.temperature_spin.value()
+        return GenerationSettings(max_output_tokens=self.max_tokens_spin.value(), stop_sequences=parse_stop_sequences(self.stop_edit.text()),
+                                  temperature=None if temperature < 0 else temperature, response_mime_type=self.mime_combo.currentData(),
+                                  response_schema=self._schema)
+
 class TaskPanel(QGroupBox):
     def __init__(self, title="2. 태스크 관리 (실행 순서)"):
         super().__init__(title)
@@ -85,6 +247,22 @@ class TaskPanel(QGroupBox):
         template_info_label = QLabel("({RESPONSE} 등 내장 변수와 사용자 변수 사용 가능)")
         palette = template_info_label.palette(); palette.setColor(QPalette.WindowText, Qt.gray); template_info_label.setPalette(palette)
         layout.addWidget(template_info_label)
+        timeout_layout = QHBoxLayout(); timeout_layout.addWidget(QLabel("요청 제한 시간:"))
+        self.timeout_spin = QSpinBox(); self.timeout_spin.setRange(0, 24 * 60 * 60); self.timeout_spin.setSuffix(" 초")
+        self.timeout_spin.setSpecialValueText("전역 설정 사용"); timeout_layout.addWidget(self.timeout_spin); timeout_layout.addStretch()
+        layout.addLayout(timeout_layout)
+        cache_layout = QHBoxLayout(); self.cacheable_check = QCheckBox("유사 응답 캐시 사용"); cache_layout.addWidget(self.cacheable_check)
+        cache_layout.addWidget(QLabel("기준 유사도:")); self.semantic_threshold_spin = QDoubleSpinBox()
+        self.semantic_threshold_spin.setRange(0.0, 1.0); self.semantic_threshold_spin.setSingleStep(0.01); self.semantic_threshold_spin.setDecimals(2)
+        self.semantic_threshold_spin.setSpecialValueText("전역 설정 사용"); cache_layout.addWidget(self.semantic_threshold_spin); cache_layout.addStretch()
+        layout.addLayout(cache_layout)
+        model_layout = QHBoxLayout(); model_layout.addWidget(QLabel("모델:")); self.model_policy_combo = QComboBox()
+        self.model_policy_combo.addItem("실행 설정의 모델 사용", ""); self.model_policy_combo.addItem("자동 (크기/난이도/지연 기준)", 'auto')
+        for model in SUPPORTED_MODELS: self.model_policy_combo.addItem(model, model)
+        model_layout.addWidget(self.model_policy_combo); model_layout.addWidget(QLabel("난이도:")); self.complexity_combo = QComboBox()
+        for key in TASK_COMPLEXITIES: self.complexity_combo.addItem(COMPLEXITY_LABELS[key], key)
+        model_layout.addWidget(self.complexity_combo); model_layout.addStretch(); layout.addLayout(model_layout)
+        self.generation_widget = GenerationSettingsWidget("생성 설정", "프로젝트 설정 사용"); layout.addWidget(self.generation_widget)
 
 class RunPanel(QGroupBox):
     def __init__(self, title="3. 실행 및 설정"):
@@ -120,7 +298,43 @@ class RunPanel(QGroupBox):
         layout.addLayout(log_folder_layout); layout.addStretch(); self.run_btn = QPushButton("▶ 실행")
         self.run_btn.setStyleSheet("font-size: 16px; font-weight: bold; padding: 10px;"); self.stop_btn = QPushButton("■ 중지")
         self.stop_btn.setStyleSheet("font-size: 16px; font-weight: bold; padding: 10px; color: red;"); self.stop_btn.hide()
-        run_stop_layout = QHBoxLayout(); run_stop_layout.addWidget(self.run_btn); run_stop_layout.addWidget(self.stop_btn)
-        layout.addLayout(run_stop_layout); log_header_layout = QHBoxLayout(); log_header_layout.addWidget(QLabel("실행 로그:"))
+        self.stop_btn.setText("■ 모두 중지"); self.priority_combo = QComboBox()
+        for key in ('high', 'normal', 'low'): self.priority_combo.addItem(f"우선순위: {PRIORITY_LABELS[key]}", key)
+        self.priority_combo.setCurrentIndex(1)
+        run_stop_layout = QHBoxLayout(); run_stop_layout.addWidget(self.run_btn); run_stop_layout.addWidget(self.priority_combo); run_stop_layout.addWidget(self.stop_btn)
+        layout.addLayout(run_stop_layout); self.runs_list = RunListWidget(); layout.addWidget(self.runs_list)
+        log_header_layout = QHBoxLayout(); log_header_layout.addWidget(QLabel("실행 로그:"))
         log_header_layout.addStretch(); self.clear_log_btn = QPushButton("로그 지우기"); log_header_layout.addWidget(self.clear_log_btn)
-        layout.addLayout(log_header_layout); self.log_viewer = QTextEdit(); self.log_viewer.setReadOnly(True); layout.addWidget(self.log_viewer)
\ No newline at end of file
+        layout.addLayout(log_header_layout); self.log_viewer = LogView(); layout.addWidget(self.log_viewer)
+class RunListWidget(QTreeWidget):
+    """동시에 진행 중인 실행 목록입니다. 실행마다 진행률, 우선순위, 중지 버튼을 보여줍니다."""
+    stop_requested = Signal(str); priority_changed = Signal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setHeaderLabels(["실행", "진행", "우선순위", ""]); self.setRootIsDecorated(False); self.setMaximumHeight(130)
+        self.setColumnWidth(0, 160); self.setColumnWidth(1, 140); self._rows = {}; self.hide()
+
+    def add_run(self, run_id, title, priority):
+        item = QTreeWidgetItem([title, "", "", ""]); self.addTopLevelItem(item)
+        progress = QProgressBar(); progress.setRange(0, 0); progress.setTextVisible(True) # 첫 태스크가 끝날 때까지는 진행 중 표시
+        priority_combo = QComboBox()
+        for key in ('high', 'normal', 'low'): priority_combo.addItem(PRIORITY_LABELS[key], key)
+        priority_combo.setCurrentIndex(max(0, priority_combo.findData(priority)))
+        priority_combo.currentIndexChanged.connect(lambda: self.priority_changed.emit(run_id, priority_combo.currentData()))
+        stop_btn = QPushButton("중지"); stop_btn.clicked.connect(lambda: self.stop_requested.emit(run_id))
+        self.setItemWidget(item, 1, progress); self.setItemWidget(item, 2, priority_combo); self.setItemWidget(item, 3, stop_btn)
+        self._rows[run_id] = (item, progress, priority_combo, stop_btn); self.show()
+
+    def set_progress(self, run_id, done, total):
+        row = self._rows.get(run_id)
+        if row: row[1].setRange(0, total); row[1].setValue(done); row[1].setFormat(f"{done}/{total}")
+
+    def set_stopping(self, run_id):
+        row = self._rows.get(run_id)
+        if row: row[3].setEnabled(False); row[3].setText("중지 중...")
+
+    def remove_run(self, run_id):
+        row = self._rows.pop(run_id, None)
+        if row: self.takeTopLevelItem(self.indexOfTopLevelItem(row[0]))
+        if not self._rows: self.hide()
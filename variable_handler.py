@@ -10,13 +10,15 @@ class VariableHandlerSignals(QObject):
     state_changed = Signal()
     variables_updated = Signal() 
     log_message = Signal(str)
+    rename_requested = Signal(str, str) # (var_id, new_name): 참조까지 함께 바꾸는 이름 변경
 
 class VariableHandler(QObject):
-    def __init__(self, ui_panel, variables_dict, built_in_vars):
+    def __init__(self, ui_panel, variables_dict, built_in_vars, reference_index=None):
         super().__init__()
         self.ui = ui_panel
         self.data = variables_dict
         self.built_in_vars = built_in_vars
+        self.index = reference_index
         self.signals = VariableHandlerSignals()
         self.is_loading = False
     
@@ -29,6 +31,7 @@ class VariableHandler(QObject):
         # *** 수정됨: 슬롯 연결 대상 함수에 @Slot() 데코레이터가 필요함 ***
         self.ui.value_edit.textChanged.connect(self.update_value_from_panel)
         self.ui.load_file_btn.clicked.connect(self.load_from_file)
+        self.ui.kind_combo.currentIndexChanged.connect(self.update_kind_from_panel)
 
     def is_valid_name(self, name, current_id=None):
         if name.upper() in self.built_in_vars:
@@ -40,6 +43,16 @@ class VariableHandler(QObject):
             return False
         return True
 
+    def _rename_with_references(self, var, new_name):
+        """다른 곳에서 참조 중인 변수라면 참조까지 함께 바꿀지 묻습니다. 함께 바꾸기로 하면 True를 반환합니다."""
+        if not self.index: return False
+        usage_count = len(self.index.usages(var.name))
+        if not usage_count: return False
+        reply = QMessageBox.question(self.ui, "참조 함께 변경",
+                                     f"{{{var.name}}}을(를) 참조하는 곳이 {usage_count}개 있습니다.\n모든 참조를 {{{new_name}}}(으)로 함께 바꾸시겠습니까?")
+        if reply != QMessageBox.Yes: return False
+        self.signals.rename_requested.emit(var.id, new_name); return True
+
     # ... _generate_unique_name, add_variable, remove_variable 등은 변경 없음 ...
     def _generate_unique_name(self, base_name, existing_names):
         if base_name not in existing_names: return base_name
@@ -52,6 +65,7 @@ class VariableHandler(QObject):
     def add_variable(self):
         all_var_names = {v.name for v in self.data.values()}; unique_name = self._generate_unique_name("새 변수", all_var_names)
         var = Variable(name=unique_name); self.data[var.id] = var
+        if self.index: self.index.index_variable(var)
         item = QListWidgetItem(var.name); item.setData(Qt.UserRole, var.id)
         item.setFlags(item.flags() | Qt.ItemIsEditable); self.ui.list_widget.addItem(item)
         self.ui.list_widget.setCurrentItem(item); self.signals.log_message.emit(f"변수 '{var.name}' 추가됨")
@@ -65,6 +79,7 @@ class VariableHandler(QObject):
             var_name = self.data[var_id].name
             if QMessageBox.question(self.ui, "확인", f"'{var_name}' 변수를 정말 삭제하시겠습니까?") == QMessageBox.Yes:
                 del self.data[var_id]; self.ui.list_widget.takeItem(self.ui.list_widget.row(item))
+                if self.index: self.index.remove_owner('variable', var_id)
                 self.signals.log_message.emit(f"변수 '{var_name}' 삭제됨"); self.signals.variables_updated.emit(); self.signals.state_changed.emit()
 
     @Slot()
@@ -78,6 +93,7 @@ class VariableHandler(QObject):
             if var.name != new_name:
                 if not self.is_valid_name(new_name, var_id):
                     self.ui.name_edit.setText(var.name); return
+                if self._rename_with_references(var, new_name): return
                 old_name = var.name; var.name = new_name; item.setText(new_name)
                 self.signals.log_message.emit(f"변수 이름 변경: '{old_name}' -> '{new_name}'")
                 self.signals.variables_updated.emit(); self.signals.state_changed.emit()
@@ -89,8 +105,27 @@ class VariableHandler(QObject):
         if not item or self.is_loading: return
         var_id = item.data(Qt.UserRole)
         if var_id in self.data:
-            if self.data[var_id].value != self.ui.value_edit.toPlainText():
-                self.data[var_id].value = self.ui.value_edit.toPlainText(); self.signals.state_changed.emit()
+            text = self.ui.value_edit.toPlainText()
+            if self.data[var_id].value != text:
+                self.data[var_id].value = text
+                if self.index: self.index.index_variable(self.data[var_id])
+                self.signals.state_changed.emit()
+
+    def _apply_kind_to_panel(self, kind):
+        is_file = kind == 'file'
+        self.ui.value_edit.setReadOnly(is_file)
+        self.ui.load_file_btn.setText("첨부할 파일 선택..." if is_file else "파일 내용 불러오기...")
+
+    @Slot()
+    def update_kind_from_panel(self):
+        item = self.ui.list_widget.currentItem()
+        if not item or self.is_loading: return
+        var = self.data.get(item.data(Qt.UserRole))
+        kind = self.ui.kind_combo.currentData()
+        if var is None or var.kind == kind: return
+        var.kind = kind; self._apply_kind_to_panel(kind)
+        label = "첨부 파일" if kind == 'file' else "텍스트"
+        self.signals.log_message.emit(f"변수 '{var.name}'의 종류를 '{label}'(으)로 변경함"); self.signals.state_changed.emit()
 
     @Slot(QListWidgetItem)
     def on_item_changed(self, item):
@@ -102,6 +137,7 @@ class VariableHandler(QObject):
             if var.name != new_name:
                 if not self.is_valid_name(new_name, var_id):
                     item.setText(var.name); return
+                if self._rename_with_references(var, new_name): return
                 old_name = var.name
                 self.signals.log_message.emit(f"변수 이름 변경: '{old_name}' -> '{new_name}'")
                 var.name = new_name
@@ -115,17 +151,28 @@ class VariableHandler(QObject):
         is_item_selected = current is not None
         self.ui.name_edit.setEnabled(is_item_selected); self.ui.value_edit.setEnabled(is_item_selected)
         self.ui.remove_btn.setEnabled(is_item_selected); self.ui.load_file_btn.setEnabled(is_item_selected)
+        self.ui.kind_combo.setEnabled(is_item_selected)
         self.signals.variables_updated.emit()
+        kind = 'text'
         if current:
             var_id = current.data(Qt.UserRole)
             if var_id in self.data:
-                var = self.data[var_id]; self.ui.name_edit.setText(var.name); self.ui.value_edit.setPlainText(var.value)
+                var = self.data[var_id]; self.ui.name_edit.setText(var.name); self.ui.value_edit.setPlainText(var.value); kind = var.kind
         else: self.ui.name_edit.clear(); self.ui.value_edit.clear()
+        self.ui.kind_combo.setCurrentIndex(max(0, self.ui.kind_combo.findData(kind))); self._apply_kind_to_panel(kind)
         self.is_loading = False
     @Slot()
     def load_from_file(self):
         item = self.ui.list_widget.currentItem();
         if not item: return
+        var = self.data.get(item.data(Qt.UserRole))
+        if var is not None and var.kind == 'file':
+            # 첨부 파일 변수는 내용을 읽지 않고 경로만 기억합니다. 실제 전송은 실행 시 한 번만 업로드됩니다.
+            filepath, _ = QFileDialog.getOpenFileName(self.ui, "첨부할 파일 선택", os.path.dirname(var.value or ""),
+                                                      "Attachments (*.png *.jpg *.jpeg *.webp *.gif *.pdf *.txt *.csv *.mp3 *.wav *.mp4);;All Files (*)")
+            if not filepath: return
+            self.ui.value_edit.setPlainText(filepath); self.signals.log_message.emit(f"변수 '{var.name}'에 첨부 파일 '{os.path.basename(filepath)}' 지정함")
+            return
         filepath, _ = QFileDialog.getOpenFileName(self.ui, "텍스트 파일 선택", "", "Text Files (*.txt);;All Files (*)")
         if not filepath: return
         try:
@@ -0,0 +1,226 @@
+# watch_mode.py
+
+from PySide6.QtCore import QObject, Signal, QRunnable, Slot
+
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+
+from reference_index import VariableReferenceIndex
+
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_MAX_WAIT = 5.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify 상수 (linux/inotify.h)
+IN_MODIFY = 0x002; IN_ATTRIB = 0x004; IN_CLOSE_WRITE = 0x008; IN_MOVED_FROM = 0x040; IN_MOVED_TO = 0x080
+IN_CREATE = 0x100; IN_DELETE = 0x200; IN_DELETE_SELF = 0x400; IN_MOVE_SELF = 0x800; IN_IGNORED = 0x8000
+IN_NONBLOCK = 0o4000; IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+class InotifyWatcher:
+    """inotify(ctypes)로 파일 변경을 감시합니다.
+
+    편집기들은 보통 임시 파일에 쓴 뒤 이름을 바꿔 저장하므로 파일 자체가 아닌 부모 폴더를 감시하고 이름으로 걸러냅니다.
+    """
+    kind = 'inotify'
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1 실패")
+        self._lock = threading.Lock(); self._dirs = {} # 폴더 → wd
+        self._names = {} # wd → {파일 이름: 절대 경로}
+
+    def set_paths(self, paths):
+        wanted = {}
+        for path in paths:
+            path = os.path.abspath(path); wanted.setdefault(os.path.dirname(path), {})[os.path.basename(path)] = path
+        with self._lock:
+            for folder in list(self._dirs):
+                if folder not in wanted: self._libc.inotify_rm_watch(self._fd, self._dirs.pop(folder))
+            self._names = {}
+            for folder, names in wanted.items():
+                wd = self._dirs.get(folder)
+                if wd is None:
+                    wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), WATCH_MASK)
+                    if wd < 0: continue # 아직 없는 폴더는 감시할 수 없습니다.
+                    self._dirs[folder] = wd
+                self._names[wd] = names
+
+    def poll(self, timeout):
+        """timeout초까지 기다려 바뀐 파일의 절대 경로 집합을 반환합니다."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready: return set()
+        try: data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError: return set()
+        changed = set(); offset = 0
+        with self._lock:
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset); offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0")); offset += length
+                names = self._names.get(wd, {})
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    # 폴더 자체가 사라졌으면 다음 set_paths에서 다시 등록합니다.
+                    changed.update(names.values()); self._dirs = {k: v for k, v in self._dirs.items() if v != wd}
+                elif name in names: changed.add(names[name])
+        return changed
+
+    def close(self):
+        if self._fd >= 0: os.close(self._fd); self._fd = -1
+
+class PollingWatcher:
+    """inotify를 쓸 수 없는 환경(Windows, macOS 등)을 위한 대체 감시기입니다. (크기, 수정 시각)을 주기적으로 비교합니다."""
+    kind = 'polling'
+
+    def __init__(self, interval=DEFAULT_POLL_INTERVAL):
+        self.interval = interval; self._lock = threading.Lock(); self._stamps = {}
+
+    @staticmethod
+    def _stamp(path):
+        try: stat = os.stat(path); return stat.st_size, stat.st_mtime_ns
+        except OSError: return None
+
+    def set_paths(self, paths):
+        with self._lock:
+            old = self._stamps
+            self._stamps = {path: old[path] if path in old else self._stamp(path) for path in map(os.path.abspath, paths)}
+
+    def poll(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                changed = set()
+                for path, stamp in self._stamps.items():
+                    current = self._stamp(path)
+                    if current != stamp: self._stamps[path] = current; changed.add(path)
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0: return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self): pass
+
+def create_watcher(force_polling=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    """가능하면 inotify 감시기를, 아니면 폴링 감시기를 만듭니다."""
+    if not force_polling and sys.platform.startswith('linux'):
+        try: return InotifyWatcher()
+        except (OSError, AttributeError): pass
+    return PollingWatcher(poll_interval)
+
+class Debouncer:
+    """연속된 변경을 모아서, 마지막 변경 후 quiet초 동안 조용하거나 처음 변경 후 max_wait초가 지나면 한 번에 내보냅니다."""
+    def __init__(self, quiet=DEFAULT_DEBOUNCE, max_wait=DEFAULT_MAX_WAIT):
+        self.quiet = quiet; self.max_wait = max_wait; self.pending = set(); self._first = None; self._last = None
+
+    def add(self, paths, now=None):
+        if not paths: return
+        now = time.monotonic() if now is None else now
+        self.pending |= set(paths); self._last = now
+        if self._first is None: self._first = now
+
+    def ready(self, now=None):
+        """내보낼 때가 되었으면 모인 경로 집합을, 아니면 None을 반환합니다."""
+        if not self.pending: return None
+        now = time.monotonic() if now is None else now
+        if now - self._last < self.quiet and now - self._first < self.max_wait: return None
+        paths = self.pending; self.pending = set(); self._first = self._last = None
+        return paths
+
+    def wait_time(self, default):
+        if not self.pending: return default
+        return max(0.0, min(self._last + self.quiet, self._first + self.max_wait) - time.monotonic())
+
+def file_variables(variables):
+    """첨부 파일 변수가 가리키는 파일의 절대 경로 → 변수 이름 집합을 반환합니다."""
+    paths = {}
+    for var in variables.values():
+        if var.kind == 'file' and var.value: paths.setdefault(os.path.abspath(var.value), set()).add(var.name)
+    return paths
+
+def diff_project(old_variables, old_tasks, new_variables, new_tasks):
+    """두 스냅샷({id: to_dict()})을 비교하여 (바뀐 변수 이름 집합, 바뀐 태스크 id 집합)을 반환합니다.
+
+    이름이 바뀌거나 지워진 변수는 옛 이름과 새 이름을 모두 바뀐 것으로 봅니다.
+    """
+    changed_names = set()
+    for var_id in old_variables.keys() | new_variables.keys():
+        old, new = old_variables.get(var_id), new_variables.get(var_id)
+        if old != new: changed_names.update(data['name'] for data in (old, new) if data)
+    changed_tasks = {task_id for task_id, data in new_tasks.items() if old_tasks.get(task_id) != data}
+    return changed_names, changed_tasks
+
+def affected_task_ids(changed_names, variables, tasks, index=None):
+    """바뀐 변수를 직접 또는 다른 변수를 거쳐 참조하는 태스크 id 집합을 반환합니다."""
+    if index is None:
+        index = VariableReferenceIndex(); index.rebuild(variables, {task.id: task for task in tasks})
+    seen = set(); queue = list(changed_names); task_ids = set()
+    while queue:
+        name = queue.pop()
+        if name in seen: continue
+        seen.add(name)
+        for kind, owner_id, _ in index.usages(name):
+            if kind == 'task': task_ids.add(owner_id)
+            elif owner_id in variables: queue.append(variables[owner_id].name)
+    return task_ids
+
+class WatchState:
+    """마지막으로 실행한 시점의 스냅샷을 기억하고, 그 이후 바뀐 입력에 영향을 받는 태스크만 골라냅니다."""
+    def __init__(self, project_path=None):
+        self.project_path = os.path.abspath(project_path) if project_path else None
+        self.changed_files = set(); self._variables = {}; self._tasks = {}
+
+    def reset(self, variables, tasks):
+        self._variables = {var_id: var.to_dict() for var_id, var in variables.items()}
+        self._tasks = {task.id: task.to_dict() for task in tasks}; self.changed_files.clear()
+
+    def watched_paths(self, variables):
+        paths = set(file_variables(variables))
+        if self.project_path: paths.add(self.project_path)
+        return paths
+
+    def note_changes(self, paths):
+        self.changed_files |= {path for path in paths if path != self.project_path}
+
+    def plan(self, variables, tasks):
+        """다시 실행할 태스크를 tasks 순서대로 반환하고, 현재 상태를 새 기준으로 삼습니다."""
+        changed_names, task_ids = diff_project(self._variables, self._tasks, {var_id: var.to_dict() for var_id, var in variables.items()},
+                                               {task.id: task.to_dict() for task in tasks})
+        by_path = file_variables(variables)
+        for path in self.changed_files: changed_names |= by_path.get(path, set())
+        task_ids |= affected_task_ids(changed_names, variables, tasks)
+        self.reset(variables, tasks)
+        return [task for task in tasks if task.id in task_ids]
+
+class FileWatcherSignals(QObject):
+    changed = Signal(object); error = Signal(str)
+
+class FileWatcherWorker(QRunnable):
+    """작업 스레드에서 파일을 감시하고, 변경을 디바운스한 뒤 바뀐 경로 집합을 changed 시그널로 보냅니다."""
+    def __init__(self, paths, debounce=DEFAULT_DEBOUNCE, max_wait=DEFAULT_MAX_WAIT, force_polling=False):
+        super().__init__()
+        self.signals = FileWatcherSignals()
+        self.watcher = create_watcher(force_polling); self.watcher.set_paths(paths)
+        self.debouncer = Debouncer(debounce, max_wait); self.is_running = True
+
+    @property
+    def kind(self): return self.watcher.kind
+
+    def set_paths(self, paths): self.watcher.set_paths(paths)
+
+    def stop(self): self.is_running = False
+
+    @Slot()
+    def run(self):
+        try:
+            while self.is_running:
+                self.debouncer.add(self.watcher.poll(self.debouncer.wait_time(0.5)))
+                paths = self.debouncer.ready()
+                if paths and self.is_running: self.signals.changed.emit(paths)
+        except Exception as e: self.signals.error.emit(f"{type(e).__name__}: {e}")
+        finally: self.watcher.close()
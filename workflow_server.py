@@ -0,0 +1,423 @@
+# workflow_server.py
+
+import os
+import sys
+import json
+import time
+import uuid
+import secrets
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+from dotenv import load_dotenv
+from PySide6.QtCore import Qt
+
+from data_models import Variable
+from project_io import load_project, variable_from_dict, task_from_dict
+from output_sinks import container_path, latest_entries, read_entries
+from headless import HeadlessSession, BUILT_IN_VARS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_DEPTH = 100
+DEFAULT_PER_CLIENT = 2
+DEFAULT_JOBS_ROOT = os.path.join(os.path.expanduser("~"), ".aiprompthelper", "jobs")
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_EVENTS = 2000 # 작업별로 보관하는 최근 이벤트 수
+MAX_FINISHED_JOBS = 500 # 메모리에 남겨두는 끝난 작업 수 (결과 파일은 디스크에 남습니다)
+PROJECT_CACHE_SIZE = 32
+FINISHED = ('succeeded', 'failed', 'cancelled')
+
+class QueueFull(Exception):
+    pass
+
+def parse_project(data, allow_files=False):
+    """요청에 직접 담긴 프로젝트(dict)를 (변수 dict, 태스크 목록, 설정 dict)로 바꿉니다.
+
+    파일 변수는 서버의 파일을 읽어 요청에 실어 보내므로 allow_files가 아니면 거부합니다.
+    """
+    if not isinstance(data, dict): raise ValueError("project는 프로젝트 파일 경로나 프로젝트 객체여야 합니다.")
+    variables = {}
+    for item in data.get('variables', []):
+        if item.get('name', '').upper() in BUILT_IN_VARS: continue
+        var = variable_from_dict(item)
+        if var.kind == 'file' and not allow_files: raise ValueError(f"요청에 담긴 프로젝트에는 파일 변수를 쓸 수 없습니다: '{var.name}'")
+        if var.id and var.name: variables[var.id] = var
+    tasks = [task for task in map(task_from_dict, data.get('tasks', [])) if task.id and task.name]
+    return variables, tasks, data.get('settings', {}) or {}
+
+def apply_overrides(variables, overrides, allow_files=False):
+    """이름 → 값으로 주어진 변수를 덮어쓴 새 변수 dict를 반환합니다. 프로젝트에 없는 이름은 텍스트 변수로 추가합니다.
+
+    파일 변수의 값(경로)을 바꾸면 서버의 아무 파일이나 읽게 되므로 allow_files가 아니면 거부합니다.
+    """
+    by_name = {var.name: var for var in variables.values()}; result = dict(variables)
+    for name, value in (overrides or {}).items():
+        if not isinstance(value, str): raise ValueError(f"변수 '{name}'의 값은 문자열이어야 합니다.")
+        old = by_name.get(name)
+        if old and old.kind == 'file' and not allow_files: raise ValueError(f"파일 변수 '{name}'의 경로는 요청으로 바꿀 수 없습니다.")
+        var = Variable(name=name, value=value, id=old.id if old else None, kind=old.kind if old else 'text')
+        result[var.id] = var
+    return result
+
+class ProjectCache:
+    """(경로, 수정 시각, 크기)별로 파싱한 프로젝트를 기억하여 같은 프로젝트의 작은 작업이 매번 파일을 다시 읽지 않게 합니다."""
+    def __init__(self, size=PROJECT_CACHE_SIZE):
+        self.size = size; self._items = OrderedDict(); self._lock = threading.Lock()
+
+    def load(self, path):
+        stat = os.stat(path); key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key in self._items: self._items.move_to_end(key); return self._items[key]
+        project = load_project(path, BUILT_IN_VARS)
+        with self._lock:
+            self._items[key] = project
+            while len(self._items) > self.size: self._items.popitem(last=False)
+        return project
+
+class Job:
+    """대기열에 들어간 실행 하나입니다. 상태와 이벤트는 여러 스레드(작업자, 실행기, HTTP 요청)에서 읽고 씁니다."""
+    def __init__(self, client, project, overrides, task_names, jobs_root):
+        self.id = uuid.uuid4().hex[:12]; self.client = client; self.project = project
+        self.overrides = overrides or {}; self.task_names = list(task_names or [])
+        self.status = 'queued'; self.error = None; self.created_at = time.time(); self.started_at = None; self.finished_at = None
+        self.done = 0; self.total = 0; self.outputs = []; self.sink_kind = 'directory'; self.container_name = None
+        self.folder = os.path.join(jobs_root, self.id); self.runner = None; self.cancel_requested = False
+        self.events = deque(maxlen=MAX_EVENTS); self.last_seq = 0; self.changed = threading.Condition()
+
+    @property
+    def output_folder(self): return os.path.join(self.folder, "outputs")
+
+    def add_event(self, kind, **fields):
+        with self.changed:
+            self.last_seq += 1
+            self.events.append(dict(seq=self.last_seq, time=round(time.time(), 3), type=kind, **fields)); self.changed.notify_all()
+
+    def events_since(self, seq):
+        with self.changed: return [event for event in self.events if event['seq'] > seq]
+
+    def set_progress(self, done, total):
+        self.done = done; self.total = total; self.add_event('progress', done=done, total=total)
+
+    def add_output(self, location, status):
+        self.outputs.append({'location': location, 'status': status}); self.add_event('output', location=location, status=status)
+
+    def finish(self, status, error=None):
+        self.status = status; self.error = error; self.finished_at = time.time(); self.runner = None
+        self.add_event('status', status=status, error=error)
+
+    def to_dict(self):
+        return {'id': self.id, 'client': self.client, 'status': self.status, 'error': self.error,
+                'project': self.project if isinstance(self.project, str) else "<inline>", 'tasks': self.task_names,
+                'progress': {'done': self.done, 'total': self.total}, 'outputs': len(self.outputs), 'last_event': self.last_seq,
+                'created_at': self.created_at, 'started_at': self.started_at, 'finished_at': self.finished_at}
+
+class WorkflowService:
+    """작업 대기열과 작업자 스레드 풀입니다. 모든 작업자는 하나의 HeadlessSession(엔드포인트 풀, 유사 응답 캐시)을 공유합니다.
+
+    대기열은 들어온 순서대로 처리하되, 실행 중인 작업이 per_client개에 이른 클라이언트의 작업은 건너뛰어
+    한 클라이언트가 작업자를 모두 차지하지 못하게 합니다. allow_file_variables가 아니면 요청으로 파일 변수를 정의하거나
+    그 경로를 바꿀 수 없습니다. (프로젝트 파일에 저장된 파일 변수는 그대로 씁니다)
+    """
+    def __init__(self, workers=DEFAULT_WORKERS, queue_depth=DEFAULT_QUEUE_DEPTH, per_client=DEFAULT_PER_CLIENT, jobs_root=DEFAULT_JOBS_ROOT,
+                 allow_file_variables=False):
+        self.workers = max(1, workers); self.queue_depth = max(1, queue_depth); self.per_client = max(1, per_client)
+        self.allow_file_variables = allow_file_variables
+        self.jobs_root = os.path.abspath(jobs_root); self.session = HeadlessSession(); self.projects = ProjectCache()
+        self.jobs = OrderedDict(); self._queue = deque(); self._running = {} # 클라이언트 → 실행 중인 작업 수
+        self._cond = threading.Condition(); self._stopping = False
+        self._threads = [threading.Thread(target=self._worker_loop, name=f"WorkflowWorker-{i + 1}", daemon=True) for i in range(self.workers)]
+
+    def start(self):
+        for thread in self._threads: thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True; running = [job for job in self.jobs.values() if job.status == 'running']; self._cond.notify_all()
+        for job in running: self.cancel(job.id)
+
+    def submit(self, client, project, overrides=None, task_names=None):
+        if isinstance(project, str):
+            project = os.path.abspath(project)
+            if not os.path.isfile(project): raise ValueError(f"프로젝트 파일을 찾을 수 없습니다: '{project}'")
+        elif not isinstance(project, dict): raise ValueError("project는 프로젝트 파일 경로나 프로젝트 객체여야 합니다.")
+        if overrides is not None and not isinstance(overrides, dict): raise ValueError("variables는 이름 → 값 객체여야 합니다.")
+        if task_names is not None and not (isinstance(task_names, list) and all(isinstance(name, str) for name in task_names)):
+            raise ValueError("tasks는 태스크 이름 목록이어야 합니다.")
+        # 파일 변수 등 요청 내용의 오류는 대기열에 넣기 전에 알립니다.
+        try: self._load(project, overrides)
+        except OSError as e: raise ValueError(f"프로젝트를 읽을 수 없습니다: {e}") from e
+        job = Job(client, project, overrides, task_names, self.jobs_root)
+        with self._cond:
+            if self._stopping: raise QueueFull("서버가 종료되는 중입니다.")
+            if len(self._queue) >= self.queue_depth: raise QueueFull(f"대기열이 가득 찼습니다. ({self.queue_depth}개)")
+            self.jobs[job.id] = job; self._queue.append(job); self._prune_finished(); self._cond.notify()
+        job.add_event('status', status='queued')
+        return job
+
+    def get(self, job_id):
+        with self._cond: return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._cond: return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINISHED: return job
+            job.cancel_requested = True; runner = job.runner
+            if job in self._queue: self._queue.remove(job); job.finish('cancelled'); return job
+        if runner: runner.stop()
+        return job
+
+    def stats(self):
+        with self._cond:
+            counts = {}
+            for job in self.jobs.values(): counts[job.status] = counts.get(job.status, 0) + 1
+            return {'workers': self.workers, 'busy': sum(self._running.values()), 'queued': len(self._queue),
+                    'queue_depth': self.queue_depth, 'per_client': self.per_client, 'jobs': counts}
+
+    def _prune_finished(self):
+        # self._cond를 잡고 호출합니다.
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]: del self.jobs[job_id]
+
+    def _next_job(self):
+        # self._cond를 잡고 호출합니다.
+        for job in self._queue:
+            if self._running.get(job.client, 0) < self.per_client: self._queue.remove(job); return job
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopping:
+                    job = self._next_job()
+                    if job: break
+                    self._cond.wait()
+                if self._stopping: return
+                self._running[job.client] = self._running.get(job.client, 0) + 1
+                job.status = 'running'; job.started_at = time.time()
+            try: self._run_job(job)
+            finally:
+                with self._cond:
+                    self._running[job.client] -= 1
+                    if not self._running[job.client]: del self._running[job.client]
+                    self._cond.notify_all() # 실행 수 제한에 걸려 있던 다른 작업을 깨웁니다.
+
+    def _load(self, project, overrides):
+        variables, tasks, settings = self.projects.load(project) if isinstance(project, str) else parse_project(project, self.allow_file_variables)
+        return apply_overrides(variables, overrides, self.allow_file_variables), tasks, settings
+
+    def _run_job(self, job):
+        job.add_event('status', status='running')
+        try:
+            variables, tasks, settings = self._load(job.project, job.overrides)
+            if job.task_names:
+                unknown = set(job.task_names) - {task.name for task in tasks}
+                if unknown: raise ValueError(f"프로젝트에 없는 태스크입니다: {', '.join(sorted(unknown))}")
+                tasks = [task for task in tasks if task.name in job.task_names]
+            else: tasks = [task for task in tasks if task.enabled]
+            if not tasks: raise ValueError("실행할 활성화된 태스크가 없습니다.")
+            run_options = settings.get('run_options', {}) or {}
+            job.total = len(tasks); job.sink_kind = run_options.get('output_sink') or 'directory'; job.container_name = run_options.get('output_container')
+            # 작업마다 결과/로그 폴더를 따로 두어 같은 프로젝트의 작업이 동시에 실행되어도 섞이지 않습니다.
+            runner = self.session.make_runner(variables, tasks, settings, output_folder=job.output_folder, log_folder=os.path.join(job.folder, "logs"))
+            errors = []
+            # 작업자 스레드에는 Qt 이벤트 루프가 없고 시그널은 태스크/저장 스레드에서도 나오므로 직접 연결합니다. (Job은 스레드 안전)
+            runner.signals.log_record.connect(lambda message, level, task: job.add_event('log', message=message, level=level, task=task or None), Qt.DirectConnection)
+            runner.signals.progress.connect(job.set_progress, Qt.DirectConnection)
+            runner.signals.output_written.connect(job.add_output, Qt.DirectConnection)
+            runner.signals.error.connect(errors.append, Qt.DirectConnection)
+            with self._cond: job.runner = runner; cancelled = job.cancel_requested
+            if cancelled: runner.stop()
+            runner.run() # 작업자 스레드에서 바로 실행합니다.
+            status = 'cancelled' if job.cancel_requested else 'failed' if errors else 'succeeded'
+            job.finish(status, errors[0] if errors else None)
+        except Exception as e: job.finish('failed', f"{type(e).__name__}: {e}")
+
+    def list_outputs(self, job):
+        """작업 결과를 [{'name', 'size'}] 목록으로 반환합니다. 컨테이너에 저장한 경우 항목별 최신 내용 기준입니다."""
+        if job.sink_kind == 'directory':
+            if not os.path.isdir(job.output_folder): return []
+            items = []
+            for dirpath, _, filenames in os.walk(job.output_folder):
+                for filename in sorted(filenames):
+                    path = os.path.join(dirpath, filename)
+                    items.append({'name': os.path.relpath(path, job.output_folder).replace(os.sep, '/'), 'size': os.path.getsize(path)})
+            return sorted(items, key=lambda item: item['name'])
+        return [{'name': name, 'size': entry.size} for name, entry in self._latest_entries(job).items()]
+
+    def read_output(self, job, name):
+        """결과 하나의 내용(bytes)을 반환합니다. 없으면 None입니다."""
+        if job.sink_kind != 'directory':
+            entry = self._latest_entries(job).get(name)
+            return next(read_entries(self._container(job), [entry]))[1] if entry else None
+        root = os.path.abspath(job.output_folder); path = os.path.abspath(os.path.join(root, *name.split('/')))
+        # 작업 결과 폴더 밖의 파일은 읽지 못하게 합니다.
+        if os.path.commonpath([root, path]) != root or not os.path.isfile(path): return None
+        with open(path, 'rb') as f: return f.read()
+
+    @staticmethod
+    def _container(job): return container_path(job.sink_kind, job.output_folder, job.container_name)
+
+    def _latest_entries(self, job):
+        # 내용은 읽지 않고 이름 → 위치만 모읍니다. 결과 내용은 요청한 항목만 read_entries로 읽습니다.
+        path = self._container(job)
+        return latest_entries(path) if os.path.exists(path) else {}
+
+class WorkflowRequestHandler(BaseHTTPRequestHandler):
+    """JSON HTTP API입니다.
+
+    POST /jobs {"project": 경로 | 프로젝트 객체, "variables": {이름: 값}, "tasks": [이름]}  → 202 작업 정보
+    GET /jobs, GET /jobs/<id>, DELETE /jobs/<id> (취소), GET /stats
+    GET /jobs/<id>/events?since=N  → 이후 이벤트 목록,  GET /jobs/<id>/stream?since=N  → 끝날 때까지 NDJSON 스트림
+    GET /jobs/<id>/outputs  → 결과 목록,  GET /jobs/<id>/outputs/<이름>  → 결과 내용
+    POST 본문은 Content-Type: application/json이어야 합니다. (브라우저가 다른 출처에서 사전 요청 없이 보낼 수 있는 형식은 받지 않습니다)
+    클라이언트는 X-Client-Id 헤더로 구분하며, 없으면 접속 주소를 사용합니다.
+    """
+    server_version = "AIPromptHelperWorkflow/1.0"
+
+    @property
+    def service(self): return self.server.service
+
+    def address_string(self):
+        # Unix 소켓에서는 client_address가 빈 문자열입니다.
+        return str(self.client_address[0]) if isinstance(self.client_address, tuple) and self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose: super().log_message(format, *args)
+
+    def _send_json(self, code, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(code); self.send_header("Content-Type", "application/json; charset=utf-8"); self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items(): self.send_header(key, value)
+        self.end_headers(); self.wfile.write(body)
+
+    def _error(self, code, message, headers=None): self._send_json(code, {'error': message}, headers)
+
+    def _authorized(self):
+        token = self.server.token
+        if token and self.headers.get("Authorization", "") != f"Bearer {token}": self._error(401, "인증 토큰이 올바르지 않습니다."); return False
+        return True
+
+    def _route(self):
+        parsed = urlparse(self.path); parts = [unquote(part) for part in parsed.path.strip('/').split('/', 3) if part]
+        return parts, parse_qs(parsed.query)
+
+    def _job(self, job_id):
+        job = self.service.get(job_id)
+        if job is None: self._error(404, f"작업을 찾을 수 없습니다: '{job_id}'")
+        return job
+
+    def do_POST(self):
+        if not self._authorized(): return
+        parts, _ = self._route()
+        if parts != ['jobs']: return self._error(404, "알 수 없는 경로입니다.")
+        if self.headers.get_content_type() != "application/json": return self._error(415, "Content-Type은 application/json이어야 합니다.")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES: return self._error(413, f"요청이 너무 큽니다. (최대 {MAX_BODY_BYTES // (1024 * 1024)} MB)")
+        try: body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e: return self._error(400, f"JSON 형식 오류: {e}")
+        if not isinstance(body, dict) or 'project' not in body: return self._error(400, "project가 필요합니다.")
+        client = self.headers.get("X-Client-Id") or self.address_string()
+        try: job = self.service.submit(client, body['project'], body.get('variables'), body.get('tasks'))
+        except ValueError as e: return self._error(400, str(e))
+        except QueueFull as e: return self._error(429, str(e), {"Retry-After": "1"})
+        self._send_json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+    def do_DELETE(self):
+        if not self._authorized(): return
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != 'jobs': return self._error(404, "알 수 없는 경로입니다.")
+        job = self.service.cancel(parts[1])
+        if job is None: return self._error(404, f"작업을 찾을 수 없습니다: '{parts[1]}'")
+        self._send_json(200, job.to_dict())
+
+    def do_GET(self):
+        if not self._authorized(): return
+        parts, query = self._route()
+        if parts == ['stats']: return self._send_json(200, self.service.stats())
+        if parts == ['jobs']: return self._send_json(200, [job.to_dict() for job in self.service.list_jobs()])
+        if len(parts) < 2 or parts[0] != 'jobs': return self._error(404, "알 수 없는 경로입니다.")
+        job = self._job(parts[1])
+        if job is None: return
+        since = int(query.get('since', ['0'])[0] or 0)
+        if len(parts) == 2: return self._send_json(200, job.to_dict())
+        if parts[2] == 'events': return self._send_json(200, job.events_since(since))
+        if parts[2] == 'stream': return self._stream(job, since)
+        if parts[2] == 'outputs' and len(parts) == 3: return self._send_json(200, self.service.list_outputs(job))
+        if parts[2] == 'outputs':
+            data = self.service.read_output(job, parts[3])
+            if data is None: return self._error(404, f"결과를 찾을 수 없습니다: '{parts[3]}'")
+            self.send_response(200); self.send_header("Content-Type", "application/octet-stream"); self.send_header("Content-Length", str(len(data)))
+            self.end_headers(); self.wfile.write(data); return
+        self._error(404, "알 수 없는 경로입니다.")
+
+    def _stream(self, job, since):
+        """작업이 끝날 때까지 이벤트를 한 줄에 하나씩(NDJSON) 보냅니다. 조용할 때는 빈 줄로 연결을 확인합니다."""
+        self.send_response(200); self.send_header("Content-Type", "application/x-ndjson; charset=utf-8"); self.send_header("Cache-Control", "no-cache")
+        self.end_headers(); self.close_connection = True
+        try:
+            while True:
+                with job.changed:
+                    job.changed.wait_for(lambda: job.last_seq > since or job.status in FINISHED, timeout=15)
+                    events = [event for event in job.events if event['seq'] > since]; finished = job.status in FINISHED
+                if events:
+                    self.wfile.write(b"".join(json.dumps(event, ensure_ascii=False).encode('utf-8') + b"\n" for event in events)); since = events[-1]['seq']
+                elif not finished: self.wfile.write(b"\n")
+                self.wfile.flush()
+                if finished and since >= job.last_seq: return
+        except (BrokenPipeError, ConnectionResetError): pass # 클라이언트가 연결을 끊었습니다.
+
+class WorkflowHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+class WorkflowUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, token=None, verbose=False):
+    if socket_path:
+        if os.path.exists(socket_path): os.remove(socket_path) # 이전 실행에서 남은 소켓 파일
+        server = WorkflowUnixServer(socket_path, WorkflowRequestHandler)
+    else: server = WorkflowHTTPServer((host, port), WorkflowRequestHandler)
+    server.service = service; server.token = token; server.verbose = verbose
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="저장된 워크플로우를 HTTP로 실행하는 로컬 서버")
+    parser.add_argument("--host", default=DEFAULT_HOST); parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="TCP 대신 사용할 Unix 소켓 경로")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="동시에 실행할 작업 수")
+    parser.add_argument("--queue-depth", type=int, default=DEFAULT_QUEUE_DEPTH, help="대기열 최대 길이 (넘으면 429)")
+    parser.add_argument("--per-client", type=int, default=DEFAULT_PER_CLIENT, help="클라이언트별 동시 실행 작업 수")
+    parser.add_argument("--jobs-root", default=DEFAULT_JOBS_ROOT, help="작업별 결과/로그를 저장할 폴더")
+    parser.add_argument("--token", default=None, help="Bearer 인증 토큰 (기본: WORKFLOW_SERVER_TOKEN 환경 변수, 없으면 새로 만들어 출력)")
+    parser.add_argument("--no-auth", action="store_true", help="인증 없이 실행 (같은 컴퓨터의 모든 프로그램과 웹 페이지가 작업을 실행할 수 있습니다)")
+    parser.add_argument("--allow-file-variables", action="store_true", help="요청으로 파일 변수를 정의하거나 그 경로를 바꾸는 것을 허용")
+    parser.add_argument("--verbose", action="store_true", help="HTTP 요청 로그 출력")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    token = None if args.no_auth else args.token or os.getenv("WORKFLOW_SERVER_TOKEN") or None
+    if not token and not args.no_auth:
+        token = secrets.token_urlsafe(24); print(f"인증 토큰: {token} (요청에 'Authorization: Bearer <토큰>' 헤더를 붙이세요)", flush=True)
+    if args.no_auth: print("⚠ 인증 토큰 없이 실행합니다.", file=sys.stderr)
+    service = WorkflowService(args.workers, args.queue_depth, args.per_client, args.jobs_root, args.allow_file_variables).start()
+    server = create_server(service, args.host, args.port, args.socket, token, args.verbose)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"워크플로우 서버 시작: {where} (작업자 {service.workers}개, 대기열 {service.queue_depth}개, 클라이언트별 {service.per_client}개)", flush=True)
+    try: server.serve_forever()
+    except KeyboardInterrupt: print("서버를 종료합니다.", flush=True)
+    finally: server.server_close(); service.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())